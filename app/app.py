@@ -1,20 +1,22 @@
-__import__('pysqlite3')
 import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
-
-import torch
-torch.classes.__path__ = []
+try:
+    # ChromaDB needs a newer SQLite than some hosts ship; swap it in before
+    # anything imports sqlite3
+    __import__('pysqlite3')
+    sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+except ImportError:
+    pass
 
 import streamlit as st
-import tempfile
 import math
 import os
+import threading
 from dotenv import load_dotenv
 
-from resume_parser.pdf_parsing import load_pdf
-from resume_parser.detail_extraction import extract_education_skills_name
-from rag_components.retriever import JobRetriever
-from rag_components.generator import recommend_skills
+from streaming_json import JSONEvent
+
+# The pipeline, embedding model, ChromaDB and the LLM clients are imported
+# where they are first needed, so the page renders before any of them loads.
 
 def create_grid_layout(items, cols=3):
     rows = math.ceil(len(items) / cols)
@@ -33,27 +35,150 @@ def create_grid_layout(items, cols=3):
     
     return grid
 
-def process_resume(pdf_path, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL):
-    st.info("Processing your resume...")
-    
-    with st.spinner("Loading Resume..."):
+def create_resume_slots():
+    """Reserve one placeholder per resume field so streamed values can fill them in place."""
+    slots = {'header': st.empty()}
+    for key in ('name', 'job_role', 'education', 'experience', 'skills'):
+        slots[key] = st.empty()
+    return slots
+
+def render_resume_field(slots, key, value):
+    if key not in slots:
+        return
+
+    slots['header'].subheader("Your Resume Information")
+
+    if key == 'name':
+        slots[key].write(f"**Name:** {value if value else 'Not specified'}")
+    elif key == 'job_role':
+        slots[key].write(f"**Job Role:** {value if value else 'Not specified'}")
+    elif key in ('education', 'experience') and value:
+        with slots[key].container():
+            st.write(f"**{key.title()}:**")
+            for entry in value:
+                st.write(f"- {entry}")
+    elif key == 'skills' and value:
+        # Display skills in a grid layout
+        with slots[key].container():
+            st.write("**Skills:**")
+            skill_grid = create_grid_layout(value, cols=4)
+            
+            for row in skill_grid:
+                cols = st.columns(4)
+                for i, skill in enumerate(row):
+                    if skill:  # Skip empty cells
+                        cols[i].markdown(f"• {skill}")
+    else:
+        slots[key].empty()
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """
+    Import the pipeline, load the embedding model and open the job database
+    on a background thread, once per process. The returned status dict gets
+    'done' set when finished and 'error' filled in if it failed.
+    """
+    status = {'done': threading.Event(), 'error': None}
+
+    def _run():
         try:
-            resume_text = load_pdf(pdf_path)
-            if not resume_text or len(resume_text.strip()) < 50:
-                st.error("Failed to extract text from PDF. The file might be:")
-                st.error("• Empty or corrupted")
-                st.error("• Password protected")
-                st.error("• An image-based PDF (needs OCR)")
-                st.info("Please ensure your resume is a text-based PDF with at least 50 characters.")
-                return False
+            import pipeline  # noqa: F401 - PDF parser and LLM clients
+            from rag_components.registry import warm_up
+            warm_up()
         except Exception as e:
-            st.error(f"❌ Error loading PDF file: {str(e)}")
-            st.error("Please ensure the file is a valid PDF document.")
-            return False
+            status['error'] = str(e)
+        finally:
+            status['done'].set()
+
+    threading.Thread(target=_run, name="upskillr-warm-up", daemon=True).start()
+    return status
+
+def render_debug_panel(data):
+    from tracing import prometheus_text
+    from service_client import get_service_client
+
+    with st.expander("Debug: pipeline trace"):
+        st.caption(f"Trace {data['trace_id']}")
+        st.dataframe(
+            [{'stage': span['stage'], 'parent': span['parent'] or "", 'start (s)': round(span['start'], 3),
+              'duration (s)': round(span['seconds'], 3), 'error': span['error'] or ""} for span in data['spans']],
+            use_container_width=True
+        )
+        if data['tokens']:
+            st.write("**Token usage**")
+            st.dataframe(
+                [{'model': model_name, 'prompt': usage['prompt'], 'completion': usage['completion']} for model_name, usage in data['tokens'].items()],
+                use_container_width=True
+            )
+        service_url = os.getenv("API_SERVICE_URL")
+        st.write("**Service metrics**" if service_url else "**Process metrics**")
+        st.code(get_service_client(service_url).metrics() if service_url else prometheus_text(), language="text")
+
+def analysis_events(pdf, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL):
+    """
+    JSONEvents of one analysis: streamed resume fields (after a "reset"
+    event a fallback model streams them again), a "stage" event with
+    the validated resume data once matching starts, then the result as a
+    dict. Runs on the API service when API_SERVICE_URL is set, otherwise in
+    this process.
+    """
+    service_url = os.getenv("API_SERVICE_URL")
+    if service_url:
+        from service_client import get_service_client
+        yield from get_service_client(service_url).stream_analyse(pdf)
+        return
+
+    from pipeline import run_pipeline, stream_sync
+    for event in stream_sync(lambda on_event: run_pipeline(pdf, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL, on_event=on_event)):
+        yield JSONEvent('result', None, event.value.to_dict()) if event.kind == 'result' else event
+
+def process_resume(pdf, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL):
+    st.info("Processing your resume...")
+
+    slots = create_resume_slots()
+    partial = {}
+    result = None
+    data_dict = None
+    events = analysis_events(pdf, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL)
     
+    # Fields render as soon as the model has streamed them
     with st.spinner("Extracting information from your resume..."):
-        data_dict = extract_education_skills_name(resume_text, API_KEY, MODEL_NAME, API_URL, FALLBACK_MODEL)
-    
+        for event in events:
+            if event.kind == 'result':
+                result = event.value
+                break
+            elif event.kind == 'stage':
+                data_dict = event.value
+                break
+            elif event.kind == 'reset':
+                # Another model starts over after the first failed mid-stream
+                partial.clear()
+                for slot in slots.values():
+                    slot.empty()
+            elif event.kind == 'item':
+                partial.setdefault(event.key, []).append(event.value)
+                render_resume_field(slots, event.key, partial[event.key])
+            else:
+                partial[event.key] = event.value
+                render_resume_field(slots, event.key, event.value)
+
+    if result is not None:
+        st.session_state['trace'] = result['trace']
+        for slot in slots.values():
+            slot.empty()
+
+    if result is not None and result['failed_stage'] == 'parse':
+        if result['resume_text'] is None:
+            st.error(f"❌ Error loading PDF file: {result['error']}")
+            st.error("Please ensure the file is a valid PDF document.")
+        else:
+            st.error("Failed to extract text from PDF. The file might be:")
+            st.error("• Empty or corrupted")
+            st.error("• Password protected")
+            st.error("• An image-based PDF (needs OCR)")
+            st.info("Please ensure your resume is a text-based PDF with at least 50 characters.")
+        return False
+
     # Check if extraction failed
     if data_dict is None:
         st.error("❌ Failed to extract information from your resume. This could be due to:")
@@ -63,95 +188,28 @@ def process_resume(pdf_path, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL):
         st.info("Please try again later or check your OpenRouter API status at https://openrouter.ai/")
         return False
 
-    USER_NAME = None
-    USER_ROLE = None
-    USER_EDUCATION_LIST = []
-    USER_EXPERIENCE_LIST = []
-    USER_SKILL_LIST = []
+    USER_NAME = data_dict.get('name')
 
-    if data_dict and data_dict.get('name') is not None:
-        USER_NAME = data_dict['name']
-
-    if data_dict and data_dict.get('job_role') is not None:
-        USER_ROLE = data_dict['job_role']
-    
-    if data_dict and data_dict.get('education') and len(data_dict['education']) > 0:
-        USER_EDUCATION_LIST = data_dict['education']
+    # Re-render from the validated result, which may differ from what was
+    # streamed (e.g. after falling back to another model)
+    for key in ('name', 'job_role', 'education', 'experience', 'skills'):
+        render_resume_field(slots, key, data_dict.get(key))
     
-    if data_dict and data_dict.get('experience') and len(data_dict['experience']) > 0:
-        USER_EXPERIENCE_LIST = data_dict['experience']
-    
-    if data_dict and data_dict.get('skills') and len(data_dict['skills']) > 0:
-        USER_SKILL_LIST = data_dict['skills']
+    with st.spinner("Finding relevant job matches and generating skill recommendations..."):
+        for event in events:
+            if event.kind == 'result':
+                result = event.value
+    st.session_state['trace'] = result['trace']
 
-    
-    # Display extracted information
-    st.subheader("Your Resume Information")
-    st.write(f"**Name:** {USER_NAME if USER_NAME else 'Not specified'}")
-    st.write(f"**Job Role:** {USER_ROLE if USER_ROLE else 'Not specified'}")
-    
-    if USER_EDUCATION_LIST:
-        st.write("**Education:**")
-        for edu in USER_EDUCATION_LIST:
-            st.write(f"- {edu}")
-    
-    if USER_EXPERIENCE_LIST:
-        st.write("**Experience:**")
-        for exp in USER_EXPERIENCE_LIST:
-            st.write(f"- {exp}")
-    
-    # Display skills in a grid layout
-    if USER_SKILL_LIST:
-        st.write("**Skills:**")
-        skill_grid = create_grid_layout(USER_SKILL_LIST, cols=4)
-        
-        for row in skill_grid:
-            cols = st.columns(4)
-            for i, skill in enumerate(row):
-                if skill:  # Skip empty cells
-                    cols[i].markdown(f"• {skill}")
-    
-    skills_str = ", ".join(USER_SKILL_LIST) if USER_SKILL_LIST else "Not specified"
-    education_str = " | ".join(USER_EDUCATION_LIST) if USER_EDUCATION_LIST else "Not specified"
-    experience_str = " | ".join(USER_EXPERIENCE_LIST) if USER_EXPERIENCE_LIST else "Not specified"
-    job_role_str = USER_ROLE if USER_ROLE else "Not specified"
+    if result['retrieval_error']:
+        st.warning(f"Could not retrieve job matches: {result['retrieval_error']}")
+        st.info("Continuing with skill recommendations based on your profile...")
 
-    with st.spinner("Finding relevant job matches..."):
-        try:
-            retriever = JobRetriever(top_k=5)
-        
-            results = retriever.retrieve_similar_jobs(
-                job_role_str=job_role_str,
-                skills_str=skills_str,
-                education_str=education_str,
-                experience_str=experience_str
-            )
-        except Exception as e:
-            st.warning(f"Could not retrieve job matches: {str(e)}")
-            st.info("Continuing with skill recommendations based on your profile...")
-            results = {'documents': [[]]}  # Empty results to continue
-    
-    retrieved_job_listings = []
-
-    if results and 'documents' in results and len(results['documents']) > 0:
-        for doc in results['documents'][0]:
-            retrieved_job_listings.append(doc)
-    
     # Warn if no jobs found (but continue with recommendation)
-    if not retrieved_job_listings:
+    if not result['job_postings']:
         st.warning("No matching job postings found in the database. Recommendations will be based on your profile only.")
 
-    with st.spinner("Generating skill recommendations..."):
-        recommended_skills_json = recommend_skills(
-            user_skills=USER_SKILL_LIST,
-            user_education=USER_EDUCATION_LIST,
-            user_experience=USER_EXPERIENCE_LIST,
-            job_postings=retrieved_job_listings,
-            API_KEY=API_KEY,
-            API_URL= API_URL,
-            MODEL_NAME=MODEL_NAME,
-            FALLBACK_MODEL=FALLBACK_MODEL
-        )
+    recommended_skills_json = result['recommendations']
     
     # Check if recommendation generation failed
     if recommended_skills_json is None:
@@ -161,7 +219,10 @@ def process_resume(pdf_path, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL):
         st.error("• Network connectivity issues")
         st.info("Please try again later or check your OpenRouter API status at https://openrouter.ai/")
         return False
-    
+
+    if result.get('recommendation_source') == 'local':
+        st.info("The AI model is unavailable right now, these recommendations come from the skills most requested in your matching job postings.")
+
     # Display recommended skills in a grid layout with colored boxes
     st.subheader(f"Recommended Skills for {USER_NAME if USER_NAME else 'You'}")
     
@@ -186,6 +247,8 @@ def main():
     API_KEY = os.getenv("OPENROUTER_API_KEY", None)
     MODEL_NAME = os.getenv("MODEL_NAME", None)
     FALLBACK_MODEL = os.getenv("FALLBACK_MODEL_NAME", None)
+    # Thin client mode: the API service holds the model and the LLM credentials
+    SERVICE_URL = os.getenv("API_SERVICE_URL", None)
 
     st.set_page_config(page_title="UpskillR", page_icon="📝", layout="wide")
     
@@ -193,7 +256,7 @@ def main():
     st.write("Upload your resume and get personalized skill recommendations")
     
     # Validate required environment variables
-    if not API_KEY or not API_URL or not MODEL_NAME:
+    if not SERVICE_URL and (not API_KEY or not API_URL or not MODEL_NAME):
         st.error("**Configuration Error**: Missing required environment variables!")
         st.error("Please ensure the following are set in your `.env` file:")
         if not API_KEY:
@@ -204,33 +267,41 @@ def main():
             st.error("• `MODEL_NAME` - Primary model name")
         st.info("Copy `.env.example` to `.env` and add your API key. See QUICKSTART.md for help.")
         return
+
+    # Load the embedding model and open the job database once per process,
+    # in the background while the user picks a file.
+    if not SERVICE_URL:
+        warm_up_status = start_warm_up()
+        if warm_up_status['error']:
+            st.warning(f"Could not pre-load the job matching model: {warm_up_status['error']}")
+        elif not warm_up_status['done'].is_set():
+            st.caption("Loading the job matching model in the background...")
     
     uploaded_file = st.file_uploader("Upload your resume (PDF format)", type=["pdf"])
     
     if uploaded_file is not None:
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_path = tmp_file.name
-        
+        from service_client import ServiceBusy
+
         try:
-            # Process the resume
+            # Process the resume straight from the uploaded bytes, no temp file needed
             process_resume(
-                tmp_path, 
+                uploaded_file.getvalue(), 
                 API_URL=API_URL, 
                 API_KEY=API_KEY, 
                 MODEL_NAME=MODEL_NAME,
                 FALLBACK_MODEL=FALLBACK_MODEL
             )
+        except ServiceBusy as e:
+            wait = f" in about {e.retry_after:.0f} seconds" if e.retry_after else " shortly"
+            st.warning(f"The analysis service is {'starting up' if e.starting else 'busy'}. Please try again{wait}.")
         except Exception as e:
             st.error(f"An unexpected error occurred: {str(e)}")
             st.error("Please try again or contact support if the issue persists.")
-        finally:
-            # Clean up the temporary file (always executes)
-            try:
-                os.unlink(tmp_path)
-            except Exception:
-                pass  # Ignore cleanup errors
+
+        trace = st.session_state.pop('trace', None)
+        # Per-stage timings and token usage under the results
+        if trace is not None and os.getenv("DEBUG_PANEL", "false").lower() == "true":
+            render_debug_panel(trace)
     else:
         st.info("Please upload your resume to get started.")
 
@@ -0,0 +1,316 @@
+"""
+Headless batch mode for screening many resumes at once.
+
+    python app/batch.py data/resumes --output results.jsonl
+    python app/batch.py --manifest cohort.txt --concurrency 8
+
+PDFs are parsed in a process pool, extraction calls run with a bounded
+concurrency limit, all profile queries of a wave are embedded in one encode
+call and sent to Chroma as a single multi-query request, and the extracted
+and recommended skills of a wave are mapped to taxonomy IDs in one pass. One
+JSON line with
+per-stage timings is written per resume; --metrics-out also writes the stage
+histograms and token counts in Prometheus text format.
+
+--recommender local recommends from the skill statistics written by seed_db
+instead of the LLM, for high-volume runs; with the default (llm), resumes
+whose LLM recommendation fails fall back to them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+
+from resume_parser.pdf_parsing import load_pdf
+from resume_parser.detail_extraction import aextract_education_skills_name
+from rag_components.generator import arecommend_skills
+from rag_components.registry import get_retriever, get_skill_taxonomy
+from rag_components.keyword_index import FILTER_FIELDS
+from pipeline import profile_strings, recommend_locally, SKILL_TAXONOMY_ENABLED, LOCAL_RECOMMENDER_FALLBACK
+from cache import get_embedding_cache
+import tracing
+
+
+def collect_pdf_paths(directory=None, manifest=None) -> list:
+    """PDFs from a directory (recursively) or from a manifest with one path per line."""
+    paths = []
+    if directory:
+        paths.extend(sorted(Path(directory).rglob("*.pdf")))
+    if manifest:
+        manifest = Path(manifest)
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                path = Path(line)
+                # Relative entries are resolved against the manifest's folder
+                paths.append(path if path.is_absolute() else manifest.parent / path)
+    return paths
+
+
+def _parse_pdf(path: str):
+    """Process pool worker: returns (text, seconds, error)."""
+    start = time.perf_counter()
+    try:
+        # Resumes are already spread across processes, keep each one on a single worker
+        return load_pdf(path, parallel=False), time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, str(e)
+
+
+async def _extract(record: dict, semaphore: asyncio.Semaphore, config: dict):
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            record['resume_data'] = await aextract_education_skills_name(
+                record.pop('_resume_text'), config['API_KEY'], config['MODEL_NAME'], config['API_URL'], config['FALLBACK_MODEL']
+            )
+        except Exception as e:
+            record['resume_data'] = None
+            record['error'] = str(e)
+        record['timings']['extract'] = time.perf_counter() - start
+        if record['resume_data'] is None and not record.get('error'):
+            record['error'] = "Extraction failed"
+
+
+async def _recommend(record: dict, semaphore: asyncio.Semaphore, config: dict):
+    resume_data = record['resume_data']
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            record['recommendations'] = await arecommend_skills(
+                user_skills=resume_data.get('skills') or [],
+                user_education=resume_data.get('education') or [],
+                user_experience=resume_data.get('experience') or [],
+                job_postings=record['job_postings'],
+                job_scores=record.get('job_scores'),
+                API_KEY=config['API_KEY'],
+                MODEL_NAME=config['MODEL_NAME'],
+                API_URL=config['API_URL'],
+                FALLBACK_MODEL=config['FALLBACK_MODEL']
+            )
+        except Exception as e:
+            record['error'] = str(e)
+        record['timings']['recommend'] = time.perf_counter() - start
+        if record.get('recommendations') is None and not record.get('error'):
+            record['error'] = "Recommendation failed"
+        if record.get('recommendations') is not None:
+            record['recommendation_source'] = "llm"
+
+
+def _recommend_locally(records: list):
+    """Recommendations from the skill statistics for every record, in one worker thread."""
+    for record in records:
+        start = time.perf_counter()
+        try:
+            with tracing.stage('local_recommend'):
+                recommendations = recommend_locally(record['resume_data'], record['job_ids'], record['job_scores'], record['_job_titles'])
+        except Exception as e:
+            print(f"Local recommendation failed: {e}")
+            # An LLM fallback keeps the LLM's error, which came first
+            record['error'] = record.get('error') or str(e)
+            continue
+        finally:
+            record['timings']['local_recommend'] = time.perf_counter() - start
+        if recommendations is None:
+            record['error'] = record.get('error') or "Local recommendation failed"
+            continue
+        record['recommendations'] = recommendations
+        record['recommendation_source'] = "local"
+        record['error'] = None
+
+
+async def process_wave(paths: list, executor: ProcessPoolExecutor, config: dict, concurrency: int, top_k: int, recommend: bool, filters: Optional[dict] = None, recommender: str = "llm") -> list:
+    """Run one wave of resumes through every stage and return their result records."""
+    loop = asyncio.get_running_loop()
+    records = [{'path': str(path), 'timings': {}, 'error': None} for path in paths]
+
+    # Parse every PDF of the wave in the process pool
+    parsed = await asyncio.gather(*[loop.run_in_executor(executor, _parse_pdf, str(path)) for path in paths])
+    for record, (text, seconds, error) in zip(records, parsed):
+        record['timings']['parse'] = seconds
+        # Parsing ran in worker processes, whose own metrics are lost
+        tracing.observe('load_pdf', seconds)
+        if error:
+            record['error'] = f"Error loading PDF file: {error}"
+        elif not text or len(text.strip()) < 50:
+            record['error'] = "Too little text extracted from PDF"
+        else:
+            record['_resume_text'] = text
+
+    semaphore = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*[_extract(record, semaphore, config) for record in records if '_resume_text' in record])
+
+    ready = [record for record in records if record.get('resume_data')]
+    if not ready:
+        return records
+
+    # One encode batch and one multi-query Chroma request for the whole wave
+    start = time.perf_counter()
+    try:
+        retriever = get_retriever(top_k=top_k)
+        results = await asyncio.to_thread(
+            retriever.retrieve_similar_jobs_batch,
+            [profile_strings(record['resume_data']) for record in ready],
+            filters
+        )
+        documents = results.get('documents') or [[] for _ in ready]
+        ids = results.get('ids') or [[] for _ in ready]
+        scores = results.get('scores') or [[] for _ in ready]
+        metadatas = results.get('metadatas') or [[] for _ in ready]
+    except Exception as e:
+        print(f"Could not retrieve job matches: {e}")
+        documents = ids = scores = metadatas = [[] for _ in ready]
+    retrieve_seconds = (time.perf_counter() - start) / len(ready)
+
+    for record, docs, doc_ids, doc_scores, doc_metadatas in zip(ready, documents, ids, scores, metadatas):
+        record['job_postings'] = list(docs)
+        record['job_ids'] = list(doc_ids)
+        record['job_scores'] = list(doc_scores)
+        record['_job_titles'] = [(metadata or {}).get('title') or "" for metadata in doc_metadatas]
+        # The batched query is shared, report each resume's share of it
+        record['timings']['retrieve'] = retrieve_seconds
+
+    if recommend and recommender == "local":
+        await asyncio.to_thread(_recommend_locally, ready)
+    elif recommend:
+        await asyncio.gather(*[_recommend(record, semaphore, config) for record in ready])
+        failed = [record for record in ready if record.get('recommendations') is None]
+        if failed and LOCAL_RECOMMENDER_FALLBACK:
+            await asyncio.to_thread(_recommend_locally, failed)
+
+    if SKILL_TAXONOMY_ENABLED:
+        await _map_skills(ready)
+
+    return records
+
+
+async def _map_skills(records: list):
+    """Taxonomy IDs for the skills and recommendations of every record, one encode batch for the wave."""
+    skill_lists = []
+    for record in records:
+        skill_lists.append(record['resume_data'].get('skills') or [])
+        skill_lists.append((record.get('recommendations') or {}).get('recommended_skills') or [])
+
+    start = time.perf_counter()
+    try:
+        with tracing.stage('normalize_skills'):
+            mapped = await asyncio.to_thread(lambda: get_skill_taxonomy().map_lists(*skill_lists))
+    except Exception as e:
+        print(f"Could not map skills to the taxonomy: {e}")
+        return
+    seconds = (time.perf_counter() - start) / len(records)
+
+    for i, record in enumerate(records):
+        record['skill_ids'], record['recommended_skill_ids'] = mapped[2 * i], mapped[2 * i + 1]
+        record['timings']['normalize_skills'] = seconds
+
+
+async def run_batch(paths: list, output: Path, config: dict, workers: int, concurrency: int, wave_size: int, top_k: int, recommend: bool, filters: Optional[dict] = None, recommender: str = "llm"):
+    processed = 0
+    failed = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(output, 'w') as out:
+        for i in range(0, len(paths), wave_size):
+            wave_start = time.perf_counter()
+            records = await process_wave(paths[i:i + wave_size], executor, config, concurrency, top_k, recommend, filters, recommender)
+            wave_seconds = time.perf_counter() - wave_start
+
+            for record in records:
+                record.pop('_resume_text', None)
+                record.pop('_job_titles', None)
+                record['timings']['wave'] = wave_seconds
+                out.write(json.dumps(record) + "\n")
+                processed += 1
+                failed += record['error'] is not None
+            out.flush()
+
+            elapsed = time.perf_counter() - started
+            print(f"Processed {processed}/{len(paths)} resumes ({failed} failed, {processed / max(elapsed, 1e-9):.2f} resumes/s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a batch of resume PDFs and write results as JSONL.")
+    parser.add_argument('directory', nargs='?', help="Directory searched recursively for PDFs")
+    parser.add_argument('--manifest', help="Text file listing one PDF path per line")
+    parser.add_argument('--output', type=Path, default=Path('batch_results.jsonl'), help="JSONL output file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="Processes used for PDF parsing")
+    parser.add_argument('--concurrency', type=int, default=4, help="Maximum LLM requests in flight")
+    parser.add_argument('--wave-size', type=int, default=64, help="Resumes embedded and queried together")
+    parser.add_argument('--top-k', type=int, default=5, help="Job postings retrieved per resume")
+    parser.add_argument('--no-recommend', action='store_true', help="Stop after job retrieval")
+    parser.add_argument('--recommender', choices=('llm', 'local'), default='llm',
+                        help="Recommend skills with the LLM, or locally from the skill statistics written by seed_db")
+    parser.add_argument('--filter', action='append', default=[], metavar='FIELD=VALUE',
+                        help="Only match postings whose title, location or seniority equals VALUE; repeat a field to allow several values")
+    parser.add_argument('--metrics-out', type=Path, help="Write stage latency histograms and token counts here (Prometheus text format)")
+    args = parser.parse_args(argv)
+    if not args.directory and not args.manifest:
+        parser.error("give a directory or --manifest")
+    args.filters = parse_filters(parser, args.filter)
+    return args
+
+
+def parse_filters(parser, items: list) -> Optional[dict]:
+    filters = {}
+    for item in items:
+        field, sep, value = item.partition('=')
+        if not sep or field not in FILTER_FIELDS:
+            parser.error(f"--filter expects FIELD=VALUE with FIELD one of {', '.join(FILTER_FIELDS)}")
+        filters.setdefault(field, []).append(value)
+    return {field: values[0] if len(values) == 1 else values for field, values in filters.items()} or None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if not os.getenv("PRODUCTION"):
+        load_dotenv()
+
+    config = {
+        'API_URL': os.getenv("API_URL", None),
+        'API_KEY': os.getenv("OPENROUTER_API_KEY", None),
+        'MODEL_NAME': os.getenv("MODEL_NAME", None),
+        'FALLBACK_MODEL': os.getenv("FALLBACK_MODEL_NAME", None)
+    }
+    missing = [name for name in ('API_URL', 'API_KEY', 'MODEL_NAME') if not config[name]]
+    if missing:
+        raise SystemExit(f"Missing required environment variables for: {', '.join(missing)}")
+
+    paths = collect_pdf_paths(args.directory, args.manifest)
+    if not paths:
+        raise SystemExit("No PDF files found.")
+
+    print(f"Processing {len(paths)} resumes...")
+    asyncio.run(run_batch(
+        paths, args.output, config,
+        workers=args.workers,
+        concurrency=args.concurrency,
+        wave_size=args.wave_size,
+        top_k=args.top_k,
+        recommend=not args.no_recommend,
+        filters=args.filters,
+        recommender=args.recommender
+    ))
+    print(f"Results written to {args.output}")
+    if args.metrics_out:
+        tracing.write_prometheus(args.metrics_out)
+        print(f"Metrics written to {args.metrics_out}")
+
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        stats = embedding_cache.stats()
+        print(f"Query embedding cache: {stats['hit_rate']:.0%} hit rate "
+              f"({stats['memory_hits']} memory, {stats['disk_hits']} disk, {stats['misses']} misses)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""
+Persistent cache for LLM results, plus an LRU cache for query embeddings.
+Entries are keyed by a content hash so the same resume (or the same
+recommendation inputs) never pays for a second OpenRouter round trip, and a
+repeated retrieval query is not embedded twice.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / 'cache' / 'results.sqlite3'
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_EMBEDDING_CACHE_PATH = Path(__file__).resolve().parent.parent / 'cache' / 'embeddings.sqlite3'
+DEFAULT_EMBEDDING_MEMORY_ENTRIES = 1024
+DEFAULT_EMBEDDING_DISK_ENTRIES = 50000
+
+
+def make_key(*parts: str) -> str:
+    """Hash the given parts (text, model name, prompt version, ...) into a cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = (part or "").encode("utf-8")
+        # Length-prefix every part so ("ab", "c") and ("a", "bc") differ
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def prompt_version(*templates: str) -> str:
+    """Short fingerprint of prompt templates; editing a prompt invalidates old entries."""
+    return make_key(*templates)[:12]
+
+
+class ResultCache:
+    """
+    SQLite-backed key/value cache with a TTL and LRU eviction.
+    Values are JSON payloads grouped by namespace (e.g. "resume_data").
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " namespace TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str):
+        """Return the cached payload, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ? AND namespace = ?",
+                (key, namespace)
+            ).fetchone()
+
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses[namespace] = self.misses.get(namespace, 0) + 1
+                return None
+
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+
+        return json.loads(row[0])
+
+    def put(self, namespace: str, key: str, value):
+        """Store a JSON-serialisable payload, evicting the least recently used entries if full."""
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, namespace, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, payload, now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if self.max_entries and count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete every expired entry and return how many were removed."""
+        if not self.ttl_seconds:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters per namespace plus the current number of stored entries."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        namespaces = set(self.hits) | set(self.misses)
+        per_namespace = {}
+        for namespace in sorted(namespaces):
+            hits = self.hits.get(namespace, 0)
+            misses = self.misses.get(namespace, 0)
+            per_namespace[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0
+            }
+        return {"entries": size, "namespaces": per_namespace}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Return the process-wide result cache configured from the environment,
+    or None when RESULT_CACHE_ENABLED is set to false.
+    """
+    global _cache
+    if os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    path=os.getenv("RESULT_CACHE_PATH", str(DEFAULT_CACHE_PATH)),
+                    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+                )
+    return _cache
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class EmbeddingCache:
+    """
+    Two-level cache for query embeddings: an in-process LRU dict in front of
+    an optional SQLite file, so warm queries survive restarts. Keys hash the
+    whitespace-normalised text together with the model fingerprint, so
+    switching models or backends never returns stale vectors.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_EMBEDDING_MEMORY_ENTRIES, path=None, max_disk_entries: int = DEFAULT_EMBEDDING_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            self.path = Path(path)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " vector BLOB NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+            self._conn.commit()
+
+    @staticmethod
+    def key(text: str, model_fingerprint: str) -> str:
+        # The tokenizer ignores whitespace runs, so they must not split the cache
+        return make_key(_WHITESPACE.sub(" ", text).strip(), model_fingerprint)
+
+    def get_many(self, keys: list) -> list:
+        """Cached vectors in the order of keys, None where missing."""
+        found = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    found[i] = vector
+                    self.memory_hits += 1
+
+            if missing and self._conn is not None:
+                now = time.time()
+                for i in missing:
+                    row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (keys[i],)).fetchone()
+                    if row is None:
+                        continue
+                    found[i] = np.frombuffer(row[0], dtype=np.float32)
+                    self._conn.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (now, keys[i]))
+                    self._remember(keys[i], found[i])
+                    self.disk_hits += 1
+                self._conn.commit()
+
+            self.misses += sum(1 for vector in found if vector is None)
+        return found
+
+    def put_many(self, keys: list, vectors):
+        with self._lock:
+            now = time.time()
+            rows = []
+            for key, vector in zip(keys, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes(), now))
+
+            if self._conn is not None and rows:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows)
+                count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                if self.max_disk_entries and count > self.max_disk_entries:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                        (count - self.max_disk_entries,)
+                    )
+                self._conn.commit()
+
+    def _remember(self, key: str, vector):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] if self._conn is not None else 0
+            return {
+                "memory_entries": len(self._entries),
+                "disk_entries": disk_entries,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+_embedding_cache = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Return the process-wide query embedding cache configured from the
+    environment, or None when EMBEDDING_CACHE_ENABLED is set to false. The
+    SQLite layer is only used when EMBEDDING_CACHE_DISK is true.
+    """
+    global _embedding_cache
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    if _embedding_cache is None:
+        with _cache_lock:
+            if _embedding_cache is None:
+                use_disk = os.getenv("EMBEDDING_CACHE_DISK", "false").lower() in ("1", "true", "yes")
+                _embedding_cache = EmbeddingCache(
+                    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", DEFAULT_EMBEDDING_MEMORY_ENTRIES)),
+                    path=os.getenv("EMBEDDING_CACHE_PATH", str(DEFAULT_EMBEDDING_CACHE_PATH)) if use_disk else None,
+                    max_disk_entries=int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", DEFAULT_EMBEDDING_DISK_ENTRIES))
+                )
+    return _embedding_cache
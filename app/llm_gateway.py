@@ -0,0 +1,671 @@
+"""
+Shared gateway for every OpenRouter call.
+
+Clients are created once per endpoint, so every call shares the client's
+keep-alive HTTP connection pool instead of opening new connections. Each
+request goes through a client-side token bucket, a per-model circuit
+breaker, and retries with exponential backoff and jitter that honour the
+server's Retry-After header.
+"""
+
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Callable, Optional
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from tracing import record_token_usage
+
+DEFAULT_HEADERS = {
+    "HTTP-Referer": "https://github.com/hardikprakash/upskillr",
+    "X-Title": "Upskillr"
+}
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 1.0))
+BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 30.0))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("LLM_RATE_LIMIT_PER_MINUTE", 20))
+RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", 5))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 60.0))
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 90))
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", 15.0))
+# Streamed requests race on time to first token, which is much shorter
+HEDGE_FIRST_TOKEN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_FIRST_TOKEN_DELAY_SECONDS", 5.0))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", 2.0))
+HEDGE_MAX_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MAX_DELAY_SECONDS", 60.0))
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: refills rate_per_minute tokens per minute up to
+    capacity, each request takes one token.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0 or self.rate <= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker. After failure_threshold consecutive failures the
+    circuit opens and requests fail fast until reset_seconds have passed; then
+    one trial request is let through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.open_until = 0.0
+        self.half_open = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if time.monotonic() < self.open_until:
+                return False
+            if self.open_until and not self.half_open:
+                # Cool-down is over, let a single trial request through
+                self.half_open = True
+                return True
+            return not self.half_open
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.half_open = False
+
+    def release(self):
+        """
+        Give up a half-open trial slot without a verdict, e.g. when the request
+        was cancelled or failed for a reason unrelated to the model's health.
+        """
+        with self._lock:
+            self.half_open = False
+
+    def record_failure(self, open_for: Optional[float] = None):
+        with self._lock:
+            self.failures += 1
+            if self.half_open or self.failures >= self.failure_threshold or open_for:
+                self.open_until = time.monotonic() + max(open_for or 0.0, self.reset_seconds)
+                self.half_open = False
+
+    @property
+    def state(self) -> str:
+        if time.monotonic() < self.open_until:
+            return "open"
+        return "half-open" if self.open_until else "closed"
+
+
+class ModelStats:
+    """Rolling latency windows and hedging win/loss counters for one model."""
+
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        # Time to the first streamed token
+        self.first_tokens = deque(maxlen=window)
+        self.wins = 0
+        self.losses = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def record_first_token(self, seconds: float):
+        with self._lock:
+            self.first_tokens.append(seconds)
+
+    def record_outcome(self, wins: int = 0, losses: int = 0, failures: int = 0):
+        with self._lock:
+            self.wins += wins
+            self.losses += losses
+            self.failures += failures
+
+    def percentile(self, p: float, first_token: bool = False) -> Optional[float]:
+        """
+        p-th percentile of recent successful latencies (or times to first
+        token), None until enough samples exist.
+        """
+        with self._lock:
+            samples = sorted(self.first_tokens if first_token else self.latencies)
+        if len(samples) < 5:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests, wins, losses, failures = len(self.latencies), self.wins, self.losses, self.failures
+        return {
+            "requests": requests,
+            "wins": wins,
+            "losses": losses,
+            "failures": failures,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99)
+        }
+
+
+_lock = threading.Lock()
+_stats = {}
+_clients = {}
+_buckets = {}
+_breakers = {}
+# httpx async connection pools are bound to the event loop that created them,
+# so async clients are kept per loop and dropped together with it.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _base_url(API_URL: str) -> str:
+    return API_URL.replace("/chat/completions", "")  # Remove endpoint from base URL
+
+
+def get_client(API_URL: str, API_KEY: str) -> OpenAI:
+    """Return the process-wide synchronous client for this endpoint and key."""
+    key = (_base_url(API_URL), API_KEY)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    base_url=key[0],
+                    api_key=API_KEY,
+                    default_headers=DEFAULT_HEADERS,
+                    max_retries=0  # Retries are handled here, with rate-limit awareness
+                )
+                _clients[key] = client
+    return client
+
+
+def get_async_client(API_URL: str, API_KEY: str) -> AsyncOpenAI:
+    """Return the async client for this endpoint and key on the running event loop."""
+    loop = asyncio.get_running_loop()
+    key = (_base_url(API_URL), API_KEY)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                base_url=key[0],
+                api_key=API_KEY,
+                default_headers=DEFAULT_HEADERS,
+                max_retries=0
+            )
+            clients[key] = client
+    return client
+
+
+def get_rate_limiter(API_URL: str, API_KEY: str) -> TokenBucket:
+    """One token bucket per endpoint and key, shared by every model behind it."""
+    key = (_base_url(API_URL), API_KEY)
+    with _lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+            _buckets[key] = bucket
+    return bucket
+
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    with _lock:
+        breaker = _breakers.get(model_name)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _breakers[model_name] = breaker
+    return breaker
+
+
+def get_model_stats(model_name: str) -> ModelStats:
+    with _lock:
+        stats = _stats.get(model_name)
+        if stats is None:
+            stats = ModelStats()
+            _stats[model_name] = stats
+    return stats
+
+
+def model_stats() -> dict:
+    """Latency and hedging win/loss statistics for every model used so far."""
+    with _lock:
+        models = dict(_stats)
+    return {model_name: stats.snapshot() for model_name, stats in models.items()}
+
+
+def hedging_enabled(hedge: Optional[bool] = None) -> bool:
+    """Explicit argument wins, otherwise the LLM_HEDGING environment variable decides."""
+    if hedge is not None:
+        return hedge
+    return os.getenv("LLM_HEDGING", "false").lower() in ("1", "true", "yes")
+
+
+def hedge_delay(model_name: str, first_token: bool = False) -> float:
+    """
+    How long to wait on model_name (for its answer, or its first streamed
+    token) before firing the next model in parallel.
+    """
+    delay = get_model_stats(model_name).percentile(HEDGE_PERCENTILE, first_token)
+    if delay is None:
+        delay = HEDGE_FIRST_TOKEN_DELAY_SECONDS if first_token else HEDGE_DEFAULT_DELAY_SECONDS
+    return min(HEDGE_MAX_DELAY_SECONDS, max(HEDGE_MIN_DELAY_SECONDS, delay))
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, from Retry-After or retry-after-ms."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _classify(error: Exception) -> str:
+    """Map an OpenAI client exception to retryable / rate_limit / fatal."""
+    if isinstance(error, openai.RateLimitError):
+        return "rate_limit"
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return "retryable"
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code in (408, 409) or error.status_code >= 500:
+            return "retryable"
+        return "fatal"
+    return "fatal"
+
+
+def _report_error(model_name: str, error: Exception):
+    status = getattr(error, "status_code", None)
+    if isinstance(error, openai.RateLimitError):
+        print(f"⚠️ OpenRouter API rate limit reached for {model_name}. Please try again later or upgrade your plan.")
+    elif status == 402:
+        print(f"⚠️ OpenRouter API credits exhausted for {model_name}. Please add credits to your account.")
+    elif status == 400:
+        print(f"⚠️ Bad request for {model_name}: {error}")
+    else:
+        print(f"Error making request with {model_name}: {error}")
+
+
+def _backoff_delay(attempt: int, error: Exception) -> Optional[float]:
+    """
+    Delay before retry number attempt, or None when the request should not be
+    retried (fatal error, or the server asked for a longer pause than we allow).
+    """
+    kind = _classify(error)
+    if kind == "fatal":
+        return None
+
+    # Full jitter: uniform in [0, base * 2^attempt], capped
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        if retry_after > BACKOFF_MAX_SECONDS:
+            return None
+        delay = retry_after + random.uniform(0, BACKOFF_BASE_SECONDS)
+    return delay
+
+
+def _record_failure(breaker: CircuitBreaker, error: Exception):
+    # A long Retry-After means the model is unusable for that long, open the circuit for it
+    retry_after = _retry_after(error) if _classify(error) == "rate_limit" else None
+    if retry_after is not None and retry_after > BACKOFF_MAX_SECONDS:
+        breaker.record_failure(open_for=retry_after)
+    elif _classify(error) != "fatal" or getattr(error, "status_code", None) == 402:
+        breaker.record_failure()
+    else:
+        # A bad request says nothing about the model, but a trial slot must not stay taken
+        breaker.release()
+
+
+def chat_completion(API_URL: str, API_KEY: str, model_name: str, **request):
+    """
+    Send a chat completion through the gateway.
+    Returns the response, or None once retries are exhausted, the error is not
+    retryable, or the model's circuit is open.
+    """
+    breaker = get_circuit_breaker(model_name)
+    if not breaker.allow():
+        print(f"⚠️ Skipping {model_name}: too many recent failures, circuit is {breaker.state}.")
+        return None
+
+    client = get_client(API_URL, API_KEY)
+    limiter = get_rate_limiter(API_URL, API_KEY)
+
+    # Every exit must settle a half-open trial, or the circuit never closes again
+    settled = False
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            limiter.acquire()
+            try:
+                response = client.chat.completions.create(model=model_name, **request)
+            except Exception as e:
+                delay = _backoff_delay(attempt, e)
+                if delay is None or attempt == MAX_RETRIES:
+                    _report_error(model_name, e)
+                    _record_failure(breaker, e)
+                    settled = True
+                    return None
+                print(f"Retrying {model_name} in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+                continue
+
+            breaker.record_success()
+            settled = True
+            record_token_usage(model_name, getattr(response, "usage", None))
+            return response
+    finally:
+        if not settled:
+            breaker.release()
+
+
+async def achat_completion(API_URL: str, API_KEY: str, model_name: str, **request):
+    """Async counterpart of chat_completion."""
+    breaker = get_circuit_breaker(model_name)
+    if not breaker.allow():
+        print(f"⚠️ Skipping {model_name}: too many recent failures, circuit is {breaker.state}.")
+        return None
+
+    client = get_async_client(API_URL, API_KEY)
+    limiter = get_rate_limiter(API_URL, API_KEY)
+
+    # Released on cancellation too, so the next request can be the trial
+    settled = False
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            await limiter.aacquire()
+            try:
+                response = await client.chat.completions.create(model=model_name, **request)
+            except Exception as e:
+                delay = _backoff_delay(attempt, e)
+                if delay is None or attempt == MAX_RETRIES:
+                    _report_error(model_name, e)
+                    _record_failure(breaker, e)
+                    settled = True
+                    return None
+                print(f"Retrying {model_name} in {delay:.1f}s after error: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            breaker.record_success()
+            settled = True
+            record_token_usage(model_name, getattr(response, "usage", None))
+            return response
+    finally:
+        if not settled:
+            breaker.release()
+
+
+async def astream_chat_completion(API_URL: str, API_KEY: str, model_name: str, **request):
+    """
+    Stream a chat completion through the gateway, yielding content deltas.
+    Opening the stream is retried like chat_completion; if the request fails
+    the generator simply ends, so callers must validate what they received.
+    """
+    breaker = get_circuit_breaker(model_name)
+    if not breaker.allow():
+        print(f"⚠️ Skipping {model_name}: too many recent failures, circuit is {breaker.state}.")
+        return
+
+    client = get_async_client(API_URL, API_KEY)
+    limiter = get_rate_limiter(API_URL, API_KEY)
+
+    # Also released when the consumer closes the generator early (GeneratorExit)
+    settled = False
+    stream = None
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            await limiter.aacquire()
+            try:
+                # The final chunk then carries the token usage of the whole stream
+                stream = await client.chat.completions.create(model=model_name, stream=True, stream_options={"include_usage": True}, **request)
+                break
+            except Exception as e:
+                delay = _backoff_delay(attempt, e)
+                if delay is None or attempt == MAX_RETRIES:
+                    _report_error(model_name, e)
+                    _record_failure(breaker, e)
+                    settled = True
+                    return
+                print(f"Retrying {model_name} in {delay:.1f}s after error: {e}")
+                await asyncio.sleep(delay)
+
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    record_token_usage(model_name, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            # Retrying mid-stream would duplicate output, let the caller fall back instead
+            _report_error(model_name, e)
+            _record_failure(breaker, e)
+            settled = True
+            return
+
+        breaker.record_success()
+        settled = True
+    finally:
+        if not settled:
+            breaker.release()
+        # Return the pooled connection, also when the consumer stopped early
+        # or the stream lost a hedge race and was cancelled
+        if stream is not None:
+            await stream.close()
+
+
+async def ahedged_request(API_URL: str, API_KEY: str, models: list, parse: Callable, **request):
+    """
+    Race models against each other. The first model starts immediately; if it
+    has not produced a valid answer within its hedge delay (a latency
+    percentile), the next model is fired in parallel. A model that fails
+    outright is replaced immediately. The first response that parse() accepts
+    wins and the others are cancelled.
+
+    parse(model_name, response) must return the validated result or None.
+    """
+    models = [model_name for model_name in models if model_name]
+    loop = asyncio.get_running_loop()
+
+    async def attempt(model_name):
+        start = loop.time()
+        response = await achat_completion(API_URL, API_KEY, model_name, **request)
+        result = parse(model_name, response) if response is not None else None
+        stats = get_model_stats(model_name)
+        if result is None:
+            stats.record_outcome(failures=1)
+        else:
+            stats.record_latency(loop.time() - start)
+        return result
+
+    def launch(model_name):
+        task = asyncio.ensure_future(attempt(model_name))
+        pending[task] = model_name
+
+    pending = {}
+    remaining = list(models)
+    launch(remaining.pop(0))
+
+    try:
+        while pending:
+            # Only the newest attempt's deadline matters for firing the next model
+            timeout = hedge_delay(list(pending.values())[-1]) if remaining else None
+            done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                model_name = remaining.pop(0)
+                print(f"No answer within hedge delay, racing fallback model ({model_name})...")
+                launch(model_name)
+                continue
+
+            for task in done:
+                model_name = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    print(f"Hedged request to {model_name} failed: {e}")
+                    result = None
+
+                if result is not None:
+                    get_model_stats(model_name).record_outcome(wins=1)
+                    for loser in pending.values():
+                        get_model_stats(loser).record_outcome(losses=1)
+                    return result
+
+            # Everything that finished failed, try the next model straight away
+            if remaining and not pending:
+                model_name = remaining.pop(0)
+                print(f"Trying fallback model ({model_name})...")
+                launch(model_name)
+
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def astream_hedged_chat_completion(API_URL: str, API_KEY: str, models: list, **request):
+    """
+    Streaming counterpart of ahedged_request, racing on time to first token.
+    The first model's stream opens immediately; if it has not produced a
+    token within its first-token hedge delay, the next model's stream is
+    opened in parallel. The first stream to produce a token wins, the others
+    are cancelled. Yields (model_name, delta) pairs, all from the winner;
+    with a single model this is astream_chat_completion. Like that, the
+    stream just ends when every model fails or the winner breaks off, so
+    callers must validate what they received.
+    """
+    models = [model_name for model_name in models if model_name]
+    if not models:
+        return
+    loop = asyncio.get_running_loop()
+    pending = {}
+    remaining = list(models)
+
+    def launch(model_name):
+        stream = astream_chat_completion(API_URL, API_KEY, model_name, **request)
+        pending[asyncio.ensure_future(stream.__anext__())] = (model_name, stream, loop.time())
+
+    launch(remaining.pop(0))
+    winner = None
+    try:
+        while pending and winner is None:
+            timeout = hedge_delay(list(pending.values())[-1][0], first_token=True) if remaining else None
+            done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                model_name = remaining.pop(0)
+                print(f"No first token within hedge delay, racing fallback model ({model_name})...")
+                launch(model_name)
+                continue
+
+            for task in done:
+                model_name, stream, start = pending.pop(task)
+                try:
+                    first = task.result()
+                except StopAsyncIteration:
+                    # The stream ended without output, the model failed
+                    get_model_stats(model_name).record_outcome(failures=1)
+                    continue
+                if winner is None:
+                    winner = (model_name, stream, first)
+                    get_model_stats(model_name).record_first_token(loop.time() - start)
+                else:
+                    # Both answered in the same step, keep the first
+                    await stream.aclose()
+
+            if winner is None and remaining and not pending:
+                model_name = remaining.pop(0)
+                print(f"Trying fallback model ({model_name})...")
+                launch(model_name)
+    finally:
+        # Cancelling the pending __anext__ also ends those streams (and
+        # releases their circuit breaker trial slots)
+        for task, (model_name, _, _) in pending.items():
+            task.cancel()
+            if winner is not None:
+                get_model_stats(model_name).record_outcome(losses=1)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if winner is None:
+        return
+    model_name, stream, first = winner
+    if len(models) > 1:
+        get_model_stats(model_name).record_outcome(wins=1)
+    try:
+        yield model_name, first
+        async for delta in stream:
+            yield model_name, delta
+    finally:
+        # Settles the winner's breaker slot even when the consumer stops early
+        await stream.aclose()
+
+
+def hedged_request(API_URL: str, API_KEY: str, models: list, parse: Callable, **request):
+    """
+    Synchronous wrapper around ahedged_request. It runs on the pipeline's
+    long-lived event loop, so the async clients and their connection pools
+    are reused across calls. It blocks the calling thread until the race is
+    decided, so async callers must await ahedged_request instead; calling
+    it from the pipeline loop raises RuntimeError.
+    """
+    # Imported here, pipeline depends on this module
+    from pipeline import run_sync
+    return run_sync(ahedged_request(API_URL, API_KEY, models, parse, **request))
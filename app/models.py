@@ -41,3 +41,17 @@ class SkillRecommendations(BaseModel):
         default_factory=list,
         description="List of skills the user should learn to become a stronger candidate (max 9 skills)"
     )
+
+
+class ResumeAnalysis(ResumeData, SkillRecommendations):
+    """
+    Merged schema of the single-call analysis: the resume fields and the
+    recommended skills in one object.
+    """
+
+    def split(self) -> tuple:
+        """(ResumeData dict, SkillRecommendations dict)"""
+        return (
+            self.model_dump(include=set(ResumeData.model_fields)),
+            self.model_dump(include=set(SkillRecommendations.model_fields))
+        )
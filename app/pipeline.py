@@ -0,0 +1,444 @@
+"""
+Asyncio-based resume pipeline.
+Runs PDF parsing, LLM extraction, job retrieval and skill recommendation with
+per-stage deadlines, and overlaps independent work (the embedding model warms
+up while extraction is in flight). Every run records its stage spans and token
+usage in a tracing.Trace.
+
+PIPELINE_MODE=single_call swaps the two sequential LLM calls for one: the
+postings are retrieved with the cleaned resume text right after parsing and
+a single request returns the resume fields and the recommendations.
+
+When the LLM recommendation fails or times out (rate limits, an open circuit
+breaker), the skills are recommended locally from the skill statistics
+written by seed_db, see rag_components/skill_stats.py.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Callable, Optional
+
+from resume_parser.pdf_parsing import load_pdf
+from resume_parser.detail_extraction import aextract_education_skills_name, astream_education_skills_name
+from streaming_json import JSONEvent
+from rag_components.generator import arecommend_skills, aanalyse_and_recommend, astream_analyse_and_recommend
+from rag_components.registry import get_retriever, get_skill_taxonomy, get_local_recommender, warm_up
+from models import ResumeAnalysis
+import tracing
+
+# "two_call" (extract, then retrieve and recommend) or "single_call"
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "two_call")
+PIPELINE_MODES = ("two_call", "single_call")
+# Map extracted and recommended skills to skill taxonomy IDs
+SKILL_TAXONOMY_ENABLED = os.getenv("SKILL_TAXONOMY_ENABLED", "true").lower() == "true"
+# Recommend from the skill statistics when the LLM recommendation fails
+LOCAL_RECOMMENDER_FALLBACK = os.getenv("LOCAL_RECOMMENDER_FALLBACK", "true").lower() == "true"
+
+
+@dataclass
+class StageDeadlines:
+    """Seconds each stage may take before the pipeline gives up on it."""
+    parse: float = 30.0
+    extract: float = 180.0
+    retrieve: float = 30.0
+    recommend: float = 180.0
+    # The combined extraction and recommendation call of single_call mode
+    analyse: float = 240.0
+
+
+@dataclass
+class PipelineResult:
+    resume_text: Optional[str] = None
+    resume_data: Optional[dict] = None
+    job_postings: list = field(default_factory=list)
+    # Posting ID and retrieval score of each posting, higher is better
+    job_ids: list = field(default_factory=list)
+    job_scores: list = field(default_factory=list)
+    recommendations: Optional[dict] = None
+    # "llm", or "local" when the skill statistics stood in for the LLM
+    recommendation_source: Optional[str] = None
+    # Skill taxonomy IDs of resume_data['skills'] and of the recommended
+    # skills, index for index; None where a skill has no taxonomy entry
+    skill_ids: list = field(default_factory=list)
+    recommended_skill_ids: list = field(default_factory=list)
+    # Name of the stage that stopped the pipeline, if any
+    failed_stage: Optional[str] = None
+    error: Optional[str] = None
+    # Retrieval failures are not fatal, recommendations continue without postings
+    retrieval_error: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+    trace: Optional[tracing.Trace] = None
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable form, as returned by the HTTP API."""
+        data = {f.name: getattr(self, f.name) for f in fields(self) if f.name != 'trace'}
+        data['trace'] = self.trace.to_dict() if self.trace is not None else None
+        return data
+
+
+def profile_strings(resume_data: Optional[dict]) -> dict:
+    """Format extracted resume fields the way the retrieval and prompt templates expect."""
+    resume_data = resume_data or {}
+    skills = resume_data.get('skills') or []
+    education = resume_data.get('education') or []
+    experience = resume_data.get('experience') or []
+    return {
+        'job_role_str': resume_data.get('job_role') or "Not specified",
+        'skills_str': ", ".join(skills) if skills else "Not specified",
+        'education_str': " | ".join(education) if education else "Not specified",
+        'experience_str': " | ".join(experience) if experience else "Not specified"
+    }
+
+
+def _map_skills(resume_data: Optional[dict], recommendations: Optional[dict]) -> list:
+    return get_skill_taxonomy().map_lists(
+        (resume_data or {}).get('skills') or [],
+        (recommendations or {}).get('recommended_skills') or []
+    )
+
+
+def recommend_locally(resume_data: Optional[dict], job_ids: list, job_scores: list, job_titles: list) -> Optional[dict]:
+    """
+    Recommendations from the skill statistics for the retrieved postings, or
+    None when seed_db has not written them.
+    """
+    recommender = get_local_recommender()
+    if recommender is None:
+        return None
+    skills = (resume_data or {}).get('skills') or []
+    user_skill_ids = [skill_id for skill_id in recommender.taxonomy.map_skills(skills) if skill_id]
+    recommendations = recommender.recommend(user_skill_ids, job_ids, job_scores, job_titles)
+    tracing.count("local_recommendations")
+    return recommendations
+
+
+async def _attach_skill_ids(result: PipelineResult):
+    """Fill in the taxonomy IDs of the extracted and recommended skills; failures are only logged."""
+    if not SKILL_TAXONOMY_ENABLED or (result.resume_data is None and result.recommendations is None):
+        return
+    try:
+        result.skill_ids, result.recommended_skill_ids = await _timed(
+            result, 'normalize_skills', asyncio.to_thread(_map_skills, result.resume_data, result.recommendations), None
+        )
+    except Exception as e:
+        print(f"Could not map skills to the taxonomy: {e}")
+
+
+async def _timed(result: PipelineResult, stage: str, awaitable, deadline: Optional[float]):
+    start = time.perf_counter()
+    try:
+        with tracing.stage(stage):
+            return await asyncio.wait_for(awaitable, timeout=deadline)
+    finally:
+        result.timings[stage] = time.perf_counter() - start
+
+
+# Fire-and-forget tasks must be referenced somewhere or they can be collected mid-flight
+_background_tasks = set()
+
+
+def _start_warm_up(result: PipelineResult):
+    async def _warm():
+        start = time.perf_counter()
+        try:
+            with tracing.stage('warm_up'):
+                await asyncio.to_thread(warm_up)
+        except Exception as e:
+            print(f"Embedding model warm-up failed: {e}")
+        finally:
+            result.timings['warm_up'] = time.perf_counter() - start
+
+    task = asyncio.ensure_future(_warm())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def _stream_extraction(resume_text: str, API_URL: str, API_KEY: str, MODEL_NAME: str, FALLBACK_MODEL: Optional[str], on_event: Callable):
+    resume_data = None
+    async for event in astream_education_skills_name(resume_text, API_KEY, MODEL_NAME, API_URL, FALLBACK_MODEL):
+        if event.kind == "result":
+            resume_data = event.value
+        else:
+            on_event(event)
+    return resume_data
+
+
+async def _parse(result: PipelineResult, pdf, deadlines: StageDeadlines) -> bool:
+    """Load the PDF into result.resume_text; False (with failed_stage set) if that failed."""
+    try:
+        result.resume_text = await _timed(result, 'parse', asyncio.to_thread(load_pdf, pdf), deadlines.parse)
+    except asyncio.TimeoutError:
+        result.failed_stage, result.error = 'parse', f"PDF parsing exceeded {deadlines.parse:.0f}s"
+        return False
+    except Exception as e:
+        result.failed_stage, result.error = 'parse', str(e)
+        return False
+
+    if not result.resume_text or len(result.resume_text.strip()) < 50:
+        result.failed_stage, result.error = 'parse', "Too little text extracted from PDF"
+        return False
+    return True
+
+
+async def analyse_resume(pdf, API_URL: str, API_KEY: str, MODEL_NAME: str, FALLBACK_MODEL: Optional[str] = None, deadlines: Optional[StageDeadlines] = None, result: Optional[PipelineResult] = None, on_event: Optional[Callable] = None) -> PipelineResult:
+    """
+    Parse the PDF (a file path or raw bytes) and extract structured resume data.
+    The retriever warms up in the background so the next stage finds it ready.
+    When on_event is given the extraction is streamed and on_event receives a
+    JSONEvent for every field and list item as it arrives.
+    """
+    deadlines = deadlines or StageDeadlines()
+    result = result or PipelineResult()
+    result.trace = tracing.bind(result.trace or tracing.Trace("resume"))
+
+    _start_warm_up(result)
+
+    if not await _parse(result, pdf, deadlines):
+        return result
+
+    if on_event is None:
+        extraction = aextract_education_skills_name(result.resume_text, API_KEY, MODEL_NAME, API_URL, FALLBACK_MODEL)
+    else:
+        extraction = _stream_extraction(result.resume_text, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL, on_event)
+
+    try:
+        result.resume_data = await _timed(result, 'extract', extraction, deadlines.extract)
+    except asyncio.TimeoutError:
+        result.failed_stage, result.error = 'extract', f"Extraction exceeded {deadlines.extract:.0f}s"
+        return result
+
+    if result.resume_data is None:
+        result.failed_stage, result.error = 'extract', "Extraction failed"
+    return result
+
+
+async def match_and_recommend(result: PipelineResult, API_URL: str, API_KEY: str, MODEL_NAME: str, FALLBACK_MODEL: Optional[str] = None, deadlines: Optional[StageDeadlines] = None, top_k: int = 5, filters: Optional[dict] = None) -> PipelineResult:
+    """
+    Retrieve similar job postings for the extracted profile and ask the LLM
+    for skill recommendations. filters restricts the postings by metadata
+    (title, location, seniority).
+    """
+    deadlines = deadlines or StageDeadlines()
+    resume_data = result.resume_data or {}
+    result.trace = tracing.bind(result.trace or tracing.Trace("resume"))
+
+    def _retrieve():
+        retriever = get_retriever(top_k=top_k)
+        return retriever.retrieve_similar_jobs(**profile_strings(resume_data), filters=filters)
+
+    job_titles = []
+    try:
+        results = await _timed(result, 'retrieve', asyncio.to_thread(_retrieve), deadlines.retrieve)
+        if results and 'documents' in results and len(results['documents']) > 0:
+            result.job_postings = list(results['documents'][0])
+            result.job_ids = list((results.get('ids') or [[]])[0])
+            result.job_scores = list((results.get('scores') or [[]])[0])
+            job_titles = [(metadata or {}).get('title') or "" for metadata in (results.get('metadatas') or [[]])[0]]
+    except asyncio.TimeoutError:
+        result.retrieval_error = f"Job retrieval exceeded {deadlines.retrieve:.0f}s"
+    except Exception as e:
+        result.retrieval_error = str(e)
+
+    try:
+        result.recommendations = await _timed(
+            result, 'recommend',
+            arecommend_skills(
+                user_skills=resume_data.get('skills') or [],
+                user_education=resume_data.get('education') or [],
+                user_experience=resume_data.get('experience') or [],
+                job_postings=result.job_postings,
+                job_scores=result.job_scores,
+                API_KEY=API_KEY,
+                MODEL_NAME=MODEL_NAME,
+                API_URL=API_URL,
+                FALLBACK_MODEL=FALLBACK_MODEL
+            ),
+            deadlines.recommend
+        )
+    except asyncio.TimeoutError:
+        result.failed_stage, result.error = 'recommend', f"Recommendation exceeded {deadlines.recommend:.0f}s"
+    else:
+        if result.recommendations is None:
+            result.failed_stage, result.error = 'recommend', "Recommendation failed"
+        else:
+            result.recommendation_source = "llm"
+
+    if result.recommendations is None and LOCAL_RECOMMENDER_FALLBACK:
+        await _recommend_fallback(result, job_titles)
+    return result
+
+
+async def _recommend_fallback(result: PipelineResult, job_titles: list):
+    """Replace a failed LLM recommendation with the local one, if the skill statistics exist."""
+    try:
+        recommendations = await _timed(
+            result, 'local_recommend',
+            asyncio.to_thread(recommend_locally, result.resume_data, result.job_ids, result.job_scores, job_titles),
+            None
+        )
+    except Exception as e:
+        print(f"Local recommendation failed: {e}")
+        return
+    if recommendations is None:
+        return
+    print(f"LLM recommendation unavailable ({result.error}), using the local recommender")
+    result.recommendations = recommendations
+    result.recommendation_source = "local"
+    result.failed_stage, result.error = None, None
+
+
+async def _stream_analysis(resume_text: str, job_postings: list, job_scores: list, API_URL: str, API_KEY: str, MODEL_NAME: str, FALLBACK_MODEL: Optional[str], on_event: Callable):
+    analysis = None
+    async for event in astream_analyse_and_recommend(resume_text, job_postings, API_KEY, MODEL_NAME, API_URL, FALLBACK_MODEL, job_scores=job_scores):
+        if event.kind == "result":
+            analysis = event.value
+        else:
+            on_event(event)
+    return analysis
+
+
+async def analyse_single_call(pdf, API_URL: str, API_KEY: str, MODEL_NAME: str, FALLBACK_MODEL: Optional[str] = None, deadlines: Optional[StageDeadlines] = None, top_k: int = 5, filters: Optional[dict] = None, on_event: Optional[Callable] = None) -> PipelineResult:
+    """
+    Single-call mode: retrieve postings with the cleaned resume text as soon
+    as the PDF is parsed, then extract the resume fields and recommend skills
+    in one LLM request. With on_event the request is streamed like in
+    analyse_resume, and JSONEvent("stage", "match", resume_data) follows
+    once the resume fields are validated.
+    """
+    deadlines = deadlines or StageDeadlines()
+    result = PipelineResult()
+    result.trace = tracing.bind(tracing.Trace("resume"))
+
+    _start_warm_up(result)
+
+    if not await _parse(result, pdf, deadlines):
+        return result
+
+    def _retrieve():
+        retriever = get_retriever(top_k=top_k)
+        return retriever.retrieve_for_resume_text(result.resume_text, filters=filters)
+
+    try:
+        results = await _timed(result, 'retrieve', asyncio.to_thread(_retrieve), deadlines.retrieve)
+        if results and 'documents' in results and len(results['documents']) > 0:
+            result.job_postings = list(results['documents'][0])
+            result.job_ids = list((results.get('ids') or [[]])[0])
+            result.job_scores = list((results.get('scores') or [[]])[0])
+    except asyncio.TimeoutError:
+        result.retrieval_error = f"Job retrieval exceeded {deadlines.retrieve:.0f}s"
+    except Exception as e:
+        result.retrieval_error = str(e)
+
+    if on_event is None:
+        analysis = aanalyse_and_recommend(result.resume_text, result.job_postings, API_KEY, MODEL_NAME, API_URL, FALLBACK_MODEL, job_scores=result.job_scores)
+    else:
+        analysis = _stream_analysis(result.resume_text, result.job_postings, result.job_scores, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL, on_event)
+
+    try:
+        analysis = await _timed(result, 'analyse', analysis, deadlines.analyse)
+    except asyncio.TimeoutError:
+        result.failed_stage, result.error = 'analyse', f"Analysis exceeded {deadlines.analyse:.0f}s"
+        return result
+
+    if analysis is None:
+        result.failed_stage, result.error = 'analyse', "Analysis failed"
+        return result
+
+    result.resume_data, result.recommendations = ResumeAnalysis(**analysis).split()
+    result.recommendation_source = "llm"
+    if on_event is not None:
+        on_event(JSONEvent("stage", "match", result.resume_data))
+    return result
+
+
+async def run_pipeline(pdf, API_URL: str, API_KEY: str, MODEL_NAME: str, FALLBACK_MODEL: Optional[str] = None, deadlines: Optional[StageDeadlines] = None, top_k: int = 5, filters: Optional[dict] = None, on_event: Optional[Callable] = None, mode: Optional[str] = None) -> PipelineResult:
+    """
+    Run every stage end to end and return the collected results and timings.
+    With on_event the extraction is streamed (see analyse_resume), and
+    JSONEvent("stage", "match", resume_data) marks the start of retrieval
+    and recommendation. Skills are mapped to taxonomy IDs at the end
+    (skill_ids, recommended_skill_ids). mode is "two_call" or "single_call" (see
+    analyse_single_call), PIPELINE_MODE by default.
+    """
+    mode = mode or PIPELINE_MODE
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode {mode!r}, expected one of {', '.join(PIPELINE_MODES)}")
+
+    start = time.perf_counter()
+    if mode == "single_call":
+        result = await analyse_single_call(pdf, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL, deadlines, top_k, filters, on_event)
+        await _attach_skill_ids(result)
+        result.timings['total'] = time.perf_counter() - start
+        result.trace.finish()
+        return result
+
+    result = await analyse_resume(pdf, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL, deadlines, on_event=on_event)
+    if result.failed_stage is None:
+        if on_event is not None:
+            on_event(JSONEvent("stage", "match", result.resume_data))
+        await match_and_recommend(result, API_URL, API_KEY, MODEL_NAME, FALLBACK_MODEL, deadlines, top_k, filters)
+    await _attach_skill_ids(result)
+    result.timings['total'] = time.perf_counter() - start
+    result.trace.finish()
+    return result
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    """
+    A long-lived event loop on a daemon thread. Reusing one loop keeps the
+    async HTTP connection pool alive across Streamlit reruns.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="upskillr-pipeline", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """
+    Run a pipeline coroutine from synchronous code and wait for its result.
+    Raises RuntimeError when called on the pipeline loop itself, where
+    waiting would deadlock; coroutines there must await instead.
+    """
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called from the pipeline event loop, await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def stream_sync(make_coro: Callable):
+    """
+    Run make_coro(on_event) on the pipeline loop and yield the events it
+    reports, from the calling thread. The last item is
+    JSONEvent("result", None, value) with the coroutine's return value.
+    """
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(make_coro(events.put), _get_loop())
+
+    while True:
+        try:
+            yield events.get(timeout=0.05)
+        except queue.Empty:
+            # Every event is queued before the coroutine finishes
+            if future.done() and events.empty():
+                break
+
+    yield JSONEvent("result", None, future.result())
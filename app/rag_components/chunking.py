@@ -0,0 +1,128 @@
+"""
+Token-aware chunking of job postings for the embedding model.
+
+Descriptions are split into segments at line (bullet) and sentence
+boundaries, token-counted with the embedding model's own tokenizer and packed
+into chunks that fill the model's max sequence length, title prefix and
+special tokens included. Consecutive chunks can share a few trailing
+segments as overlap. Segments longer than a whole chunk are split between
+words.
+"""
+
+import hashlib
+import re
+
+try:
+    from app.text_normalization import normalize_whitespace_and_bullets
+except ImportError:
+    from text_normalization import normalize_whitespace_and_bullets
+
+# all-MiniLM-L6-v2 truncates its input at 256 tokens
+DEFAULT_MAX_TOKENS = 256
+DEFAULT_OVERLAP_TOKENS = 32
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def load_tokenizer(model_name: str):
+    """The tokenizer of a SentenceTransformer model, without loading its weights."""
+    from transformers import AutoTokenizer
+
+    if "/" not in model_name:
+        model_name = f"sentence-transformers/{model_name}"
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def chunk_prefix(title: str) -> str:
+    return f"Job Title: {title}\nDescription: "
+
+
+def chunk_body_hash(body: str) -> str:
+    """Identity of a chunk's description text, shared by every posting that contains it."""
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def split_segments(description: str) -> list:
+    """Normalised lines (each bullet is its own line), split further into sentences."""
+    segments = []
+    for line in normalize_whitespace_and_bullets(description).split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        segments.extend(sentence for sentence in _SENTENCE_END.split(line) if sentence)
+    return segments
+
+
+class TokenChunker:
+    def __init__(self, tokenizer, max_tokens: int = DEFAULT_MAX_TOKENS, overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self._special_tokens = tokenizer.num_special_tokens_to_add()
+
+    def count_tokens(self, texts: list) -> list:
+        """Token counts for a batch of texts, special tokens excluded."""
+        if not texts:
+            return []
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+    def _split_long_segment(self, segment: str, budget: int) -> list:
+        """(text, tokens) pieces of a segment that does not fit in one chunk, cut between words."""
+        words = segment.split()
+        pieces = []
+        current, current_tokens = [], 0
+        for word, tokens in zip(words, self.count_tokens(words)):
+            if current and current_tokens + tokens > budget:
+                pieces.append((" ".join(current), current_tokens))
+                current, current_tokens = [], 0
+            # A single word over the budget is left to the model's truncation
+            current.append(word)
+            current_tokens += tokens
+        if current:
+            pieces.append((" ".join(current), current_tokens))
+        return pieces
+
+    def chunk_bodies(self, title: str, description: str) -> list:
+        """The description text of each chunk, in order."""
+        segments = split_segments(description)
+        if not segments:
+            return []
+
+        prefix_tokens = self.count_tokens([chunk_prefix(title)])[0]
+        # Always leave room for at least a few words of description
+        budget = max(self.max_tokens - self._special_tokens - prefix_tokens, 16)
+
+        pieces = []
+        for segment, tokens in zip(segments, self.count_tokens(segments)):
+            if tokens > budget:
+                pieces.extend(self._split_long_segment(segment, budget))
+            else:
+                pieces.append((segment, tokens))
+
+        bodies = []
+        current, current_tokens = [], 0
+        for piece in pieces:
+            if current and current_tokens + piece[1] > budget:
+                bodies.append(" ".join(text for text, _ in current))
+                current, current_tokens = self._overlap(current, budget - piece[1])
+            current.append(piece)
+            current_tokens += piece[1]
+        if current:
+            bodies.append(" ".join(text for text, _ in current))
+        return bodies
+
+    def _overlap(self, pieces: list, room: int):
+        """Trailing pieces of a finished chunk to repeat at the start of the next one."""
+        limit = min(self.overlap_tokens, room)
+        carried, carried_tokens = [], 0
+        # Never carry the whole chunk, the next one must make progress
+        for piece in reversed(pieces[1:]):
+            if carried_tokens + piece[1] > limit:
+                break
+            carried.insert(0, piece)
+            carried_tokens += piece[1]
+        return carried, carried_tokens
+
+    def chunk(self, title: str, description: str) -> list:
+        """Chunks formatted for embedding, with the job title as context."""
+        return [chunk_prefix(title) + body for body in self.chunk_bodies(title, description)]
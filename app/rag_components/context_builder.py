@@ -0,0 +1,312 @@
+"""
+Token-budgeted context for the skill recommendation prompt.
+
+The retrieved postings are ranked by retrieval score and split into
+sentences. Sentences already present in a better-ranked posting (exactly,
+or with a word-set Jaccard similarity of at least DEDUP_THRESHOLD) are
+dropped, so boilerplate shared across postings is sent once. Each
+experience entry is cut to EXPERIENCE_ENTRY_TOKENS. The tokens left after
+the fixed part of the prompt are shared among the postings in proportion to
+their scores and filled sentence by sentence; postings that get no room are
+left out. build_analysis_context() applies the same trimming to the
+postings of the single-call analysis prompt.
+
+Tokens are counted with tiktoken when it is installed and estimated
+otherwise. Both only have to be close to the model's own tokenizer, since
+the budget is a cost control rather than a hard context limit.
+"""
+
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rag_components.chunking import split_segments
+from prompts import recommend_skills_prompt_template, analysis_system_prompt, analysis_user_template
+
+# Tokens allowed for the whole filled-in prompt; 0 disables trimming
+RECOMMEND_PROMPT_TOKEN_BUDGET = int(os.getenv("RECOMMEND_PROMPT_TOKEN_BUDGET", 3000))
+# The same for the single-call analysis prompt, which also carries the resume
+ANALYSIS_PROMPT_TOKEN_BUDGET = int(os.getenv("ANALYSIS_PROMPT_TOKEN_BUDGET", 5000))
+# Tokens kept of each experience entry
+EXPERIENCE_ENTRY_TOKENS = int(os.getenv("RECOMMEND_EXPERIENCE_ENTRY_TOKENS", 60))
+# Word-set Jaccard similarity at which two posting sentences count as the same
+DEDUP_THRESHOLD = float(os.getenv("RECOMMEND_DEDUP_THRESHOLD", 0.8))
+# Postings whose share of the budget is smaller than this are dropped
+MIN_POSTING_TOKENS = 40
+
+# Roughly one token per short word piece or punctuation mark
+_APPROX_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once, or False when tiktoken is unavailable."""
+    global _encoding
+    if _encoding is not None:
+        return _encoding
+
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encoding = False
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN.findall(text))
+
+
+@dataclass
+class PromptContext:
+    prompt: str
+    tokens: int
+    # Tokens of the prompt built from everything, untrimmed
+    baseline_tokens: int
+    postings_used: int = 0
+    postings_dropped: int = 0
+    sentences_dropped: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.baseline_tokens - self.tokens)
+
+
+def _fill(skills: list, education: list, experience: list, postings: list) -> str:
+    return recommend_skills_prompt_template.format(
+        user_skills=", ".join(skills) if skills else "Not specified",
+        user_education=" | ".join(education) if education else "Not specified",
+        user_experience=" | ".join(experience) if experience else "Not specified",
+        job_postings="\n\n".join(postings) if postings else "Not available"
+    )
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Whole sentences of text up to max_tokens, or its leading words if the first sentence is longer."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for sentence in _SENTENCE_END.split(text):
+        tokens = count_tokens(sentence)
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+    if kept:
+        return " ".join(kept)
+    words, used = [], 0
+    for word in text.split():
+        used += count_tokens(" " + word)
+        if used > max_tokens:
+            break
+        words.append(word)
+    return " ".join(words) + " ..."
+
+
+def compress_experience(experience: list, max_tokens: int = EXPERIENCE_ENTRY_TOKENS) -> list:
+    """Experience entries cut to max_tokens each, repeated entries removed."""
+    compressed, seen = [], set()
+    for entry in experience:
+        key = " ".join(_WORD.findall(entry.lower()))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        compressed.append(_truncate(entry.strip(), max_tokens) if max_tokens > 0 else entry.strip())
+    return compressed
+
+
+def _split_posting(posting: str) -> tuple:
+    """(header, sentences): the "Job Title: ..." line is kept whole as the header."""
+    header, _, body = posting.partition("\n")
+    if not header.startswith("Job Title:"):
+        header, body = "", posting
+    if body.startswith("Description: "):
+        header = f"{header}\nDescription:"
+        body = body[len("Description: "):]
+    return header, split_segments(body)
+
+
+def _dedup_sentences(postings: list) -> tuple:
+    """
+    (postings as (header, sentences), sentences dropped). postings must be in
+    rank order: a sentence is kept by the first posting that contains it.
+    """
+    seen_exact = set()
+    seen_words = []
+    # Inverted index from word to the seen sentences containing it, so each
+    # sentence is only compared with sentences it shares a word with
+    by_word = {}
+    dropped = 0
+    split = []
+    for posting in postings:
+        header, sentences = _split_posting(posting)
+        kept = []
+        for sentence in sentences:
+            words = frozenset(_WORD.findall(sentence.lower()))
+            key = " ".join(sorted(words))
+            if not words or key in seen_exact:
+                dropped += bool(words)
+                continue
+            candidates = set()
+            for word in words:
+                candidates.update(by_word.get(word, ()))
+            if any(len(words & seen_words[i]) / len(words | seen_words[i]) >= DEDUP_THRESHOLD for i in candidates):
+                dropped += 1
+                continue
+            seen_exact.add(key)
+            for word in words:
+                by_word.setdefault(word, []).append(len(seen_words))
+            seen_words.append(words)
+            kept.append(sentence)
+        split.append((header, kept))
+    return split, dropped
+
+
+def _allocate(shares: list, available: int) -> list:
+    total = sum(shares) or 1.0
+    return [int(available * share / total) for share in shares]
+
+
+def fit_postings(job_postings: list, job_scores: Optional[list], available: int) -> tuple:
+    """
+    (postings, sentences dropped): job_postings ranked by job_scores (higher
+    is better, retrieval order without them), deduplicated across postings
+    and cut to about available tokens in total.
+    """
+    if not job_postings:
+        return [], 0
+
+    # Best-scored first; 1 / (rank + 1) stands in for missing scores
+    if job_scores is not None and len(job_scores) == len(job_postings):
+        shares = [float(score) for score in job_scores]
+    else:
+        shares = [1.0 / (rank + 1) for rank in range(len(job_postings))]
+    order = sorted(range(len(job_postings)), key=lambda i: -shares[i])
+    ranked = [job_postings[i] for i in order]
+    shares = [shares[i] for i in order]
+    # Fusion and MMR scores can be zero or negative, shift them so the worst
+    # posting still gets a share next to the best one
+    floor = min(shares)
+    if floor <= 0:
+        shares = [share - floor + (shares[0] - floor) / len(shares) + 1e-3 for share in shares]
+
+    split, sentences_dropped = _dedup_sentences(ranked)
+
+    # Postings whose share is below the minimum are dropped and the budget
+    # is shared again among the rest
+    while True:
+        allowances = _allocate(shares, available - 2 * (len(split) - 1))
+        if allowances[-1] >= MIN_POSTING_TOKENS or len(split) == 1:
+            break
+        split, shares = split[:-1], shares[:-1]
+
+    postings = []
+    carry = 0
+    for (header, sentences), allowance in zip(split, allowances):
+        # Room a posting did not use goes to the next one
+        room = allowance + carry - count_tokens(header)
+        kept = []
+        for sentence in sentences:
+            tokens = count_tokens(" " + sentence)
+            if tokens > room:
+                sentences_dropped += 1
+                continue
+            kept.append(sentence)
+            room -= tokens
+        carry = max(room, 0)
+        if kept:
+            postings.append(f"{header} {' '.join(kept)}".strip())
+    return postings, sentences_dropped
+
+
+def build_prompt_context(user_skills: list, user_education: list, user_experience: list, job_postings: list,
+                         job_scores: Optional[list] = None, budget: Optional[int] = None) -> PromptContext:
+    """
+    The recommend_skills prompt for a profile and its retrieved postings,
+    trimmed to budget tokens (RECOMMEND_PROMPT_TOKEN_BUDGET by default).
+    job_scores are the retrieval scores of job_postings, higher is better;
+    without them the retrieval order is used.
+    """
+    budget = RECOMMEND_PROMPT_TOKEN_BUDGET if budget is None else budget
+    user_skills = user_skills or []
+    user_education = user_education or []
+    user_experience = user_experience or []
+    job_postings = [posting for posting in (job_postings or []) if posting]
+
+    baseline = _fill(user_skills, user_education, user_experience, job_postings)
+    baseline_tokens = count_tokens(baseline)
+    if budget <= 0 or baseline_tokens <= budget:
+        return PromptContext(baseline, baseline_tokens, baseline_tokens, postings_used=len(job_postings))
+
+    experience = compress_experience(user_experience)
+    fixed_tokens = count_tokens(_fill(user_skills, user_education, experience, []))
+    # Still too long without any postings: drop the oldest experience entries
+    while len(experience) > 1 and fixed_tokens > budget:
+        experience.pop()
+        fixed_tokens = count_tokens(_fill(user_skills, user_education, experience, []))
+
+    # The fixed part contains "Not available" for the postings, about its own
+    # size is given back once postings are added
+    postings, sentences_dropped = fit_postings(job_postings, job_scores, budget - fixed_tokens + count_tokens("Not available"))
+
+    prompt = _fill(user_skills, user_education, experience, postings)
+    return PromptContext(
+        prompt=prompt,
+        tokens=count_tokens(prompt),
+        baseline_tokens=baseline_tokens,
+        postings_used=len(postings),
+        postings_dropped=len(job_postings) - len(postings),
+        sentences_dropped=sentences_dropped
+    )
+
+
+def build_analysis_context(resume_text: str, job_postings: list, job_scores: Optional[list] = None,
+                           budget: Optional[int] = None) -> PromptContext:
+    """
+    The user message of the single-call analysis (resume text and postings),
+    with the postings trimmed so that it and the system prompt stay within
+    budget tokens (ANALYSIS_PROMPT_TOKEN_BUDGET by default). The resume text
+    is never cut, extraction needs all of it.
+    """
+    budget = ANALYSIS_PROMPT_TOKEN_BUDGET if budget is None else budget
+    job_postings = [posting for posting in (job_postings or []) if posting]
+
+    def fill(postings):
+        return analysis_user_template.format(
+            resume_text=resume_text,
+            job_postings="\n\n".join(postings) if postings else "Not available"
+        )
+
+    system_tokens = count_tokens(analysis_system_prompt)
+    baseline = fill(job_postings)
+    baseline_tokens = system_tokens + count_tokens(baseline)
+    if budget <= 0 or baseline_tokens <= budget:
+        return PromptContext(baseline, baseline_tokens, baseline_tokens, postings_used=len(job_postings))
+
+    fixed_tokens = system_tokens + count_tokens(fill([]))
+    postings, sentences_dropped = fit_postings(job_postings, job_scores, budget - fixed_tokens + count_tokens("Not available"))
+
+    prompt = fill(postings)
+    return PromptContext(
+        prompt=prompt,
+        tokens=system_tokens + count_tokens(prompt),
+        baseline_tokens=baseline_tokens,
+        postings_used=len(postings),
+        postings_dropped=len(job_postings) - len(postings),
+        sentences_dropped=sentences_dropped
+    )
@@ -0,0 +1,124 @@
+"""
+Near-duplicate detection for posting chunks.
+
+Each chunk gets a MinHash signature over its word 5-grams. Signatures are cut
+into LSH bands; chunks sharing a band bucket are candidates, and a candidate
+whose signatures agree on at least the threshold fraction of positions (the
+estimated Jaccard similarity) is treated as the same chunk. Signatures and
+buckets of stored chunks live in the ingest state, so matches are found
+across slices and runs.
+"""
+
+import hashlib
+import re
+import zlib
+from typing import Optional
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.85
+
+_WORD = re.compile(r"\w+")
+_PRIME = np.uint64((1 << 61) - 1)
+# Fixed seed, signatures are persisted and must stay comparable between runs
+_rng = np.random.RandomState(20240501)
+_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Stable 32-bit hashes of the lower-cased word n-grams of text."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    hashes = shingle_hashes(text)
+    # Both factors are below 2**32, so a * x + b cannot overflow uint64
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def band_keys(signature: np.ndarray) -> list:
+    """One signed 64-bit bucket key per LSH band, in band order."""
+    rows = NUM_PERM // BANDS
+    return [
+        int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def chunk_space(chunk_id: str) -> str:
+    """The embedding space part of a chunk ID ("chunk-<space>-<body hash>")."""
+    return chunk_id.rpartition("-")[0]
+
+
+class ChunkDeduplicator:
+    """
+    Decides, chunk by chunk, whether a freshly chunked record is new or the
+    same as (or a near copy of) a chunk that is already stored or queued.
+    Near copies are only matched within the same embedding space, so a
+    chunk is never reused from a collection built with another backend.
+    """
+
+    def __init__(self, state, threshold: float = DEFAULT_THRESHOLD):
+        self.state = state
+        # 0 disables near-duplicate matching, exact matches still apply
+        self.threshold = threshold
+        self._pending = {}
+        self._pending_buckets = {}
+
+    def resolve(self, chunk_id: str, signature: Optional[np.ndarray]) -> Optional[str]:
+        """
+        The ID of the stored or queued chunk this one duplicates, or None when
+        it is new; new chunks are queued and matched against from then on.
+        """
+        if chunk_id in self._pending or self.state.stored_chunks([chunk_id]):
+            return chunk_id
+
+        keys = band_keys(signature) if signature is not None else []
+        if self.threshold > 0 and keys:
+            match = self._best_match(signature, keys, chunk_space(chunk_id))
+            if match is not None:
+                return match
+
+        self._pending[chunk_id] = (signature, keys)
+        for band, key in enumerate(keys):
+            self._pending_buckets.setdefault((band, key), []).append(chunk_id)
+        return None
+
+    def _best_match(self, signature: np.ndarray, keys: list, space: str) -> Optional[str]:
+        candidates = {}
+        for band, key in enumerate(keys):
+            for candidate in self._pending_buckets.get((band, key), ()):
+                candidates[candidate] = self._pending[candidate][0]
+        for candidate, stored_signature in self.state.lsh_candidates(keys).items():
+            if chunk_space(candidate) == space:
+                candidates.setdefault(candidate, np.frombuffer(stored_signature, dtype=np.uint64))
+
+        best_id, best_score = None, self.threshold
+        for candidate, candidate_signature in candidates.items():
+            score = estimated_similarity(signature, candidate_signature)
+            if score >= best_score:
+                best_id, best_score = candidate, score
+        return best_id
+
+    def commit(self):
+        """Persist signatures of the queued chunks once they are stored in Chroma."""
+        self.state.add_chunk_signatures(
+            (chunk_id, signature.tobytes(), keys)
+            for chunk_id, (signature, keys) in self._pending.items()
+            if signature is not None
+        )
+        self._pending.clear()
+        self._pending_buckets.clear()
@@ -0,0 +1,138 @@
+"""
+Embedding backends.
+
+Everything that embeds text (JobRetriever, seed_db, the registry) goes through
+load_embedding_model(), which returns an object with the subset of the
+SentenceTransformer interface the app uses: encode(texts, batch_size,
+show_progress_bar) and max_seq_length. EMBEDDING_BACKEND picks the
+implementation:
+
+    torch      SentenceTransformer on PyTorch (CUDA when available)
+    onnx       ONNX Runtime on the model's fp32 ONNX export, no torch import
+    onnx-int8  ONNX Runtime on the int8-quantized export
+
+torch and onnx produce the same vectors (up to float rounding) and share an
+index. onnx-int8 vectors are close but not identical, so it has its own
+fingerprint: seeding with it re-embeds the whole collection (see README).
+"""
+
+import json
+import os
+import platform
+from typing import Optional
+
+import numpy as np
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Quantized exports published next to the fp32 one; override with EMBEDDING_ONNX_FILE
+_INT8_FILES = {
+    "arm64": "onnx/model_qint8_arm64.onnx",
+    "aarch64": "onnx/model_qint8_arm64.onnx",
+}
+_DEFAULT_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def embedding_fingerprint(model_name: str, backend: Optional[str] = None) -> str:
+    """Identifies the vector space an index was built in; backends with equal fingerprints can share it."""
+    backend = backend or EMBEDDING_BACKEND
+    return f"{model_name}/int8" if backend == "onnx-int8" else model_name
+
+
+def _hub_repo(model_name: str) -> str:
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+class TorchEmbeddingBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        # Streamlit's file watcher trips over torch.classes when it walks sys.modules
+        torch.classes.__path__ = []
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.model_name = model_name
+        self._model = SentenceTransformer(model_name, device=device)
+        self.max_seq_length = self._model.max_seq_length
+
+    def encode(self, texts: list, batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        return self._model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar)
+
+
+class OnnxEmbeddingBackend:
+    """
+    Runs a sentence-transformers ONNX export with ONNX Runtime and the
+    tokenizers library, then applies the model's mean pooling and (when the
+    model has it) normalisation in NumPy.
+    """
+
+    def __init__(self, model_name: str, quantized: bool = False):
+        import onnxruntime
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.model_name = model_name
+        repo = _hub_repo(model_name)
+
+        onnx_file = os.getenv("EMBEDDING_ONNX_FILE")
+        if not onnx_file:
+            onnx_file = _INT8_FILES.get(platform.machine().lower(), _DEFAULT_INT8_FILE) if quantized else "onnx/model.onnx"
+
+        with open(hf_hub_download(repo, "sentence_bert_config.json")) as f:
+            self.max_seq_length = json.load(f).get("max_seq_length", 256)
+        with open(hf_hub_download(repo, "modules.json")) as f:
+            self._normalize = any(module.get("type", "").endswith("Normalize") for module in json.load(f))
+
+        self._tokenizer = Tokenizer.from_file(hf_hub_download(repo, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self._tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        threads = int(os.getenv("EMBEDDING_ONNX_THREADS", 0))
+        if threads:
+            options.intra_op_num_threads = threads
+        self._session = onnxruntime.InferenceSession(
+            hf_hub_download(repo, onnx_file), options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {model_input.name for model_input in self._session.get_inputs()}
+
+    def _encode_batch(self, texts: list) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self._session.run(None, feed)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self._normalize:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings.astype(np.float32)
+
+    def encode(self, texts: list, batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Batch texts of similar length together to keep padding small
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            for i, embedding in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                embeddings[i] = embedding
+        return np.stack(embeddings)
+
+
+def load_embedding_model(model_name: str = "all-MiniLM-L6-v2", backend: Optional[str] = None):
+    """Load model_name with the configured (or the given) embedding backend."""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend == "torch":
+        return TorchEmbeddingBackend(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbeddingBackend(model_name, quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected one of {', '.join(BACKENDS)}")
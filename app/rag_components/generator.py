@@ -3,102 +3,297 @@ from pathlib import Path
 # Add parent directory to path to import prompts
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from models import SkillRecommendations
-from openai import OpenAI
+from models import SkillRecommendations, ResumeAnalysis
+from cache import get_result_cache, make_key, prompt_version
+from llm_gateway import chat_completion, achat_completion, astream_hedged_chat_completion, hedged_request, ahedged_request, hedging_enabled
+from rag_components.context_builder import build_prompt_context, build_analysis_context
+from streaming_json import IncrementalJSONObjectParser, JSONEvent
+import tracing
+from tracing import traced
 import json
 from typing import Optional
-from prompts import recommend_skills_prompt_template
+from prompts import recommend_skills_prompt_template, analysis_system_prompt, analysis_user_template
 
-def recommend_skills(user_skills: list, user_education: list, user_experience: list, job_postings: list, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None):
+RECOMMEND_PROMPT_VERSION = prompt_version(recommend_skills_prompt_template)
+ANALYSIS_PROMPT_VERSION = prompt_version(analysis_system_prompt, analysis_user_template)
+
+@traced("recommend_skills")
+def recommend_skills(user_skills: list, user_education: list, user_experience: list, job_postings: list, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None, use_cache: bool = True, hedge: Optional[bool] = None, job_scores: Optional[list] = None):
     """
     Given user's skills, education, experience, and relevant job postings,
     calls the LLM to recommend new skills as a JSON list.
-    Supports fallback model if primary model fails.
+    Supports fallback model if primary model fails, or racing it against a
+    slow primary when hedging is enabled (see llm_gateway.ahedged_request).
+    The prompt is trimmed to the token budget (see context_builder), ranking
+    postings by job_scores when given. Results are cached by the filled-in
+    prompt, model and prompt version.
     """
-    client = OpenAI(
-        base_url=API_URL.replace("/chat/completions", ""),  # Remove endpoint from base URL
-        api_key=API_KEY,
-        default_headers={
-            "HTTP-Referer": "https://github.com/hardikprakash/upskillr",
-            "X-Title": "Upskillr"
-        }
-    )
+    recommend_skills_prompt = build_recommend_skills_prompt(user_skills, user_education, user_experience, job_postings, job_scores)
 
-    # Prepare strings for prompt
-    skills_str = ", ".join(user_skills) if user_skills else "Not specified"
-    education_str = " | ".join(user_education) if user_education else "Not specified"
-    experience_str = " | ".join(user_experience) if user_experience else "Not specified"
-    job_postings_str = "\n\n".join(job_postings) if job_postings else "Not available"
-
-    recommend_skills_prompt = recommend_skills_prompt_template.format(
-        user_skills=skills_str,
-        user_education=education_str,
-        user_experience=experience_str,
-        job_postings=job_postings_str
-    )
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(recommend_skills_prompt, MODEL_NAME, RECOMMEND_PROMPT_VERSION)
 
-    # Try primary model first
-    result = _make_llm_request(client, MODEL_NAME, recommend_skills_prompt)
-    
-    # If primary model fails and fallback is available, try fallback
-    if result is None and FALLBACK_MODEL:
-        print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
-        result = _make_llm_request(client, FALLBACK_MODEL, recommend_skills_prompt)
+    if cache is not None:
+        cached = cache.get("skill_recommendations", cache_key)
+        if cached is not None:
+            return SkillRecommendations(**cached).model_dump()
+
+    if hedging_enabled(hedge) and FALLBACK_MODEL:
+        result = hedged_request(API_URL, API_KEY, [MODEL_NAME, FALLBACK_MODEL], _parse_completion, **_request_kwargs(recommend_skills_prompt))
+    else:
+        # Try primary model first
+        result = _make_llm_request(API_URL, API_KEY, MODEL_NAME, recommend_skills_prompt)
+        
+        # If primary model fails and fallback is available, try fallback
+        if result is None and FALLBACK_MODEL:
+            print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
+            result = _make_llm_request(API_URL, API_KEY, FALLBACK_MODEL, recommend_skills_prompt)
+
+    if result is not None and cache is not None:
+        cache.put("skill_recommendations", cache_key, result)
     
     return result
 
 
-def _make_llm_request(client: OpenAI, model_name: str, user_prompt: str):
+@traced("recommend_skills")
+async def arecommend_skills(user_skills: list, user_education: list, user_experience: list, job_postings: list, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None, use_cache: bool = True, hedge: Optional[bool] = None, job_scores: Optional[list] = None):
+    """
+    Async version of recommend_skills through the shared async LLM gateway.
     """
-    Helper function to make a request to the LLM API using OpenAI client.
+    recommend_skills_prompt = build_recommend_skills_prompt(user_skills, user_education, user_experience, job_postings, job_scores)
+
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(recommend_skills_prompt, MODEL_NAME, RECOMMEND_PROMPT_VERSION)
+
+    if cache is not None:
+        cached = cache.get("skill_recommendations", cache_key)
+        if cached is not None:
+            return SkillRecommendations(**cached).model_dump()
+
+    if hedging_enabled(hedge) and FALLBACK_MODEL:
+        result = await ahedged_request(API_URL, API_KEY, [MODEL_NAME, FALLBACK_MODEL], _parse_completion, **_request_kwargs(recommend_skills_prompt))
+    else:
+        result = await _amake_llm_request(API_URL, API_KEY, MODEL_NAME, recommend_skills_prompt)
+
+        if result is None and FALLBACK_MODEL:
+            print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
+            result = await _amake_llm_request(API_URL, API_KEY, FALLBACK_MODEL, recommend_skills_prompt)
+
+    if result is not None and cache is not None:
+        cache.put("skill_recommendations", cache_key, result)
+
+    return result
+
+
+def build_recommend_skills_prompt(user_skills: list, user_education: list, user_experience: list, job_postings: list, job_scores: Optional[list] = None) -> str:
+    context = build_prompt_context(user_skills, user_education, user_experience, job_postings, job_scores)
+    tracing.count("recommend_prompt_tokens", context.tokens)
+    tracing.count("recommend_prompt_tokens_saved", context.tokens_saved)
+    if context.tokens_saved:
+        print(f"Recommendation prompt trimmed from {context.baseline_tokens} to {context.tokens} tokens "
+              f"({context.postings_used} postings kept, {context.sentences_dropped} sentences dropped)")
+    return context.prompt
+
+
+@traced("analyse_and_recommend")
+async def aanalyse_and_recommend(resume_text: str, job_postings: list, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None, use_cache: bool = True, hedge: Optional[bool] = None, job_scores: Optional[list] = None):
+    """
+    Single-call analysis: extract the resume fields and recommend skills for
+    the given postings in one LLM request, returning a ResumeAnalysis dict
+    (split it with ResumeAnalysis.split) or None. Postings are trimmed to
+    the token budget like in recommend_skills. Results are cached by the
+    filled-in prompt, model and prompt version.
+    """
+    analysis_prompt = build_analysis_prompt(resume_text, job_postings, job_scores)
+
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(analysis_prompt, MODEL_NAME, ANALYSIS_PROMPT_VERSION)
+
+    if cache is not None:
+        cached = cache.get("resume_analysis", cache_key)
+        if cached is not None:
+            return ResumeAnalysis(**cached).model_dump()
+
+    if hedging_enabled(hedge) and FALLBACK_MODEL:
+        result = await ahedged_request(API_URL, API_KEY, [MODEL_NAME, FALLBACK_MODEL], _parse_analysis_completion, **_analysis_request_kwargs(analysis_prompt))
+    else:
+        result = None
+        for model_name in (MODEL_NAME, FALLBACK_MODEL):
+            if not model_name:
+                continue
+            if model_name != MODEL_NAME:
+                print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
+            response = await achat_completion(API_URL, API_KEY, model_name, **_analysis_request_kwargs(analysis_prompt))
+            if response is not None:
+                result = _parse_analysis_completion(model_name, response)
+            if result is not None:
+                break
+
+    if result is not None and cache is not None:
+        cache.put("resume_analysis", cache_key, result)
+
+    return result
+
+
+async def astream_analyse_and_recommend(resume_text: str, job_postings: list, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None, use_cache: bool = True, hedge: Optional[bool] = None, job_scores: Optional[list] = None):
+    """
+    Streaming version of aanalyse_and_recommend. Yields a JSONEvent for every
+    field and list item as the model produces it (the resume fields come
+    first), then JSONEvent("result", None, analysis) with the validated dict,
+    or None if every model failed. With hedging enabled the fallback model
+    races the primary on time to first token. When a model fails after
+    streaming some fields, JSONEvent("reset", None, model_name) announces
+    that the next model streams them again from the start.
+    """
+    analysis_prompt = build_analysis_prompt(resume_text, job_postings, job_scores)
+
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(analysis_prompt, MODEL_NAME, ANALYSIS_PROMPT_VERSION)
+
+    if cache is not None:
+        cached = cache.get("resume_analysis", cache_key)
+        if cached is not None:
+            result = ResumeAnalysis(**cached).model_dump()
+            for key, value in result.items():
+                yield JSONEvent("field", key, value)
+            yield JSONEvent("result", None, result)
+            return
+
+    result = None
+    models = [model_name for model_name in (MODEL_NAME, FALLBACK_MODEL) if model_name]
+    # With hedging the first round races every model on time to first token
+    racing = models if hedging_enabled(hedge) else models[:1]
+    streamed = False
+    while racing and result is None:
+        if racing[0] != MODEL_NAME:
+            print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
+        if streamed:
+            # The next model starts over, drop what the failed one streamed
+            yield JSONEvent("reset", None, racing[0])
+            streamed = False
+
+        parser = IncrementalJSONObjectParser()
+        winner = None
+        async for winner, delta in astream_hedged_chat_completion(API_URL, API_KEY, racing, **_analysis_request_kwargs(analysis_prompt)):
+            for event in parser.feed(delta):
+                streamed = True
+                yield event
+
+        if winner is not None and parser.text.strip():
+            result = _parse_response(winner, parser.text.strip(), ResumeAnalysis)
+        # A raced model that lost was cancelled, not failed; it gets its own turn
+        done = {winner} if winner is not None else set(racing)
+        models = [model_name for model_name in models if model_name not in done]
+        racing = models[:1]
+
+    if result is not None and cache is not None:
+        cache.put("resume_analysis", cache_key, result)
+
+    yield JSONEvent("result", None, result)
+
+
+def build_analysis_prompt(resume_text: str, job_postings: list, job_scores: Optional[list] = None) -> str:
+    context = build_analysis_context(resume_text, job_postings, job_scores)
+    tracing.count("analysis_prompt_tokens", context.tokens)
+    tracing.count("analysis_prompt_tokens_saved", context.tokens_saved)
+    if context.tokens_saved:
+        print(f"Analysis prompt trimmed from {context.baseline_tokens} to {context.tokens} tokens "
+              f"({context.postings_used} postings kept, {context.sentences_dropped} sentences dropped)")
+    return context.prompt
+
+
+def _request_kwargs(user_prompt: str) -> dict:
+    return dict(
+        messages=[
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={"type": "json_object"},  # Enforce JSON response
+        temperature=0.2,
+        max_tokens=1024,  # Shorter for recommendations
+        timeout=360
+    )
+
+
+def _analysis_request_kwargs(user_prompt: str) -> dict:
+    return dict(
+        messages=[
+            {"role": "system", "content": analysis_system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={"type": "json_object"},  # Enforce JSON response
+        temperature=0.2,
+        max_tokens=4096,  # Room for the extracted resume and the recommendations
+        timeout=360
+    )
+
+
+def _make_llm_request(API_URL: str, API_KEY: str, model_name: str, user_prompt: str):
+    """
+    Helper function to make a request to the LLM API through the shared gateway,
+    which handles retries, rate limiting and circuit breaking.
     Returns parsed SkillRecommendations on success, None on failure.
     """
+    response = chat_completion(API_URL, API_KEY, model_name, **_request_kwargs(user_prompt))
+    if response is None:
+        return None
+
+    return _parse_completion(model_name, response)
+
+
+async def _amake_llm_request(API_URL: str, API_KEY: str, model_name: str, user_prompt: str):
+    """
+    Async counterpart of _make_llm_request.
+    """
+    response = await achat_completion(API_URL, API_KEY, model_name, **_request_kwargs(user_prompt))
+    if response is None:
+        return None
+
+    return _parse_completion(model_name, response)
+
+
+def _completion_text(model_name: str, response):
+    """The stripped message content of a completion, None if it has none."""
+    choices = getattr(response, "choices", None)
+    content = choices[0].message.content if choices else None
+    if content is None:
+        print(f"Empty response from {model_name}")
+        return None
+    return content.strip()
+
+
+def _parse_completion(model_name: str, response):
+    text = _completion_text(model_name, response)
+    return _parse_response(model_name, text) if text is not None else None
+
+
+def _parse_analysis_completion(model_name: str, response):
+    text = _completion_text(model_name, response)
+    return _parse_response(model_name, text, ResumeAnalysis) if text is not None else None
+
+
+def _parse_response(model_name: str, result_string: str, model=SkillRecommendations):
+    """
+    Parse and validate the raw LLM output against model.
+    Returns the model (SkillRecommendations by default) as a dict on success,
+    None on failure.
+    """
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},  # Enforce JSON response
-            temperature=0.2,
-            max_tokens=1024,  # Shorter for recommendations
-            timeout=360
-        )
-
-        result_string = response.choices[0].message.content.strip()
-
-        try:
-            # Parse JSON string to dict
-            result_dict = json.loads(result_string)
-            
-            # Validate with Pydantic model
-            skill_recommendations = SkillRecommendations(**result_dict)
-            
-            # Return as dict for backward compatibility
-            return skill_recommendations.model_dump()
-            
-        except json.JSONDecodeError as json_err:
-            print(f"Error: Failed to decode JSON response from LLM ({model_name}).")
-            print(f"LLM raw output:\n---\n{result_string}\n---")
-            print(f"JSONDecodeError: {json_err}")
-            return None
+        # Parse JSON string to dict
+        result_dict = json.loads(result_string)
         
-        except Exception as e:
-            print(f"An unexpected error occurred during JSON parsing ({model_name}): {e}")
-            print(f"LLM raw output:\n---\n{result_string}\n---")
-            return None
-
-    except Exception as e:
-        error_msg = str(e)
+        # Validate with Pydantic model
+        validated = model(**result_dict)
         
-        # Check for specific error types
-        if "rate_limit" in error_msg.lower() or "429" in error_msg:
-            print(f"⚠️ OpenRouter API rate limit reached for {model_name}. Please try again later or upgrade your plan.")
-        elif "insufficient" in error_msg.lower() or "402" in error_msg:
-            print(f"⚠️ OpenRouter API credits exhausted for {model_name}. Please add credits to your account.")
-        elif "400" in error_msg:
-            print(f"⚠️ Bad request for {model_name}: {error_msg}")
-        else:
-            print(f"Error making request with {model_name}: {error_msg}")
+        # Return as dict for backward compatibility
+        return validated.model_dump()
         
+    except json.JSONDecodeError as json_err:
+        print(f"Error: Failed to decode JSON response from LLM ({model_name}).")
+        print(f"LLM raw output:\n---\n{result_string}\n---")
+        print(f"JSONDecodeError: {json_err}")
+        return None
+    
+    except Exception as e:
+        print(f"An unexpected error occurred during JSON parsing ({model_name}): {e}")
+        print(f"LLM raw output:\n---\n{result_string}\n---")
         return None
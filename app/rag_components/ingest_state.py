@@ -0,0 +1,267 @@
+import json
+import sqlite3
+from pathlib import Path
+
+DEFAULT_STATE_PATH = Path('database') / 'ingest_state.sqlite3'
+
+
+class IngestState:
+    """
+    Local record of which postings are in the jobs collection and the content
+    hash they were embedded from. It mirrors the posting_id/content_hash
+    metadata stored on every chunk in Chroma, so a refresh can tell new,
+    changed and vanished postings apart without scanning the collection.
+
+    Chunks are content-addressed, so a boilerplate chunk shared by several
+    postings is stored once; the chunk_postings table records which postings
+    use each stored chunk so it is only deleted with its last posting, and
+    posting_metadata keeps each posting's chunk metadata (title, filterable
+    fields) so a shared chunk can be handed to another member when the
+    posting that stored it goes away. The posting_skills table holds the skill taxonomy IDs each posting
+    mentions, from which seed_db exports the skill statistics.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " posting_id TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " chunk_count INTEGER NOT NULL,"
+            " last_seen_run INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_run ON postings (last_seen_run)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_postings ("
+            " chunk_id TEXT NOT NULL,"
+            " posting_id TEXT NOT NULL,"
+            " PRIMARY KEY (chunk_id, posting_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_postings_posting ON chunk_postings (posting_id)")
+        # MinHash signatures and LSH buckets of stored chunks, see dedup.py
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_signatures ("
+            " chunk_id TEXT PRIMARY KEY,"
+            " signature BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_buckets ("
+            " band INTEGER NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " chunk_id TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_buckets ON chunk_buckets (band, bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_buckets_chunk ON chunk_buckets (chunk_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posting_metadata ("
+            " posting_id TEXT PRIMARY KEY,"
+            " metadata TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posting_skills ("
+            " posting_id TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " skill_ids TEXT NOT NULL,"
+            " taxonomy_version TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def is_empty(self) -> bool:
+        return self._conn.execute("SELECT 1 FROM postings LIMIT 1").fetchone() is None
+
+    def next_run_id(self) -> int:
+        """A run ID greater than any recorded so far."""
+        row = self._conn.execute("SELECT MAX(last_seen_run) FROM postings").fetchone()
+        return (row[0] or 0) + 1
+
+    def get_hashes(self, posting_ids) -> dict:
+        """Map each known posting_id to the content hash it was indexed with."""
+        hashes = {}
+        posting_ids = list(posting_ids)
+        # Stay under SQLite's bound parameter limit
+        for i in range(0, len(posting_ids), 500):
+            batch = posting_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT posting_id, content_hash FROM postings WHERE posting_id IN ({placeholders})",
+                batch
+            )
+            hashes.update(rows)
+        return hashes
+
+    def mark_seen(self, posting_ids, run_id: int):
+        """Record that unchanged postings are still present in the source."""
+        self._conn.executemany(
+            "UPDATE postings SET last_seen_run = ? WHERE posting_id = ?",
+            [(run_id, posting_id) for posting_id in posting_ids]
+        )
+        self._conn.commit()
+
+    def record(self, postings, run_id: int):
+        """Store (posting_id, content_hash, chunk_count) for freshly indexed postings."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO postings (posting_id, content_hash, chunk_count, last_seen_run) VALUES (?, ?, ?, ?)",
+            [(posting_id, content_hash, chunk_count, run_id) for posting_id, content_hash, chunk_count in postings]
+        )
+        self._conn.commit()
+
+    def stale_postings(self, run_id: int) -> list:
+        """Postings that were not seen during run_id, i.e. vanished from the source."""
+        rows = self._conn.execute("SELECT posting_id FROM postings WHERE last_seen_run != ?", (run_id,))
+        return [row[0] for row in rows]
+
+    def forget(self, posting_ids):
+        self._conn.executemany("DELETE FROM postings WHERE posting_id = ?", [(posting_id,) for posting_id in posting_ids])
+        self._conn.executemany("DELETE FROM posting_skills WHERE posting_id = ?", [(posting_id,) for posting_id in posting_ids])
+        self._conn.executemany("DELETE FROM posting_metadata WHERE posting_id = ?", [(posting_id,) for posting_id in posting_ids])
+        self._conn.commit()
+
+    def record_metadata(self, rows):
+        """Store (posting_id, metadata dict) pairs, replacing earlier versions."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO posting_metadata (posting_id, metadata) VALUES (?, ?)",
+            [(posting_id, json.dumps(metadata, sort_keys=True)) for posting_id, metadata in rows]
+        )
+        self._conn.commit()
+
+    def posting_metadata(self, posting_ids) -> dict:
+        """Map each posting_id with recorded metadata to its metadata dict."""
+        found = {}
+        posting_ids = list(posting_ids)
+        for i in range(0, len(posting_ids), 500):
+            batch = posting_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT posting_id, metadata FROM posting_metadata WHERE posting_id IN ({placeholders})",
+                batch
+            )
+            found.update((posting_id, json.loads(metadata)) for posting_id, metadata in rows)
+        return found
+
+    def skill_versions(self, posting_ids) -> dict:
+        """Map each posting_id with recorded skill mentions to the taxonomy version they were found with."""
+        versions = {}
+        posting_ids = list(posting_ids)
+        for i in range(0, len(posting_ids), 500):
+            batch = posting_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT posting_id, taxonomy_version FROM posting_skills WHERE posting_id IN ({placeholders})",
+                batch
+            )
+            versions.update(rows)
+        return versions
+
+    def record_skill_mentions(self, rows, taxonomy_version: str):
+        """Store (posting_id, title, [skill_id, ...]) skill mentions."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO posting_skills (posting_id, title, skill_ids, taxonomy_version) VALUES (?, ?, ?, ?)",
+            [(posting_id, title, " ".join(skill_ids), taxonomy_version) for posting_id, title, skill_ids in rows]
+        )
+        self._conn.commit()
+
+    def iter_skill_mentions(self):
+        """Yield (posting_id, title, [skill_id, ...]) for every posting, in posting_id order."""
+        rows = self._conn.execute("SELECT posting_id, title, skill_ids FROM posting_skills ORDER BY posting_id")
+        for posting_id, title, skill_ids in rows:
+            yield posting_id, title, skill_ids.split()
+
+    def stored_chunks(self, chunk_ids) -> set:
+        """The given chunk IDs that are already in the collection."""
+        stored = set()
+        chunk_ids = list(chunk_ids)
+        for i in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT DISTINCT chunk_id FROM chunk_postings WHERE chunk_id IN ({placeholders})",
+                batch
+            )
+            stored.update(row[0] for row in rows)
+        return stored
+
+    def add_chunk_postings(self, pairs):
+        """Record (chunk_id, posting_id) memberships."""
+        self._conn.executemany("INSERT OR IGNORE INTO chunk_postings (chunk_id, posting_id) VALUES (?, ?)", list(pairs))
+        self._conn.commit()
+
+    def chunk_postings(self, chunk_ids) -> dict:
+        """Map each stored chunk ID to the sorted IDs of the postings using it."""
+        members = {}
+        chunk_ids = list(chunk_ids)
+        for i in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT chunk_id, posting_id FROM chunk_postings WHERE chunk_id IN ({placeholders}) ORDER BY posting_id",
+                batch
+            )
+            for chunk_id, posting_id in rows:
+                members.setdefault(chunk_id, []).append(posting_id)
+        return members
+
+    def iter_chunk_postings(self, batch_size: int = 10000):
+        """Yield lists of up to batch_size (chunk_id, posting_id) memberships."""
+        cursor = self._conn.execute("SELECT chunk_id, posting_id FROM chunk_postings ORDER BY chunk_id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+    def release_postings(self, posting_ids):
+        """
+        Drop the chunk memberships of the given postings. Returns
+        (orphaned, still_shared): chunk IDs no posting uses any more, which
+        should be deleted from Chroma, and chunks that lost a posting but
+        are still used by others.
+        """
+        posting_ids = list(posting_ids)
+        affected = set()
+        for i in range(0, len(posting_ids), 500):
+            batch = posting_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT DISTINCT chunk_id FROM chunk_postings WHERE posting_id IN ({placeholders})",
+                batch
+            )
+            affected.update(row[0] for row in rows)
+            self._conn.execute(f"DELETE FROM chunk_postings WHERE posting_id IN ({placeholders})", batch)
+
+        still_shared = self.stored_chunks(affected)
+        orphaned = sorted(affected - still_shared)
+        self._conn.executemany("DELETE FROM chunk_signatures WHERE chunk_id = ?", [(chunk_id,) for chunk_id in orphaned])
+        self._conn.executemany("DELETE FROM chunk_buckets WHERE chunk_id = ?", [(chunk_id,) for chunk_id in orphaned])
+        self._conn.commit()
+        return orphaned, sorted(still_shared)
+
+    def add_chunk_signatures(self, rows):
+        """Store (chunk_id, signature_bytes, band_keys) for newly stored chunks."""
+        rows = list(rows)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO chunk_signatures (chunk_id, signature) VALUES (?, ?)",
+            [(chunk_id, signature) for chunk_id, signature, _ in rows]
+        )
+        self._conn.executemany(
+            "INSERT INTO chunk_buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+            [(band, key, chunk_id) for chunk_id, _, keys in rows for band, key in enumerate(keys)]
+        )
+        self._conn.commit()
+
+    def lsh_candidates(self, band_keys) -> dict:
+        """Stored chunks sharing at least one LSH bucket, mapped to their signature bytes."""
+        if not band_keys:
+            return {}
+        conditions = " OR ".join("(b.band = ? AND b.bucket = ?)" for _ in band_keys)
+        params = [value for band, key in enumerate(band_keys) for value in (band, key)]
+        rows = self._conn.execute(
+            f"SELECT DISTINCT s.chunk_id, s.signature FROM chunk_buckets b"
+            f" JOIN chunk_signatures s ON s.chunk_id = b.chunk_id WHERE {conditions}",
+            params
+        )
+        return dict(rows)
+
+    def close(self):
+        self._conn.close()
@@ -1,5 +1,3 @@
-import chromadb
-from chromadb.config import Settings
 from pathlib import Path
 import os
 
@@ -7,7 +5,10 @@ def get_chroma_client():
     """
     Get ChromaDB client with persistent storage.
     Handles path resolution relative to the project root.
+    chromadb is imported here rather than at module level, it takes seconds.
     """
+    import chromadb
+
     # Get the directory where this file is located
     current_file = Path(__file__).resolve()
     
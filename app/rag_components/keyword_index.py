@@ -0,0 +1,215 @@
+"""
+Persistent BM25 keyword index over the stored posting chunks.
+
+Backed by an SQLite FTS5 table (an on-disk inverted index with built-in BM25
+ranking) kept next to the Chroma database. seed_db adds and removes chunks as
+it syncs the collection, and JobRetriever fuses its hits with the dense
+results. Chunks carry the same filterable metadata as in Chroma.
+
+A chunk shared by several postings only carries the metadata of one of them,
+so the members table keeps the filterable fields of every posting using each
+chunk. Filters match a shared chunk when any of its postings matches.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_KEYWORD_INDEX_PATH = Path(__file__).resolve().parent.parent.parent / 'database' / 'keyword_index.sqlite3'
+
+# Metadata fields that can be filtered on, in Chroma and in the keyword index
+FILTER_FIELDS = ("title", "location", "seniority")
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+# Words that occur in nearly every chunk and only slow the OR query down
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our the to we will with you your "
+    "job title description not specified".split()
+)
+
+
+def query_terms(text: str, limit: int = 64) -> list:
+    """Distinct lower-cased search terms of text, in order of first appearance."""
+    terms = []
+    seen = set()
+    for term in _TOKEN.findall(text.lower()):
+        if term in _STOPWORDS or term in seen:
+            continue
+        seen.add(term)
+        terms.append(term)
+        if len(terms) >= limit:
+            break
+    return terms
+
+
+def _rowid(chunk_id: str) -> int:
+    """
+    Stable 64-bit rowid for a chunk, so updates and deletes go through the
+    rowid instead of scanning the unindexed chunk_id column.
+    """
+    return int.from_bytes(hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _filter_values(field: str, value) -> list:
+    if field not in FILTER_FIELDS:
+        raise ValueError(f"Cannot filter on '{field}', expected one of {', '.join(FILTER_FIELDS)}")
+    return [str(v) for v in value] if isinstance(value, (list, tuple, set)) else [str(value)]
+
+
+def matches_filters(metadata: Optional[dict], filters: Optional[dict]) -> bool:
+    """Whether chunk metadata satisfies filters, as build_chroma_where would match it."""
+    metadata = metadata or {}
+    return all(str(metadata.get(field, "")) in _filter_values(field, value) for field, value in (filters or {}).items())
+
+
+def _filter_sql(filters: dict) -> tuple:
+    """(SQL condition, params) matching FILTER_FIELDS columns against filters."""
+    clauses, params = [], []
+    for field, value in filters.items():
+        values = _filter_values(field, value)
+        clauses.append(f"{field} IN ({','.join('?' * len(values))})")
+        params.extend(values)
+    return " AND ".join(clauses), params
+
+
+def build_chroma_where(filters: Optional[dict]) -> Optional[dict]:
+    """
+    Turn {"location": "Berlin", "seniority": ["Entry level", "Associate"]}
+    into a Chroma where clause; list values match any of their items.
+    """
+    clauses = []
+    for field, value in (filters or {}).items():
+        _filter_values(field, value)
+        if isinstance(value, (list, tuple, set)):
+            clauses.append({field: {"$in": list(value)}})
+        else:
+            clauses.append({field: value})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class KeywordIndex:
+    """Safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_KEYWORD_INDEX_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+            " chunk_id UNINDEXED, body, title UNINDEXED, location UNINDEXED, seniority UNINDEXED,"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        # Keyed by the chunk's FTS rowid, see _rowid()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS members ("
+            " chunk_rowid INTEGER NOT NULL,"
+            " chunk_id TEXT NOT NULL,"
+            " posting_id TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " location TEXT NOT NULL,"
+            " seniority TEXT NOT NULL,"
+            " PRIMARY KEY (chunk_rowid, posting_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_members_posting ON members (posting_id)")
+        self._conn.commit()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone() is None
+
+    def has_members(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM members LIMIT 1").fetchone() is not None
+
+    def add(self, records):
+        """Index (chunk_id, document, metadata) records, replacing earlier versions."""
+        records = list(records)
+        rows = [
+            (_rowid(chunk_id), chunk_id, document, *[str((metadata or {}).get(field) or "") for field in FILTER_FIELDS])
+            for chunk_id, document, metadata, *_ in records
+        ]
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE rowid = ?", [(row[0],) for row in rows])
+            self._conn.executemany(
+                "INSERT INTO chunks (rowid, chunk_id, body, title, location, seniority) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def remove(self, chunk_ids):
+        rowids = [(_rowid(chunk_id),) for chunk_id in chunk_ids]
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE rowid = ?", rowids)
+            self._conn.executemany("DELETE FROM members WHERE chunk_rowid = ?", rowids)
+            self._conn.commit()
+
+    def add_members(self, rows):
+        """Record (chunk_id, posting_id, posting metadata) memberships with the posting's filterable fields."""
+        rows = [
+            (_rowid(chunk_id), chunk_id, posting_id, *[str((metadata or {}).get(field) or "") for field in FILTER_FIELDS])
+            for chunk_id, posting_id, metadata in rows
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO members (chunk_rowid, chunk_id, posting_id, title, location, seniority) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def remove_members(self, posting_ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM members WHERE posting_id = ?", [(posting_id,) for posting_id in posting_ids])
+            self._conn.commit()
+
+    def matching_members(self, chunk_ids, filters: dict) -> dict:
+        """
+        Map each of chunk_ids to (posting_id, {field: value}) pairs of its
+        postings that match filters, sorted by posting_id.
+        """
+        condition, filter_params = _filter_sql(filters)
+        chunk_ids = list(chunk_ids)
+        members = {}
+        with self._lock:
+            for i in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, posting_id, {', '.join(FILTER_FIELDS)} FROM members WHERE chunk_rowid IN ({','.join('?' * len(batch))})"
+                    f" AND {condition} ORDER BY posting_id",
+                    [_rowid(chunk_id) for chunk_id in batch] + filter_params
+                ).fetchall()
+                for chunk_id, posting_id, *values in rows:
+                    fields = {field: value for field, value in zip(FILTER_FIELDS, values) if value}
+                    members.setdefault(chunk_id, []).append((posting_id, fields))
+        return members
+
+    def search(self, text: str, n_results: int, filters: Optional[dict] = None) -> list:
+        """(chunk_id, bm25_score) pairs of the best matching chunks, best first."""
+        terms = query_terms(text)
+        if not terms:
+            return []
+
+        # Any term may match; BM25 ranks chunks matching more, rarer terms higher
+        match = " OR ".join(f'"{term}"' for term in terms)
+        sql = "SELECT chunk_id, bm25(chunks) AS score FROM chunks WHERE chunks MATCH ?"
+        params = [match]
+        if filters:
+            # The chunk's own metadata, or that of any posting sharing it
+            condition, filter_params = _filter_sql(filters)
+            sql += f" AND (({condition}) OR rowid IN (SELECT chunk_rowid FROM members WHERE {condition}))"
+            params.extend(filter_params + filter_params)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(n_results)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # FTS5 reports BM25 negated so that smaller sorts first
+        return [(chunk_id, -score) for chunk_id, score in rows]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,210 @@
+import sys
+from pathlib import Path
+# Add parent directory to path to import prompts
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import threading
+from typing import Optional
+
+from rag_components.init_db import get_jobs_collection
+from rag_components.retriever import JobRetriever
+from rag_components.embeddings import load_embedding_model, embedding_fingerprint
+from rag_components.keyword_index import KeywordIndex, DEFAULT_KEYWORD_INDEX_PATH
+from rag_components.skill_taxonomy import SkillTaxonomy
+from rag_components.skill_stats import LocalSkillRecommender, DEFAULT_SKILL_STATS_PATH
+from cache import get_embedding_cache
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Process-wide state. Streamlit re-runs the script on every interaction but
+# keeps imported modules alive, so anything stored here survives reruns and is
+# shared by every session served by the same process.
+_lock = threading.RLock()
+_models = {}
+_collection = None
+_keyword_index = None
+_retrievers = {}
+_skill_taxonomy = None
+_local_recommender = None
+_warmed = set()
+_active_model_name = DEFAULT_MODEL_NAME
+
+
+def get_embedding_model(model_name: Optional[str] = None):
+    """
+    Return the shared embedding model for model_name, loading it once with
+    the configured EMBEDDING_BACKEND.
+    Defaults to the currently active model.
+    """
+    model_name = model_name or _active_model_name
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have finished loading while we waited for the lock
+        model = _models.get(model_name)
+        if model is None:
+            print(f"Loading embedding model ({model_name})...")
+            model = load_embedding_model(model_name)
+            _models[model_name] = model
+        return model
+
+
+def get_collection():
+    """Return the shared jobs collection, opening the Chroma client once."""
+    global _collection
+    if _collection is not None:
+        return _collection
+
+    with _lock:
+        if _collection is None:
+            _collection = get_jobs_collection()
+        return _collection
+
+
+def get_keyword_index() -> Optional[KeywordIndex]:
+    """
+    Return the shared BM25 keyword index, or None when seed_db has not built
+    one yet (retrieval then stays dense-only).
+    """
+    global _keyword_index
+    if _keyword_index is not None or not DEFAULT_KEYWORD_INDEX_PATH.exists():
+        return _keyword_index
+
+    with _lock:
+        if _keyword_index is None:
+            _keyword_index = KeywordIndex(DEFAULT_KEYWORD_INDEX_PATH)
+        return _keyword_index
+
+
+def get_retriever(top_k: int = 5) -> JobRetriever:
+    """
+    Return a shared JobRetriever backed by the active model and collection.
+    Retrievers are cheap wrappers, one is kept per top_k value.
+    """
+    key = (_active_model_name, top_k)
+    retriever = _retrievers.get(key)
+    if retriever is not None:
+        return retriever
+
+    with _lock:
+        key = (_active_model_name, top_k)
+        retriever = _retrievers.get(key)
+        if retriever is None:
+            retriever = JobRetriever(
+                model_name=_active_model_name,
+                top_k=top_k,
+                model=get_embedding_model(_active_model_name),
+                collection=get_collection(),
+                keyword_index=get_keyword_index(),
+                embedding_cache=get_embedding_cache()
+            )
+            _retrievers[key] = retriever
+        return retriever
+
+
+def get_skill_taxonomy() -> SkillTaxonomy:
+    """
+    Return the shared skill taxonomy, matching with the active embedding
+    model (alias hits only if the model cannot be loaded).
+    """
+    global _skill_taxonomy
+    if _skill_taxonomy is not None:
+        return _skill_taxonomy
+
+    with _lock:
+        if _skill_taxonomy is None:
+            try:
+                model = get_embedding_model(_active_model_name)
+            except Exception as e:
+                print(f"Skill taxonomy falls back to alias matching: {e}")
+                model = None
+            _skill_taxonomy = SkillTaxonomy.load(model=model, fingerprint=embedding_fingerprint(_active_model_name))
+        return _skill_taxonomy
+
+
+def get_local_recommender() -> Optional[LocalSkillRecommender]:
+    """
+    Return the shared LLM-free skill recommender, or None when seed_db has
+    not written the skill statistics yet or they cannot be loaded.
+    """
+    global _local_recommender
+    if _local_recommender is not None or not DEFAULT_SKILL_STATS_PATH.exists():
+        return _local_recommender
+
+    with _lock:
+        if _local_recommender is None:
+            try:
+                _local_recommender = LocalSkillRecommender.load(get_skill_taxonomy(), DEFAULT_SKILL_STATS_PATH)
+            except Exception as e:
+                print(f"Could not load the skill statistics: {e}")
+        return _local_recommender
+
+
+def warm_up(model_name: Optional[str] = None):
+    """
+    Load the embedding model and open the collection ahead of the first request.
+    Runs a throwaway encode so lazy framework initialisation happens here too.
+    Safe to call repeatedly; only the first call does any work.
+    """
+    model_name = model_name or _active_model_name
+    model = get_embedding_model(model_name)
+    get_collection()
+    if model_name in _warmed:
+        return
+    model.encode(["warm-up"])
+    _warmed.add(model_name)
+
+
+def swap_model(model_name: str):
+    """
+    Hot-swap the active embedding model without restarting the process.
+    The new model is loaded before the switch, so in-flight requests keep using
+    the old one. The collection must have been built with a compatible model.
+    """
+    global _active_model_name, _skill_taxonomy
+    new_model = load_embedding_model(model_name)
+
+    with _lock:
+        old_name = _active_model_name
+        _models[model_name] = new_model
+        _active_model_name = model_name
+        _retrievers.clear()
+        _skill_taxonomy = None
+        _warmed.discard(model_name)
+        if old_name != model_name:
+            _models.pop(old_name, None)
+            _warmed.discard(old_name)
+
+
+def swap_collection(collection=None, keyword_index: Optional[KeywordIndex] = None):
+    """
+    Hot-swap the jobs collection, e.g. after a re-seed.
+    Reopens the default collection when none is given. The keyword index is
+    replaced by keyword_index, or reopened so it matches the re-seeded collection.
+    """
+    global _collection, _keyword_index, _local_recommender
+    if collection is None:
+        collection = get_jobs_collection()
+
+    with _lock:
+        _collection = collection
+        _keyword_index = keyword_index
+        # seed_db rewrites the skill statistics too, reload them on next use
+        _local_recommender = None
+        _retrievers.clear()
+
+
+def reset():
+    """Drop every cached model, collection, retriever, the skill taxonomy and the local recommender."""
+    global _collection, _keyword_index, _active_model_name, _skill_taxonomy, _local_recommender
+    with _lock:
+        _models.clear()
+        _retrievers.clear()
+        _skill_taxonomy = None
+        _local_recommender = None
+        _warmed.clear()
+        _collection = None
+        _keyword_index = None
+        _active_model_name = DEFAULT_MODEL_NAME
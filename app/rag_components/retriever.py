@@ -3,34 +3,314 @@ from pathlib import Path
 # Add parent directory to path to import prompts
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sentence_transformers import SentenceTransformer
+import os
+
+import numpy as np
 from rag_components.init_db import get_jobs_collection
+from rag_components.keyword_index import build_chroma_where, matches_filters
+from rag_components.embeddings import load_embedding_model, embedding_fingerprint
 from prompts import job_query_prompt_template
-import torch
+from text_normalization import split_resume_sections
+from tracing import traced, stage
+
+# Chunks fetched per posting slot, so k distinct postings survive grouping
+FETCH_MULTIPLIER = int(os.getenv("RETRIEVER_FETCH_MULTIPLIER", 4))
+# How chunk similarities of one posting combine: "max" or "sum"
+SCORE_AGGREGATION = os.getenv("RETRIEVER_AGGREGATION", "max")
+# MMR trade-off between relevance (1.0) and diversity (0.0); empty disables MMR
+_mmr_lambda = os.getenv("RETRIEVER_MMR_LAMBDA", "0.7")
+MMR_LAMBDA = float(_mmr_lambda) if _mmr_lambda else None
+# Fuse BM25 keyword hits with the dense results when a keyword index is available
+HYBRID_SEARCH = os.getenv("RETRIEVER_HYBRID", "true").lower() == "true"
+# Reciprocal rank fusion constant, larger values flatten the rank curve
+RRF_K = int(os.getenv("RETRIEVER_RRF_K", 60))
+# Resume sections embedded when querying with the raw resume text (single-call
+# mode), most telling first since the embedding model truncates long input
+RESUME_QUERY_SECTIONS = ("SUMMARY", "OBJECTIVE", "SKILLS", "EXPERIENCE", "WORK EXPERIENCE", "PROFESSIONAL EXPERIENCE", "PROJECTS", "CERTIFICATIONS")
+RESUME_QUERY_MAX_CHARS = 2000
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def group_by_posting(metadatas: list, similarities: np.ndarray, aggregation: str = "max"):
+    """
+    Group chunk hits by posting (posting_id metadata, falling back to the
+    title for chunks stored before postings had IDs). Returns
+    (keys, best_chunk_index, scores) with one entry per posting in first-hit order.
+    """
+    keys, best, scores = [], [], []
+    slots = {}
+    for i, metadata in enumerate(metadatas):
+        metadata = metadata or {}
+        key = str(metadata.get('posting_id') or metadata.get('title') or i)
+        # A shared chunk whose owner is no longer a member is credited to a
+        # current one, when the posting_ids list is complete
+        listed = str(metadata.get('posting_ids') or "").split(",")
+        if listed[0] and key not in listed and len(listed) >= int(metadata.get('posting_count') or 0):
+            key = listed[0]
+        slot = slots.get(key)
+        if slot is None:
+            slots[key] = len(keys)
+            keys.append(key)
+            best.append(i)
+            scores.append(float(similarities[i]))
+            continue
+        if similarities[i] > similarities[best[slot]]:
+            best[slot] = i
+        if aggregation == "sum":
+            scores[slot] += float(similarities[i])
+        else:
+            scores[slot] = max(scores[slot], float(similarities[i]))
+    return keys, best, np.asarray(scores)
+
+
+def reciprocal_rank_fusion(rankings: list, size: int, k: int = RRF_K) -> np.ndarray:
+    """
+    Fuse several rankings of the same candidates: each ranking is a list of
+    candidate indices, best first, and contributes 1 / (k + rank) per candidate.
+    """
+    fused = np.zeros(size)
+    for ranking in rankings:
+        fused[np.asarray(ranking, dtype=int)] += 1.0 / (k + np.arange(1, len(ranking) + 1))
+    return fused
+
+
+def mmr_select(relevance: np.ndarray, embeddings: np.ndarray, k: int, lambda_mult: float) -> list:
+    """
+    Maximal marginal relevance over normalised embeddings: repeatedly pick the
+    candidate maximising lambda * relevance - (1 - lambda) * (highest
+    similarity to anything already picked). Returns candidate indices in pick order.
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    similarity = embeddings @ embeddings.T
+    # Put relevance on the same 0-1 scale as the similarities (sum aggregation can exceed 1)
+    relevance = relevance / max(float(relevance.max()), 1e-12)
+
+    selected = [int(np.argmax(relevance))]
+    closest = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * closest
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(closest, similarity[pick], out=closest)
+    return selected
+
 
 class JobRetriever:
-    def __init__(self, model_name="all-MiniLM-L6-v2", top_k=5):
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model = SentenceTransformer(model_name, device=device)
-        self.collection = get_jobs_collection()
+    @traced("retriever_init")
+    def __init__(self, model_name="all-MiniLM-L6-v2", top_k=5, model=None, collection=None, fetch_multiplier=None, aggregation=None, mmr_lambda=MMR_LAMBDA, keyword_index=None, embedding_cache=None):
+        # Prefer rag_components.registry.get_retriever(), which passes in a
+        # shared model and collection instead of loading new ones here.
+        self.model = model if model is not None else load_embedding_model(model_name)
+        self.collection = collection if collection is not None else get_jobs_collection()
         self.top_k = top_k
+        self.fetch_multiplier = fetch_multiplier or FETCH_MULTIPLIER
+        self.aggregation = aggregation or SCORE_AGGREGATION
+        self.mmr_lambda = mmr_lambda
+        self.keyword_index = keyword_index if HYBRID_SEARCH else None
+        # Chunk memberships resolve filters on shared chunks, even without hybrid search
+        self.membership_index = keyword_index
+        # Optional cache.EmbeddingCache for query vectors
+        self.embedding_cache = embedding_cache
+        self._fingerprint = embedding_fingerprint(model_name)
+
+    def _keyword_candidates(self, query_text: str, filters, ids: list, documents: list, metadatas: list, embeddings: list) -> list:
+        """
+        Run the BM25 search and append chunks only it found to the candidate
+        lists (fetched from Chroma by ID). Returns the BM25 ranking as
+        candidate indices, best first.
+        """
+        hits = self.keyword_index.search(query_text, self.top_k * self.fetch_multiplier, filters)
+        positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+
+        missing = [chunk_id for chunk_id, _ in hits if chunk_id not in positions]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=['documents', 'metadatas', 'embeddings'])
+            for chunk_id, document, metadata, embedding in zip(fetched['ids'], fetched['documents'], fetched['metadatas'], fetched['embeddings']):
+                positions[chunk_id] = len(ids)
+                ids.append(chunk_id)
+                documents.append(document)
+                metadatas.append(metadata)
+                embeddings.append(embedding)
+
+        # Hits missing from Chroma (index out of sync) are skipped
+        return [positions[chunk_id] for chunk_id, _ in hits if chunk_id in positions]
+
+    def _filter_shared(self, filters: dict, ids: list, metadatas: list) -> tuple:
+        """
+        (kept candidate indices, metadatas). A candidate whose own metadata
+        fails filters is a shared chunk fetched for its other postings: it is
+        kept, credited to its first matching posting (whose title and filter
+        fields replace the chunk's), only if one matches.
+        """
+        failing = [i for i, metadata in enumerate(metadatas) if not matches_filters(metadata, filters)]
+        members = self.membership_index.matching_members([ids[i] for i in failing], filters) if failing else {}
+        failing = set(failing)
+        kept, resolved = [], []
+        for i, metadata in enumerate(metadatas):
+            if i in failing:
+                matching = members.get(ids[i])
+                if not matching:
+                    continue
+                posting_id, fields = matching[0]
+                metadata = {
+                    **(metadata or {}), **fields,
+                    'posting_id': posting_id,
+                    'posting_ids': ",".join(member for member, _ in matching),
+                    'posting_count': len(matching)
+                }
+            kept.append(i)
+            resolved.append(metadata)
+        return kept, resolved
+
+    def _query(self, query_texts: list, query_embeddings: list, filters=None) -> dict:
+        """
+        Over-fetch chunks for each query and collapse them into top_k distinct
+        postings. With a keyword index the dense and BM25 rankings are merged
+        by reciprocal rank fusion. Each posting is represented by its best
+        matching chunk; the result keeps Chroma's list-per-query layout with
+        cosine distances and adds a 'scores' list.
+
+        Filters are matched against the metadata of the posting that stored a
+        chunk. With a keyword index, shared chunks are fetched regardless and
+        kept when any posting using them matches (see _filter_shared).
+        """
+        where = build_chroma_where(filters)
+        if where is not None and self.membership_index is not None:
+            where = {"$or": [where, {"posting_count": {"$gt": 1}}]}
+        with stage("chroma_query"):
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=self.top_k * self.fetch_multiplier,
+                where=where,
+                include=['documents', 'metadatas', 'embeddings']
+            )
+
+        grouped = {'ids': [], 'documents': [], 'metadatas': [], 'distances': [], 'scores': []}
+        for q, (query_text, query_embedding) in enumerate(zip(query_texts, query_embeddings)):
+            ids = list(results['ids'][q])
+            documents = list(results['documents'][q])
+            metadatas = list(results['metadatas'][q])
+            embeddings = list(results['embeddings'][q])
+
+            rankings = [list(range(len(ids)))]
+            if self.keyword_index is not None:
+                rankings.append(self._keyword_candidates(query_text, filters, ids, documents, metadatas, embeddings))
+
+            if filters and self.membership_index is not None and ids:
+                kept, metadatas = self._filter_shared(filters, ids, metadatas)
+                positions = {old: new for new, old in enumerate(kept)}
+                ids = [ids[i] for i in kept]
+                documents = [documents[i] for i in kept]
+                embeddings = [embeddings[i] for i in kept]
+                rankings = [[positions[i] for i in ranking if i in positions] for ranking in rankings]
+
+            if not ids:
+                for values in grouped.values():
+                    values.append([])
+                continue
+
+            chunk_embeddings = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+            similarities = chunk_embeddings @ _normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+            relevance = similarities if len(rankings) == 1 else reciprocal_rank_fusion(rankings, len(ids))
+
+            keys, best, scores = group_by_posting(metadatas, relevance, self.aggregation)
+            if self.mmr_lambda is None:
+                order = list(np.argsort(-scores, kind="stable")[:self.top_k])
+            else:
+                order = mmr_select(scores, chunk_embeddings[best], self.top_k, self.mmr_lambda)
+
+            grouped['ids'].append([keys[i] for i in order])
+            grouped['documents'].append([documents[best[i]] for i in order])
+            grouped['metadatas'].append([metadatas[best[i]] for i in order])
+            grouped['distances'].append([1.0 - float(similarities[best[i]]) for i in order])
+            grouped['scores'].append([float(scores[i]) for i in order])
+        return grouped
 
     def embed_query(self, query: str):
-        return self.model.encode([query])[0]
+        return self.embed_queries([query])[0]
 
-    def retrieve_similar_jobs(self, job_role_str: str, skills_str: str, education_str :str, experience_str: str):
-        
-        job_query_prompt = job_query_prompt_template.format(
+    @traced("embed_query")
+    def embed_queries(self, queries: list, batch_size: int = 64) -> np.ndarray:
+        """Embed queries, encoding only the ones missing from the embedding cache."""
+        if self.embedding_cache is None:
+            return np.asarray(self.model.encode(queries, batch_size=batch_size), dtype=np.float32)
+
+        keys = [self.embedding_cache.key(query, self._fingerprint) for query in queries]
+        vectors = self.embedding_cache.get_many(keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = self.model.encode([queries[i] for i in missing], batch_size=batch_size)
+            self.embedding_cache.put_many([keys[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return np.asarray(vectors, dtype=np.float32)
+
+    def build_query(self, job_role_str: str, skills_str: str, education_str: str, experience_str: str) -> str:
+        return job_query_prompt_template.format(
             job_role=job_role_str,
             skills=skills_str,
             education=education_str,
             experience=experience_str
         )
+
+    def build_resume_query(self, resume_text: str) -> str:
+        """
+        Query text for a resume that has not been through extraction: its
+        detected sections in RESUME_QUERY_SECTIONS order, or the text itself
+        when no headings are found.
+        """
+        sections = split_resume_sections(resume_text)
+        parts = [f"{heading.title()}: {sections[heading]}" for heading in RESUME_QUERY_SECTIONS if sections.get(heading)]
+        query = "\n".join(parts) if parts else resume_text
+        return query[:RESUME_QUERY_MAX_CHARS]
+
+    @traced("retrieve_similar_jobs")
+    def retrieve_for_resume_text(self, resume_text: str, filters=None):
+        """
+        Like retrieve_similar_jobs, but queries with the cleaned resume text
+        (see build_resume_query), so retrieval can run before extraction.
+        """
+        query = self.build_resume_query(resume_text)
+
+        embedding = self.embed_query(query)
+
+        return self._query([query], [embedding.tolist()], filters)
+
+    @traced("retrieve_similar_jobs")
+    def retrieve_similar_jobs(self, job_role_str: str, skills_str: str, education_str :str, experience_str: str, filters=None):
+        """
+        filters restricts results by metadata, e.g. {"location": "Berlin",
+        "seniority": ["Entry level", "Associate"]} (see keyword_index.FILTER_FIELDS).
+        """
+        job_query_prompt = self.build_query(job_role_str, skills_str, education_str, experience_str)
         
         embedding = self.embed_query(job_query_prompt)
 
-        results = self.collection.query(
-            query_embeddings=[embedding],
-            n_results=self.top_k
-        )
-        return results
\ No newline at end of file
+        return self._query([job_query_prompt], [embedding.tolist()], filters)
+
+    @traced("retrieve_similar_jobs_batch")
+    def retrieve_similar_jobs_batch(self, profiles: list, filters=None):
+        """
+        Retrieve postings for many profiles at once: one encode call for all
+        queries and one multi-query Chroma request. Each profile is a dict of
+        the keyword arguments taken by retrieve_similar_jobs, filters apply to
+        all of them. Result lists are indexed in the same order as profiles.
+        """
+        if not profiles:
+            return {'ids': [], 'documents': [], 'metadatas': [], 'distances': [], 'scores': []}
+
+        queries = [self.build_query(**profile) for profile in profiles]
+        embeddings = self.embed_queries(queries, batch_size=64)
+
+        return self._query(queries, embeddings.tolist(), filters)
@@ -1,114 +1,572 @@
+import sys
+from pathlib import Path
+# Add app directory to path so sibling modules can import text_normalization
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 import pandas as pd
 import os
-from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
-import torch
-from sentence_transformers import SentenceTransformer
-import re
+import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 try:
-    from app.rag_components.init_db import get_jobs_collection
+    from app.rag_components.init_db import get_chroma_client, get_jobs_collection
+    from app.rag_components.ingest_state import IngestState, DEFAULT_STATE_PATH
+    from app.rag_components.chunking import TokenChunker, load_tokenizer, chunk_prefix, chunk_body_hash, DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS
+    from app.rag_components.dedup import ChunkDeduplicator, minhash_signature, band_keys, DEFAULT_THRESHOLD
+    from app.rag_components.keyword_index import KeywordIndex, DEFAULT_KEYWORD_INDEX_PATH, FILTER_FIELDS
+    from app.rag_components.embeddings import load_embedding_model, embedding_fingerprint
+    from app.rag_components.skill_taxonomy import SkillTaxonomy
+    from app.rag_components.skill_stats import MentionMatcher, SkillStats, DEFAULT_SKILL_STATS_PATH
 except ImportError:
-    from init_db import get_jobs_collection
+    from init_db import get_chroma_client, get_jobs_collection
+    from ingest_state import IngestState, DEFAULT_STATE_PATH
+    from chunking import TokenChunker, load_tokenizer, chunk_prefix, chunk_body_hash, DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS
+    from dedup import ChunkDeduplicator, minhash_signature, band_keys, DEFAULT_THRESHOLD
+    from keyword_index import KeywordIndex, DEFAULT_KEYWORD_INDEX_PATH, FILTER_FIELDS
+    from embeddings import load_embedding_model, embedding_fingerprint
+    from skill_taxonomy import SkillTaxonomy
+    from skill_stats import MentionMatcher, SkillStats, DEFAULT_SKILL_STATS_PATH
+
+DEFAULT_CSV_PATH = Path('data') / 'cleaned_job_postings.csv'
+DEFAULT_CHECKPOINT_PATH = Path('database') / 'seed_checkpoint.json'
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Bump when chunking changes so the next refresh re-embeds every posting.
+# It is folded into each posting's content hash together with the model name.
+CHUNKER_VERSION = '2'
 
-def clean_dataset(dataset):
-    jobs_data = dataset[['title', 'description']]
+# A shared chunk lists at most this many posting IDs in its Chroma metadata;
+# posting_count and the ingest state always hold the full membership.
+MAX_LISTED_POSTINGS = 100
+
+def clean_dataset(dataset, id_column=None, metadata_columns=None):
+    columns = ['title', 'description']
+    if id_column:
+        columns.append(id_column)
+    columns.extend((metadata_columns or {}).values())
+    jobs_data = dataset[columns]
     return jobs_data
     
-def chunk_text(title: str, description: str, max_word_count=100):
+# Set in each worker process by init_chunker
+_chunker = None
+
+
+def init_chunker(model_name=EMBEDDING_MODEL_NAME, max_tokens=DEFAULT_MAX_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS):
+    """Process pool initializer: load the embedding model's tokenizer once per worker."""
+    global _chunker
+    _chunker = TokenChunker(load_tokenizer(model_name), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+
+def chunk_text(title: str, description: str):
     if not description:
         return []
-    
-    chunks = []
-
-    # Remove invisible Unicode chars (zero-width, non-breaking spaces, etc.)
-    description = re.sub(r'[\u200B-\u200D\uFEFF]', '', description)
-    # Remove control chars except newlines (\x0A, \x0D) and tabs (\x09)
-    description = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1f\x7f-\x9f]', '', description)
-
-    # Collapse excessive whitespace
-    description = re.sub(r'\n+', '\n', description)
-    description = re.sub(r'[ \t]+', ' ', description)
-    description = re.sub(r'\s{2,}', ' ', description)
-
-    # Replace common bullets with "-"
-    description = re.sub(r'[\u2022\u2023\u25E6\u2043\u2219\u25AA\u25AB]', '\n-', description)
-    description = description.replace('•', '\n-')
-    description = re.sub(r'\so\s', '\n-', description)
-
-    description_words = description.split()
-
-    # Iteratively build chunks
-    for i in range(0, len(description_words), max_word_count):
-        chunk_words = description_words[i:i + max_word_count]
-        chunk_text = ' '.join(chunk_words)
-        
-        # Add title context to each chunk
-        formatted_chunk = f"Job Title: {title}\nDescription: {chunk_text}"
-        chunks.append(formatted_chunk)
-        
-    # print(len(chunks))
-    return chunks        
-
-def main():
-    path = os.getcwd()
-    path = Path(path) / 'data' / 'cleaned_job_postings.csv'
-    
-    dataset = pd.read_csv(path)
-    dataset = clean_dataset(dataset)
+    if _chunker is None:
+        init_chunker()
+    return _chunker.chunk(title, description)
 
-    device = 'cuda' if torch.cuda.is_available() else 'cpu'
-    model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
 
-    collection = get_jobs_collection()
+def chunk_record_id(body: str) -> str:
+    """
+    Chunks are addressed by their description text and the vector space they
+    are embedded in, so identical boilerplate (EEO statements, benefits
+    blurbs) in many postings is embedded once per space. After switching to
+    a backend with other vectors (onnx-int8), shared chunks are embedded
+    again rather than reused from the old space.
+    """
+    space = hashlib.sha1(embedding_fingerprint(EMBEDDING_MODEL_NAME).encode('utf-8')).hexdigest()[:8]
+    return f"chunk-{space}-{chunk_body_hash(body)[:24]}"
 
-    documents = []
-    metadatas = []
-    ids = []
-    embeddings = []
-    document_id = 0
 
+def posting_key(title: str, description: str) -> str:
+    """Stable identifier for a posting, derived from its content rather than its row number."""
+    return hashlib.sha1(f"{title}\n{description}".encode('utf-8')).hexdigest()[:20]
 
-    for idx, row in dataset.iterrows():
-        if pd.notna(row.get('description')):
-            title = str(row.get('title', 'Undefined')).strip()
-            description = str(row.get('description', 'Undefined')).strip()
-            
-            if not title or not description or description == 'Undefined':
-                continue
 
-            chunks = chunk_text(title, description)
+def content_hash(title: str, description: str, chunk_settings: str = "") -> str:
+    """Hash of everything that determines a posting's chunks and embeddings."""
+    # Backends producing the same vectors share a fingerprint; switching to one
+    # that does not (onnx-int8) re-embeds every posting
+    fingerprint = f"{CHUNKER_VERSION}\n{embedding_fingerprint(EMBEDDING_MODEL_NAME)}\n{chunk_settings}\n{title}\n{description}"
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+
+
+def prepare_postings(frame, id_column=None, chunk_settings="", metadata_columns=None):
+    """
+    Turn a dataframe slice into (posting_id, content_hash, title, description,
+    extra_metadata) tuples, skipping rows without a usable description.
+    metadata_columns maps filterable metadata fields (location, seniority) to
+    CSV columns; their values are stored on every chunk of the posting.
+    Without an id column the posting is identified by its content, so an edit
+    shows up as one posting vanishing and another appearing. A posting_id that
+    repeats within the slice keeps its last row.
+    """
+    metadata_columns = metadata_columns or {}
+    ids = frame[id_column].tolist() if id_column else [None] * len(frame)
+    extra_values = [frame[column].tolist() for column in metadata_columns.values()]
+    postings = {}
+    for row, (posting_id, title, description) in enumerate(zip(ids, frame['title'].tolist(), frame['description'].tolist())):
+        if not isinstance(description, str) or not description.strip():
+            continue
+        title = str(title if isinstance(title, str) else 'Undefined').strip()
+        description = description.strip()
+
+        if not title or not description or description == 'Undefined':
+            continue
+
+        if posting_id is None or pd.isna(posting_id):
+            posting_id = posting_key(title, description)
+        elif isinstance(posting_id, float) and posting_id.is_integer():
+            # Integer IDs are read as floats when the column has gaps
+            posting_id = int(posting_id)
+        extra = {
+            field: str(values[row]).strip()
+            for field, values in zip(metadata_columns, extra_values)
+            if isinstance(values[row], str) and values[row].strip()
+        }
+        fingerprint = chunk_settings + "".join(f"\n{field}={value}" for field, value in sorted(extra.items()))
+        postings[str(posting_id)] = (str(posting_id), content_hash(title, description, fingerprint), title, description, extra)
+    return list(postings.values())
+
+
+def _chunk_rows(postings):
+    """
+    Worker for the process pool: turn postings into
+    (id, document, metadata, minhash_signature) records ready for embedding.
+    """
+    if _chunker is None:
+        init_chunker()
+    records = []
+    for posting_id, posting_hash, title, description, extra in postings:
+        for chunk_idx, body in enumerate(_chunker.chunk_bodies(title, description)):
+            chunk = chunk_prefix(title) + body
+            # A chunk shared by several postings keeps the metadata of the one
+            # that stored it first, until that posting is released
+            metadata = {
+                'title': title,
+                'word_count': len(chunk.split()),
+                'posting_id': posting_id,
+                'content_hash': posting_hash,
+                'chunk_index': chunk_idx,
+                'posting_ids': posting_id,
+                'posting_count': 1,
+                **extra
+            }
+            records.append((chunk_record_id(body), chunk, metadata, minhash_signature(body)))
+    return records
+
 
-            for chunk_idx, chunk in enumerate(chunks):
-                documents.append(chunk)
+def iter_chunk_records(postings, executor, rows_per_task=200):
+    """Chunk postings in the process pool, yielding records in posting order."""
+    tasks = [postings[i:i + rows_per_task] for i in range(0, len(postings), rows_per_task)]
+    for records in executor.map(_chunk_rows, tasks):
+        yield from records
 
-                metadata = {
-                    'title': title,
-                    'word_count': len(chunk.split())
+
+def upsert_records(model, collection, records, encode_batch_size):
+    """
+    Embed and upsert records into Chroma in batches of encode_batch_size.
+    Chroma rejects a whole upsert that repeats an ID, so only the first record
+    of each chunk ID is kept (repeated CSV rows chunk to the same IDs).
+    """
+    unique = {}
+    for record in records:
+        unique.setdefault(record[0], record)
+    records = list(unique.values())
+    for i in range(0, len(records), encode_batch_size):
+        batch = records[i:i + encode_batch_size]
+        ids = [record[0] for record in batch]
+        documents = [record[1] for record in batch]
+        metadatas = [record[2] for record in batch]
+
+        embeddings = model.encode(documents, batch_size=min(len(documents), 256), show_progress_bar=False)
+
+        collection.upsert(
+            ids=ids,
+            embeddings=embeddings.tolist(),
+            documents=documents,
+            metadatas=metadatas
+        )
+
+
+def refresh_posting_lists(collection, state, chunk_ids, batch_size=500):
+    """Write the current posting membership of shared chunks into their Chroma metadata."""
+    members = state.chunk_postings(chunk_ids)
+    chunk_ids = sorted(members)
+    for i in range(0, len(chunk_ids), batch_size):
+        batch = chunk_ids[i:i + batch_size]
+        collection.update(
+            ids=batch,
+            metadatas=[
+                {
+                    'posting_ids': ",".join(members[chunk_id][:MAX_LISTED_POSTINGS]),
+                    'posting_count': len(members[chunk_id])
                 }
+                for chunk_id in batch
+            ]
+        )
 
-                metadatas.append(metadata)
-                ids.append(document_id)
 
-                document_id+=1
+def posting_metadata(posting) -> dict:
+    """The per-posting part of a chunk's metadata, as recorded in the ingest state."""
+    posting_id, posting_hash, title, _, extra = posting
+    return {'posting_id': posting_id, 'content_hash': posting_hash, 'title': title, **extra}
 
-    BATCH_SIZE = 100
 
-    for i in range(0, len(documents), BATCH_SIZE):
-        batch_docs = documents[i: i+BATCH_SIZE]
-        batch_embeddings = model.encode(batch_docs, show_progress_bar=True)
-        embeddings.extend(batch_embeddings.tolist())
-        print(f"Processed batch {i//BATCH_SIZE + 1}/{(len(documents)-1)//BATCH_SIZE + 1}")
+def reassign_owners(collection, state, keyword_index, chunk_ids, batch_size=500):
+    """
+    Hand shared chunks whose owning posting (posting_id, title and filter
+    metadata) was released to the first remaining member, so hits on them
+    are credited and filtered as a posting that still exists.
+    """
+    members = state.chunk_postings(chunk_ids)
+    chunk_ids = sorted(members)
+    for i in range(0, len(chunk_ids), batch_size):
+        found = collection.get(ids=chunk_ids[i:i + batch_size], include=['metadatas', 'documents'])
+        orphaned = [
+            (chunk_id, document, metadata or {})
+            for chunk_id, document, metadata in zip(found['ids'], found['documents'], found['metadatas'])
+            if (metadata or {}).get('posting_id') not in members[chunk_id]
+        ]
+        if not orphaned:
+            continue
 
-        print("Storing in ChromaDB...")
-    
-    # collection.add(
-    #     embeddings=embeddings,
-    #     documents=documents,
-    #     metadatas=metadatas,
-    #     ids=ids
-    # )
+        owners = state.posting_metadata(members[chunk_id][0] for chunk_id, _, _ in orphaned)
+        updates = []
+        for chunk_id, document, metadata in orphaned:
+            owner_id = members[chunk_id][0]
+            owner = owners.get(owner_id, {'posting_id': owner_id})
+            # Fields the new owner lacks are blanked rather than inherited
+            new_metadata = {field: "" for field in FILTER_FIELDS if field in metadata}
+            new_metadata.update(owner)
+            updates.append((chunk_id, document, {**metadata, **new_metadata}))
+
+        collection.update(ids=[update[0] for update in updates], metadatas=[update[2] for update in updates])
+        keyword_index.add(updates)
+
+
+def release_postings(collection, state, keyword_index, posting_ids, batch_size=500):
+    """
+    Remove postings from the collection: chunks no other posting uses are
+    deleted, shared chunks stay with an updated posting list (and a new owner
+    if the released posting stored them). Chunks written
+    before chunks were content-addressed are found through their posting_id
+    metadata.
+    """
+    posting_ids = list(posting_ids)
+    orphaned, still_shared = state.release_postings(posting_ids)
+    for i in range(0, len(posting_ids), batch_size):
+        batch = posting_ids[i:i + batch_size]
+        found = collection.get(where={'posting_id': {'$in': batch}}, include=[])
+        orphaned.extend(chunk_id for chunk_id in found['ids'] if not chunk_id.startswith('chunk-'))
+    for i in range(0, len(orphaned), batch_size):
+        collection.delete(ids=orphaned[i:i + batch_size])
+    keyword_index.remove(orphaned)
+    keyword_index.remove_members(posting_ids)
+    refresh_posting_lists(collection, state, still_shared)
+    reassign_owners(collection, state, keyword_index, still_shared)
+
+
+def rebuild_state_from_collection(collection, state, run_id, page_size=10000):
+    """
+    Recreate the local ingest state from chunk metadata already in Chroma,
+    e.g. when the state file was lost. Chunks written before postings carried
+    a content hash cannot be diffed and are deleted so they get re-embedded.
+    """
+    postings = {}
+    memberships = []
+    signatures = []
+    legacy_ids = []
+    offset = 0
+    while True:
+        page = collection.get(include=['metadatas', 'documents'], limit=page_size, offset=offset)
+        if not page['ids']:
+            break
+        for chunk_id, metadata, document in zip(page['ids'], page['metadatas'], page['documents']):
+            metadata = metadata or {}
+            if 'posting_id' not in metadata or 'content_hash' not in metadata:
+                legacy_ids.append(chunk_id)
+                continue
+            posting_id = metadata['posting_id']
+            # Members beyond MAX_LISTED_POSTINGS are not listed; those postings
+            # look new on the next run and are matched to this chunk again
+            listed = str(metadata.get('posting_ids') or posting_id).split(",")
+            memberships.extend((chunk_id, member) for member in listed)
+            if chunk_id.startswith('chunk-'):
+                prefix = chunk_prefix(metadata.get('title', ''))
+                body = document[len(prefix):] if document.startswith(prefix) else document
+                signature = minhash_signature(body)
+                signatures.append((chunk_id, signature.tobytes(), band_keys(signature)))
+            _, count = postings.get(posting_id, (None, 0))
+            postings[posting_id] = (metadata['content_hash'], count + 1)
+        offset += len(page['ids'])
+
+    state.record([(posting_id, posting_hash, count) for posting_id, (posting_hash, count) in postings.items()], run_id)
+    state.add_chunk_postings(memberships)
+    state.add_chunk_signatures(signatures)
+
+    for i in range(0, len(legacy_ids), page_size):
+        collection.delete(ids=legacy_ids[i:i + page_size])
+
+    print(f"Rebuilt ingest state for {len(postings)} postings ({len(legacy_ids)} legacy chunks removed)")
+
+
+def rebuild_keyword_index(collection, keyword_index, page_size=10000):
+    """Index every chunk already in Chroma, e.g. for a collection seeded before the keyword index existed."""
+    offset = 0
+    while True:
+        page = collection.get(include=['documents', 'metadatas'], limit=page_size, offset=offset)
+        if not page['ids']:
+            break
+        keyword_index.add(zip(page['ids'], page['documents'], page['metadatas']))
+        offset += len(page['ids'])
+    print(f"Built keyword index for {offset} chunks")
+
+
+def rebuild_members(state, keyword_index):
+    """
+    Fill the keyword index's chunk membership table from the ingest state,
+    e.g. for an index built before it tracked shared chunks per posting.
+    Members without recorded metadata are skipped.
+    """
+    added = 0
+    for pairs in state.iter_chunk_postings():
+        metadata = state.posting_metadata({posting_id for _, posting_id in pairs})
+        rows = [(chunk_id, posting_id, metadata[posting_id]) for chunk_id, posting_id in pairs if posting_id in metadata]
+        keyword_index.add_members(rows)
+        added += len(rows)
+    print(f"Recorded {added} chunk memberships in the keyword index")
+
+
+def record_skill_mentions(state, matcher, taxonomy, postings, pending_ids):
+    """
+    Scan postings for taxonomy skills, skipping unchanged postings already
+    scanned with the current taxonomy.
+    """
+    versions = state.skill_versions(posting[0] for posting in postings)
+    rows = [
+        (posting_id, title, [taxonomy.ids[index] for index in matcher.mentions(f"{title}\n{description}")])
+        for posting_id, _, title, description, _ in postings
+        if posting_id in pending_ids or versions.get(posting_id) != taxonomy.version
+    ]
+    state.record_skill_mentions(rows, taxonomy.version)
+    return len(rows)
+
+
+def export_skill_stats(state, taxonomy, path):
+    """Write the posting x skill and title x skill matrices of every stored posting."""
+    stats = SkillStats.build(state.iter_skill_mentions(), taxonomy.ids, taxonomy.version)
+    stats.save(path)
+    print(f"Saved skill statistics for {stats.posting_count} postings, {len(stats.titles)} titles and "
+          f"{len(stats.skill_ids)} skills ({len(stats.posting_indices)} mentions) to {path}")
+
+
+def load_checkpoint(checkpoint_path: Path, csv_path: Path):
+    """Return (rows_done, run_id) from an interrupted run, or (0, None)."""
+    if not checkpoint_path.exists():
+        return 0, None
+
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get('source') != str(csv_path.resolve()):
+        print(f"Checkpoint at {checkpoint_path} belongs to another file, starting from scratch.")
+        return 0, None
+
+    return int(checkpoint.get('rows_done', 0)), checkpoint.get('run_id')
+
+
+def save_checkpoint(checkpoint_path: Path, csv_path: Path, rows_done: int, run_id: int):
+    """Atomically record progress so a crash resumes after the last stored slice."""
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = checkpoint_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'source': str(csv_path.resolve()),
+            'rows_done': rows_done,
+            'run_id': run_id,
+            'updated_at': time.time()
+        }, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sync job postings from CSV into the Chroma jobs collection.")
+    parser.add_argument('--csv', type=Path, default=Path(os.getcwd()) / DEFAULT_CSV_PATH, help="Path to the job postings CSV")
+    parser.add_argument('--checkpoint', type=Path, default=Path(os.getcwd()) / DEFAULT_CHECKPOINT_PATH, help="Where progress of an unfinished run is recorded")
+    parser.add_argument('--state', type=Path, default=Path(os.getcwd()) / DEFAULT_STATE_PATH, help="Local record of indexed postings and their content hashes")
+    parser.add_argument('--id-column', default='job_id', help="CSV column holding a stable posting ID; content hashes are used when it is missing")
+    parser.add_argument('--location-column', default='location', help="CSV column stored as the filterable 'location' metadata, if present")
+    parser.add_argument('--seniority-column', default='formatted_experience_level', help="CSV column stored as the filterable 'seniority' metadata, if present")
+    parser.add_argument('--keyword-index', type=Path, default=DEFAULT_KEYWORD_INDEX_PATH, help="SQLite FTS5 file holding the BM25 keyword index")
+    parser.add_argument('--skill-stats', type=Path, default=DEFAULT_SKILL_STATS_PATH, help="Where the skill mention matrices for the local recommender are written")
+    parser.add_argument('--read-chunk-size', type=int, default=5000, help="CSV rows held in memory at a time")
+    parser.add_argument('--encode-batch-size', type=int, default=1024, help="Chunks embedded and upserted per batch")
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS, help="Chunk size in model tokens, special tokens and title included")
+    parser.add_argument('--chunk-overlap', type=int, default=DEFAULT_OVERLAP_TOKENS, help="Tokens of trailing sentences repeated at the start of the next chunk")
+    parser.add_argument('--near-dup-threshold', type=float, default=DEFAULT_THRESHOLD, help="Estimated Jaccard similarity above which a chunk reuses a stored one; 0 keeps exact matching only")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Processes used for cleaning and chunking")
+    parser.add_argument('--restart', action='store_true', help="Ignore any existing checkpoint")
+    parser.add_argument('--keep-missing', action='store_true', help="Do not delete postings that are no longer in the CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    csv_path = args.csv
+
+    rows_done, run_id = (0, None) if args.restart else load_checkpoint(args.checkpoint, csv_path)
+    if rows_done:
+        print(f"Resuming after row {rows_done}")
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    id_column = args.id_column if args.id_column in header else None
+    if id_column is None:
+        print(f"Column '{args.id_column}' not found, identifying postings by content hash.")
+    metadata_columns = {
+        field: column
+        for field, column in (('location', args.location_column), ('seniority', args.seniority_column))
+        if column in header
+    }
+    usecols = ['title', 'description'] + ([id_column] if id_column else []) + list(metadata_columns.values())
+
+    # Start the workers before loading the model so forked processes stay small
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=init_chunker,
+        initargs=(EMBEDDING_MODEL_NAME, args.max_tokens, args.chunk_overlap)
+    )
+    chunk_settings = f"{args.max_tokens}/{args.chunk_overlap}"
+
+    model = load_embedding_model(EMBEDDING_MODEL_NAME)
+    if args.max_tokens > model.max_seq_length:
+        print(f"Warning: --max-tokens {args.max_tokens} exceeds the model's limit of {model.max_seq_length}, chunks will be truncated.")
+
+    client = get_chroma_client()
+    collection = get_jobs_collection(client)
+    encode_batch_size = min(args.encode_batch_size, client.get_max_batch_size())
+
+    state = IngestState(args.state)
+    if state.is_empty() and collection.count() > 0:
+        rebuild_state_from_collection(collection, state, run_id=0)
+    if run_id is None:
+        run_id = state.next_run_id()
+    deduplicator = ChunkDeduplicator(state, threshold=args.near_dup_threshold)
+
+    keyword_index = KeywordIndex(args.keyword_index)
+    if keyword_index.is_empty() and collection.count() > 0:
+        rebuild_keyword_index(collection, keyword_index)
+    # Filled in from the ingest state once this run has recorded every posting's metadata
+    backfill_members = not keyword_index.has_members() and collection.count() > 0
+
+    # Alias matching only, no embedding model needed for mentions
+    taxonomy = SkillTaxonomy.load()
+    matcher = MentionMatcher(taxonomy)
+
+    rows_seen = 0
+    counts = {'new': 0, 'changed': 0, 'unchanged': 0, 'deleted': 0, 'chunks': 0, 'chunk_refs': 0, 'skill_scans': 0}
+    started = time.time()
+
+    try:
+        reader = pd.read_csv(csv_path, usecols=usecols, chunksize=args.read_chunk_size)
+        for frame in reader:
+            frame_start = rows_seen
+            rows_seen += len(frame)
+
+            # Already stored by a previous run
+            if rows_seen <= rows_done:
+                continue
+            if frame_start < rows_done:
+                frame = frame.iloc[rows_done - frame_start:]
+
+            frame = clean_dataset(frame, id_column, metadata_columns)
+            postings = prepare_postings(frame, id_column, chunk_settings, metadata_columns)
+
+            known = state.get_hashes(posting[0] for posting in postings)
+            pending = []
+            unchanged = []
+            for posting in postings:
+                if known.get(posting[0]) == posting[1]:
+                    unchanged.append(posting[0])
+                else:
+                    pending.append(posting)
+            state.mark_seen(unchanged, run_id)
+            state.record_metadata((posting[0], posting_metadata(posting)) for posting in postings)
+            counts['skill_scans'] += record_skill_mentions(state, matcher, taxonomy, postings, {posting[0] for posting in pending})
+
+            # Changed postings may now have fewer chunks, drop the old ones first
+            changed = [posting[0] for posting in pending if posting[0] in known]
+            release_postings(collection, state, keyword_index, changed)
+
+            chunk_counts = {}
+            memberships = []
+            member_rows = []
+            reused = set()
+            batch = []
+            for record in iter_chunk_records(pending, executor):
+                posting_id = record[2]['posting_id']
+                chunk_counts[posting_id] = chunk_counts.get(posting_id, 0) + 1
+                # Exact copies and near duplicates point at the chunk already stored or queued
+                existing = deduplicator.resolve(record[0], record[3])
+                if existing is not None:
+                    memberships.append((existing, posting_id))
+                    member_rows.append((existing, posting_id, record[2]))
+                    reused.add(existing)
+                    continue
+                memberships.append((record[0], posting_id))
+                member_rows.append((record[0], posting_id, record[2]))
+                batch.append(record)
+                if len(batch) >= encode_batch_size:
+                    upsert_records(model, collection, batch, encode_batch_size)
+                    keyword_index.add(batch)
+                    counts['chunks'] += len(batch)
+                    batch = []
+
+            if batch:
+                upsert_records(model, collection, batch, encode_batch_size)
+                keyword_index.add(batch)
+                counts['chunks'] += len(batch)
+            counts['chunk_refs'] += len(memberships)
+
+            # Recorded once every chunk of the slice is stored, so a crash re-embeds rather than loses chunks
+            deduplicator.commit()
+            state.add_chunk_postings(memberships)
+            keyword_index.add_members(member_rows)
+            refresh_posting_lists(collection, state, reused)
+            state.record([(posting[0], posting[1], chunk_counts.get(posting[0], 0)) for posting in pending], run_id)
+            save_checkpoint(args.checkpoint, csv_path, rows_seen, run_id)
+
+            counts['unchanged'] += len(unchanged)
+            counts['changed'] += len(changed)
+            counts['new'] += len(pending) - len(changed)
+
+            elapsed = time.time() - started
+            print(f"Synced rows up to {rows_seen} ({counts['new']} new, {counts['changed']} changed, "
+                  f"{counts['unchanged']} unchanged, {counts['chunks'] / max(elapsed, 1e-9):.1f} chunks/s)")
+    finally:
+        executor.shutdown()
+
+    if not args.keep_missing:
+        stale = state.stale_postings(run_id)
+        release_postings(collection, state, keyword_index, stale)
+        state.forget(stale)
+        counts['deleted'] = len(stale)
+
+    if backfill_members:
+        rebuild_members(state, keyword_index)
+    export_skill_stats(state, taxonomy, args.skill_stats)
+    state.close()
+    keyword_index.close()
+
+    # The run is complete, the next invocation starts a fresh sync
+    if args.checkpoint.exists():
+        args.checkpoint.unlink()
+
+    print(f"Done. {counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged, "
+          f"{counts['deleted']} deleted postings; {counts['chunks']} chunks embedded, "
+          f"{counts['chunk_refs'] - counts['chunks']} duplicate chunks reused.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
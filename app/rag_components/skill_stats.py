@@ -0,0 +1,255 @@
+"""
+Job-market skill statistics and an LLM-free skill-gap recommender.
+
+seed_db scans every posting for skill taxonomy mentions (MentionMatcher)
+and stores them as two sparse matrices in CSR form, kept as plain NumPy
+arrays in one .npz file:
+  - postings x skills, 1 where the posting mentions the skill;
+  - titles x skills, how many postings with that title mention the skill.
+
+LocalSkillRecommender turns the retrieved postings (weighted by retrieval
+score, smoothed with the rows of their titles) into a demand vector over the
+taxonomy, scales it by inverse document frequency so skills every posting
+lists (communication, teamwork) do not crowd out specific ones, masks the
+skills the user already has and returns the top of what is left. It is a
+few vector operations, used when the LLM is unavailable and optionally as
+the primary recommender for batch runs.
+"""
+
+import math
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+try:
+    from app.rag_components.skill_taxonomy import alias_key
+except ImportError:
+    from rag_components.skill_taxonomy import alias_key
+
+DEFAULT_SKILL_STATS_PATH = Path(__file__).resolve().parent.parent.parent / 'database' / 'skill_stats.npz'
+# Share of the demand vector taken from the postings' title rows
+TITLE_WEIGHT = float(os.getenv("LOCAL_RECOMMENDER_TITLE_WEIGHT", 0.3))
+DEFAULT_RECOMMENDATIONS = 9
+
+# Alias keys too common in ordinary prose to count as a skill mention in a
+# posting ("excel in a fast-paced team", "go to market", "net revenue")
+AMBIGUOUS_MENTIONS = frozenset({
+    "go", "next", "node", "express", "spring", "shell", "security", "testing", "excel", "swift", "rust",
+    "lambda", "oracle", "research", "sales", "dart", "torch", "transformers", "analytics", "net", "organization"
+})
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+class MentionMatcher:
+    """Finds taxonomy skills mentioned in free text by alias n-gram lookup."""
+
+    def __init__(self, taxonomy):
+        # Keys of one or two letters ("r", "c", "ml") match too much prose;
+        # symbols keep "c#" and "c++" specific enough
+        self.keys = {
+            key: index for key, index in taxonomy.aliases.items()
+            if (len(key) >= 3 or not key.isalnum()) and key not in AMBIGUOUS_MENTIONS
+        }
+        self.max_words = max(len(label.split()) for label, _ in taxonomy.labels)
+
+    def mentions(self, text: str) -> list:
+        """Sorted indices of the skills mentioned in text."""
+        tokens = [token.rstrip(".") for token in _TOKEN.findall(text.lower())]
+        found = set()
+        for n in range(1, self.max_words + 1):
+            for i in range(len(tokens) - n + 1):
+                index = self.keys.get(alias_key("".join(tokens[i:i + n])))
+                if index is not None:
+                    found.add(index)
+        return sorted(found)
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, data: Optional[np.ndarray], rows: np.ndarray, weights: np.ndarray, width: int) -> np.ndarray:
+    """Weighted sum of CSR rows as a dense vector of length width."""
+    if len(rows) == 0:
+        return np.zeros(width, dtype=np.float64)
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(width, dtype=np.float64)
+    # Positions of every stored entry of the selected rows, without a Python loop
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    positions = offsets + np.arange(total)
+    values = np.repeat(weights, lengths)
+    if data is not None:
+        values = values * data[positions]
+    return np.bincount(indices[positions], weights=values, minlength=width)
+
+
+def _to_csr(rows: list, width: int) -> tuple:
+    """(indptr, indices, data) of a list of {column: value} rows."""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(row) for row in rows])
+    indices = np.fromiter((column for row in rows for column in sorted(row)), dtype=np.int32, count=int(indptr[-1]))
+    data = np.fromiter((row[column] for row in rows for column in sorted(row)), dtype=np.float32, count=int(indptr[-1]))
+    return indptr, indices, data
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(str(title).lower().split())
+
+
+class SkillStats:
+    """Posting x skill and title x skill mention matrices over a taxonomy's skill IDs."""
+
+    def __init__(self, skill_ids, posting_ids, posting_indptr, posting_indices, titles, title_indptr, title_indices,
+                 title_data, title_postings, taxonomy_version: str = ""):
+        self.skill_ids = [str(skill_id) for skill_id in skill_ids]
+        self.posting_ids = [str(posting_id) for posting_id in posting_ids]
+        self.posting_indptr = np.asarray(posting_indptr, dtype=np.int64)
+        self.posting_indices = np.asarray(posting_indices, dtype=np.int32)
+        self.titles = [str(title) for title in titles]
+        self.title_indptr = np.asarray(title_indptr, dtype=np.int64)
+        self.title_indices = np.asarray(title_indices, dtype=np.int32)
+        self.title_data = np.asarray(title_data, dtype=np.float32)
+        self.title_postings = np.asarray(title_postings, dtype=np.int32)
+        self.taxonomy_version = str(taxonomy_version)
+
+        self._posting_rows = {posting_id: i for i, posting_id in enumerate(self.posting_ids)}
+        self._title_rows = {title: i for i, title in enumerate(self.titles)}
+        # Postings mentioning each skill
+        self.document_frequency = np.bincount(self.posting_indices, minlength=len(self.skill_ids))
+
+    @classmethod
+    def build(cls, mentions, skill_ids: list, taxonomy_version: str = "") -> "SkillStats":
+        """From (posting_id, title, [skill_id, ...]) rows; unknown skill IDs are ignored."""
+        columns = {skill_id: i for i, skill_id in enumerate(skill_ids)}
+        posting_ids, posting_rows = [], []
+        titles, title_rows, title_postings = {}, [], []
+        for posting_id, title, posting_skill_ids in mentions:
+            row = {columns[skill_id]: 1.0 for skill_id in posting_skill_ids if skill_id in columns}
+            posting_ids.append(posting_id)
+            posting_rows.append(row)
+
+            title = normalize_title(title)
+            slot = titles.get(title)
+            if slot is None:
+                slot = titles[title] = len(title_rows)
+                title_rows.append({})
+                title_postings.append(0)
+            title_postings[slot] += 1
+            for column in row:
+                title_rows[slot][column] = title_rows[slot].get(column, 0.0) + 1.0
+
+        posting_indptr, posting_indices, _ = _to_csr(posting_rows, len(skill_ids))
+        title_indptr, title_indices, title_data = _to_csr(title_rows, len(skill_ids))
+        return cls(skill_ids, posting_ids, posting_indptr, posting_indices, list(titles), title_indptr, title_indices,
+                   title_data, title_postings, taxonomy_version)
+
+    def save(self, path=DEFAULT_SKILL_STATS_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # np.savez appends .npz to names without it, write to a name that has it
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            skill_ids=np.asarray(self.skill_ids),
+            posting_ids=np.asarray(self.posting_ids),
+            posting_indptr=self.posting_indptr,
+            posting_indices=self.posting_indices,
+            titles=np.asarray(self.titles),
+            title_indptr=self.title_indptr,
+            title_indices=self.title_indices,
+            title_data=self.title_data,
+            title_postings=self.title_postings,
+            taxonomy_version=self.taxonomy_version
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_SKILL_STATS_PATH) -> "SkillStats":
+        with np.load(path) as saved:
+            return cls(
+                saved['skill_ids'], saved['posting_ids'], saved['posting_indptr'], saved['posting_indices'],
+                saved['titles'], saved['title_indptr'], saved['title_indices'], saved['title_data'],
+                saved['title_postings'], str(saved['taxonomy_version'])
+            )
+
+    @property
+    def posting_count(self) -> int:
+        return len(self.posting_ids)
+
+    def posting_demand(self, posting_ids: list, weights: np.ndarray) -> Optional[np.ndarray]:
+        """Weighted share of the given postings mentioning each skill, None if none of them are known."""
+        found = [(self._posting_rows[str(posting_id)], weight) for posting_id, weight in zip(posting_ids, weights)
+                 if str(posting_id) in self._posting_rows]
+        if not found:
+            return None
+        rows = np.asarray([row for row, _ in found], dtype=np.int64)
+        row_weights = np.asarray([weight for _, weight in found], dtype=np.float64)
+        return _gather(self.posting_indptr, self.posting_indices, None, rows, row_weights, len(self.skill_ids)) / row_weights.sum()
+
+    def title_demand(self, titles: list) -> Optional[np.ndarray]:
+        """Share of all postings with the given titles mentioning each skill, None if none are known."""
+        rows = np.asarray(sorted({self._title_rows[title] for title in map(normalize_title, titles) if title in self._title_rows}), dtype=np.int64)
+        if len(rows) == 0:
+            return None
+        counts = _gather(self.title_indptr, self.title_indices, self.title_data, rows, np.ones(len(rows)), len(self.skill_ids))
+        return counts / self.title_postings[rows].sum()
+
+
+class LocalSkillRecommender:
+    """Skill-gap recommendations from SkillStats, named after the taxonomy's canonical skills."""
+
+    def __init__(self, stats: SkillStats, taxonomy):
+        self.stats = stats
+        self.taxonomy = taxonomy
+        # Columns of the stats in taxonomy order, so IDs added to the
+        # taxonomy after seeding are simply never recommended
+        self._names = [taxonomy.name_of(skill_id) if skill_id in taxonomy else skill_id for skill_id in stats.skill_ids]
+        self._columns = {skill_id: i for i, skill_id in enumerate(stats.skill_ids)}
+        count = max(stats.posting_count, 1)
+        self._idf = np.log((1 + count) / (1 + stats.document_frequency)) + 1.0
+        self._prior = stats.document_frequency / count
+
+    @classmethod
+    def load(cls, taxonomy, path=DEFAULT_SKILL_STATS_PATH) -> "LocalSkillRecommender":
+        return cls(SkillStats.load(path), taxonomy)
+
+    def demand(self, posting_ids: Optional[list] = None, scores: Optional[list] = None, titles: Optional[list] = None) -> np.ndarray:
+        """Share of the relevant postings mentioning each skill; the whole corpus when nothing matches."""
+        posting_ids = list(posting_ids or [])
+        if scores is not None and len(scores) == len(posting_ids) and posting_ids:
+            weights = np.asarray(scores, dtype=np.float64)
+            # Fusion and MMR scores can be zero or negative
+            if weights.min() <= 0:
+                weights = weights - weights.min() + (weights.max() - weights.min()) / len(weights) + 1e-3
+        else:
+            weights = np.ones(len(posting_ids))
+
+        by_posting = self.stats.posting_demand(posting_ids, weights) if posting_ids else None
+        by_title = self.stats.title_demand(titles) if titles else None
+        if by_posting is not None and by_title is not None:
+            return (1 - TITLE_WEIGHT) * by_posting + TITLE_WEIGHT * by_title
+        if by_posting is not None:
+            return by_posting
+        if by_title is not None:
+            return by_title
+        return self._prior
+
+    def recommend(self, user_skill_ids: list, posting_ids: Optional[list] = None, scores: Optional[list] = None,
+                  titles: Optional[list] = None, k: int = DEFAULT_RECOMMENDATIONS) -> dict:
+        """
+        SkillRecommendations-shaped dict of the k skills in most demand among
+        the postings (and titles) that the user does not list. user_skill_ids
+        are taxonomy IDs, None entries are ignored.
+        """
+        scores_by_skill = self.demand(posting_ids, scores, titles) * self._idf
+        owned = [self._columns[skill_id] for skill_id in user_skill_ids if skill_id in self._columns]
+        scores_by_skill[owned] = -math.inf
+        scores_by_skill[scores_by_skill <= 0] = -math.inf
+
+        k = min(k, len(scores_by_skill))
+        top = np.argpartition(-scores_by_skill, k - 1)[:k] if k > 0 else np.array([], dtype=np.int64)
+        top = top[np.argsort(-scores_by_skill[top], kind="stable")]
+        return {"recommended_skills": [self._names[i] for i in top.tolist() if np.isfinite(scores_by_skill[i])]}
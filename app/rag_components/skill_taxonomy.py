@@ -0,0 +1,202 @@
+"""
+Canonical skill taxonomy.
+
+Free-text skills ("JS", "Javascript", "ECMAScript") are mapped to stable
+skill IDs ("javascript") from skill_taxonomy.json. Exact hits come from an
+alias hash map keyed on the lowercased name with punctuation and spaces
+removed. The remaining strings are embedded in one batch and matched against
+a precomputed matrix holding the embedding of every canonical name and
+alias; the nearest row wins when its cosine similarity reaches
+SKILL_MATCH_THRESHOLD, otherwise the skill stays unmapped (None).
+
+The embedding matrix is saved next to the database and rebuilt when the
+taxonomy or the embedding model changes:
+
+    python app/rag_components/skill_taxonomy.py --build
+    python app/rag_components/skill_taxonomy.py --map JS "Amazon Web Services" "knitting"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_TAXONOMY_PATH = Path(__file__).resolve().parent / 'skill_taxonomy.json'
+DEFAULT_SKILL_EMBEDDINGS_PATH = Path(__file__).resolve().parent.parent.parent / 'database' / 'skill_embeddings.npz'
+# Cosine similarity needed for a nearest-neighbour match
+SKILL_MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", 0.7))
+# Free-text skills whose nearest-neighbour result is remembered
+MATCH_CACHE_SIZE = 4096
+
+_NOT_KEY = re.compile(r"[^a-z0-9+#]")
+
+
+def alias_key(text: str) -> str:
+    """Alias map key: "Node.js", "node js" and "NodeJS" all become "nodejs"."""
+    return _NOT_KEY.sub("", text.lower())
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class SkillTaxonomy:
+    """
+    Canonical skills with their aliases. model (anything with encode(), e.g.
+    the shared embedding model) enables nearest-neighbour matching; without
+    it only aliases match. fingerprint identifies the model's vector space
+    (embeddings.embedding_fingerprint) so a stale matrix on disk is rebuilt.
+    """
+
+    def __init__(self, skills: list, model=None, fingerprint: Optional[str] = None,
+                 embeddings_path: Optional[Path] = DEFAULT_SKILL_EMBEDDINGS_PATH, threshold: float = SKILL_MATCH_THRESHOLD):
+        self.ids = [skill['id'] for skill in skills]
+        self.names = [skill['name'] for skill in skills]
+        self.model = model
+        self.fingerprint = fingerprint
+        self.embeddings_path = Path(embeddings_path) if embeddings_path else None
+        self.threshold = threshold
+        self.version = hashlib.sha1(json.dumps(skills, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+        self._positions = {skill_id: i for i, skill_id in enumerate(self.ids)}
+        # Every name and alias as (text, skill index); the same list is embedded
+        self.labels = []
+        self.aliases = {}
+        for i, skill in enumerate(skills):
+            for label in [skill['name'], skill['id'].replace("_", " "), *skill.get('aliases', [])]:
+                key = alias_key(label)
+                if key and key not in self.aliases:
+                    self.aliases[key] = i
+                self.labels.append((label, i))
+
+        self._matrix = None
+        self._rows = None
+        self._lock = threading.Lock()
+        self._matches = OrderedDict()
+
+    @classmethod
+    def load(cls, path=DEFAULT_TAXONOMY_PATH, **kwargs) -> "SkillTaxonomy":
+        with open(path) as f:
+            return cls(json.load(f)['skills'], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, skill_id: str) -> bool:
+        return skill_id in self._positions
+
+    def index_of(self, skill_id: str) -> int:
+        return self._positions[skill_id]
+
+    def name_of(self, skill_id: str) -> str:
+        return self.names[self._positions[skill_id]]
+
+    def build_embeddings(self) -> tuple:
+        """Embed every name and alias, save the matrix if a path is set and return (matrix, rows)."""
+        texts = [label for label, _ in self.labels]
+        matrix = _normalize_rows(np.asarray(self.model.encode(texts, batch_size=256), dtype=np.float32))
+        rows = np.asarray([i for _, i in self.labels], dtype=np.int32)
+        if self.embeddings_path is not None:
+            self.embeddings_path.parent.mkdir(parents=True, exist_ok=True)
+            # np.savez appends .npz to names without it, write to a name that has it
+            tmp = self.embeddings_path.with_name(self.embeddings_path.stem + ".tmp.npz")
+            np.savez(tmp, matrix=matrix, rows=rows, version=self.version, fingerprint=self.fingerprint or "")
+            os.replace(tmp, self.embeddings_path)
+        return matrix, rows
+
+    def embedding_matrix(self) -> tuple:
+        """(matrix, rows): unit-length label embeddings and the skill index of each row."""
+        if self._matrix is not None:
+            return self._matrix, self._rows
+
+        with self._lock:
+            if self._matrix is None:
+                loaded = None
+                if self.embeddings_path is not None and self.embeddings_path.exists():
+                    with np.load(self.embeddings_path) as saved:
+                        if str(saved['version']) == self.version and str(saved['fingerprint']) == (self.fingerprint or ""):
+                            loaded = (saved['matrix'], saved['rows'])
+                if loaded is None:
+                    print(f"Embedding the skill taxonomy ({len(self.labels)} names and aliases)...")
+                    loaded = self.build_embeddings()
+                self._matrix, self._rows = loaded
+            return self._matrix, self._rows
+
+    def lookup(self, skills: list) -> np.ndarray:
+        """Skill index of every string in skills, -1 where nothing matched."""
+        indices = np.full(len(skills), -1, dtype=np.int64)
+        pending = {}
+        for position, text in enumerate(skills):
+            text = (text or "").strip()
+            index = self.aliases.get(alias_key(text))
+            if index is None:
+                index = self._matches.get(text)
+            if index is not None:
+                indices[position] = index
+            elif text:
+                pending.setdefault(text, []).append(position)
+
+        if pending and self.model is not None:
+            matrix, rows = self.embedding_matrix()
+            texts = list(pending)
+            queries = _normalize_rows(np.asarray(self.model.encode(texts, batch_size=256), dtype=np.float32))
+            similarities = queries @ matrix.T
+            best = similarities.argmax(axis=1)
+            matched = np.where(similarities[np.arange(len(texts)), best] >= self.threshold, rows[best], -1)
+            with self._lock:
+                for text, index in zip(texts, matched.tolist()):
+                    indices[pending[text]] = index
+                    self._matches[text] = index
+                    if len(self._matches) > MATCH_CACHE_SIZE:
+                        self._matches.popitem(last=False)
+        return indices
+
+    def map_skills(self, skills: list) -> list:
+        """Skill ID of every string in skills, None where nothing matched."""
+        return [self.ids[index] if index >= 0 else None for index in self.lookup(skills).tolist()]
+
+    def map_lists(self, *skill_lists) -> list:
+        """map_skills for several lists in one pass (one encode batch), returned per list."""
+        flat = [skill for skills in skill_lists for skill in (skills or [])]
+        ids = self.map_skills(flat)
+        mapped, start = [], 0
+        for skills in skill_lists:
+            end = start + len(skills or [])
+            mapped.append(ids[start:end])
+            start = end
+        return mapped
+
+
+def main(argv=None):
+    try:
+        from app.rag_components.embeddings import load_embedding_model, embedding_fingerprint
+    except ImportError:
+        from embeddings import load_embedding_model, embedding_fingerprint
+
+    parser = argparse.ArgumentParser(description="Precompute the skill taxonomy embeddings or map skills to IDs.")
+    parser.add_argument('--taxonomy', type=Path, default=DEFAULT_TAXONOMY_PATH)
+    parser.add_argument('--embeddings', type=Path, default=DEFAULT_SKILL_EMBEDDINGS_PATH)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--build', action='store_true', help="Rebuild the embedding matrix")
+    parser.add_argument('--map', nargs='*', default=[], help="Skills to map to taxonomy IDs")
+    args = parser.parse_args(argv)
+
+    taxonomy = SkillTaxonomy.load(args.taxonomy, model=load_embedding_model(args.model),
+                                  fingerprint=embedding_fingerprint(args.model), embeddings_path=args.embeddings)
+    if args.build:
+        matrix, _ = taxonomy.build_embeddings()
+        print(f"Saved {matrix.shape[0]} x {matrix.shape[1]} skill embeddings to {args.embeddings}")
+    for skill, skill_id in zip(args.map, taxonomy.map_skills(args.map)):
+        print(f"{skill!r} -> {skill_id}")
+
+
+if __name__ == '__main__':
+    main()
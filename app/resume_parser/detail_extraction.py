@@ -6,90 +6,212 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from prompts import user_resume_template, system_prompt
 from models import ResumeData
-from openai import OpenAI
+from cache import get_result_cache, make_key, prompt_version
+from llm_gateway import chat_completion, achat_completion, astream_hedged_chat_completion, hedged_request, ahedged_request, hedging_enabled
+from streaming_json import IncrementalJSONObjectParser, JSONEvent
+from tracing import traced
 from typing import Optional
 import json
 
-def extract_education_skills_name(resume_text: str, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None):
+RESUME_PROMPT_VERSION = prompt_version(system_prompt, user_resume_template)
+
+@traced("extract_education_skills_name")
+def extract_education_skills_name(resume_text: str, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None, use_cache: bool = True, hedge: Optional[bool] = None):
     """
     Extracts education, experience, and skills from resume text using
     OpenRouter API with OpenAI client and structured outputs.
-    Supports fallback model if primary model fails.
+    Supports fallback model if primary model fails, or racing it against a
+    slow primary when hedging is enabled (see llm_gateway.ahedged_request).
+    Results are cached by resume text, model and prompt version.
     """
-    client = OpenAI(
-        base_url=API_URL.replace("/chat/completions", ""),  # Remove endpoint from base URL
-        api_key=API_KEY,
-        default_headers={
-            "HTTP-Referer": "https://github.com/hardikprakash/upskillr",
-            "X-Title": "Upskillr"
-        }
-    )
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(resume_text, MODEL_NAME, RESUME_PROMPT_VERSION)
+
+    if cache is not None:
+        cached = cache.get("resume_data", cache_key)
+        if cached is not None:
+            return ResumeData(**cached).model_dump()
 
     user_resume_prompt = user_resume_template.format(resume_text=resume_text)
 
-    # Try primary model first
-    result = _make_llm_request(client, MODEL_NAME, system_prompt, user_resume_prompt)
-    
-    # If primary model fails and fallback is available, try fallback
-    if result is None and FALLBACK_MODEL:
-        print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
-        result = _make_llm_request(client, FALLBACK_MODEL, system_prompt, user_resume_prompt)
+    if hedging_enabled(hedge) and FALLBACK_MODEL:
+        result = hedged_request(API_URL, API_KEY, [MODEL_NAME, FALLBACK_MODEL], _parse_completion, **_request_kwargs(system_prompt, user_resume_prompt))
+    else:
+        # Try primary model first
+        result = _make_llm_request(API_URL, API_KEY, MODEL_NAME, system_prompt, user_resume_prompt)
+        
+        # If primary model fails and fallback is available, try fallback
+        if result is None and FALLBACK_MODEL:
+            print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
+            result = _make_llm_request(API_URL, API_KEY, FALLBACK_MODEL, system_prompt, user_resume_prompt)
+
+    if result is not None and cache is not None:
+        cache.put("resume_data", cache_key, result)
     
     return result
 
 
-def _make_llm_request(client: OpenAI, model_name: str, system_prompt: str, user_prompt: str):
+@traced("extract_education_skills_name")
+async def aextract_education_skills_name(resume_text: str, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None, use_cache: bool = True, hedge: Optional[bool] = None):
+    """
+    Async version of extract_education_skills_name through the shared async LLM gateway.
+    """
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(resume_text, MODEL_NAME, RESUME_PROMPT_VERSION)
+
+    if cache is not None:
+        cached = cache.get("resume_data", cache_key)
+        if cached is not None:
+            return ResumeData(**cached).model_dump()
+
+    user_resume_prompt = user_resume_template.format(resume_text=resume_text)
+
+    if hedging_enabled(hedge) and FALLBACK_MODEL:
+        result = await ahedged_request(API_URL, API_KEY, [MODEL_NAME, FALLBACK_MODEL], _parse_completion, **_request_kwargs(system_prompt, user_resume_prompt))
+    else:
+        result = await _amake_llm_request(API_URL, API_KEY, MODEL_NAME, system_prompt, user_resume_prompt)
+
+        if result is None and FALLBACK_MODEL:
+            print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
+            result = await _amake_llm_request(API_URL, API_KEY, FALLBACK_MODEL, system_prompt, user_resume_prompt)
+
+    if result is not None and cache is not None:
+        cache.put("resume_data", cache_key, result)
+
+    return result
+
+
+async def astream_education_skills_name(resume_text: str, API_KEY: str, MODEL_NAME: str, API_URL: str, FALLBACK_MODEL: Optional[str] = None, use_cache: bool = True, hedge: Optional[bool] = None):
     """
-    Helper function to make a request to the LLM API using OpenAI client.
+    Streaming version of aextract_education_skills_name.
+    Yields a JSONEvent for every field and list item as soon as the model has
+    produced it, then a final JSONEvent("result", None, resume_data) holding the
+    validated dict, or None if every model failed. With hedging enabled the
+    fallback model races the primary on time to first token. When a model
+    fails after streaming some fields, JSONEvent("reset", None, model_name)
+    announces that the next model streams them again from the start.
+    """
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(resume_text, MODEL_NAME, RESUME_PROMPT_VERSION)
+
+    if cache is not None:
+        cached = cache.get("resume_data", cache_key)
+        if cached is not None:
+            result = ResumeData(**cached).model_dump()
+            for key, value in result.items():
+                yield JSONEvent("field", key, value)
+            yield JSONEvent("result", None, result)
+            return
+
+    user_resume_prompt = user_resume_template.format(resume_text=resume_text)
+
+    result = None
+    models = [model_name for model_name in (MODEL_NAME, FALLBACK_MODEL) if model_name]
+    # With hedging the first round races every model on time to first token
+    racing = models if hedging_enabled(hedge) else models[:1]
+    streamed = False
+    while racing and result is None:
+        if racing[0] != MODEL_NAME:
+            print(f"Primary model ({MODEL_NAME}) failed. Trying fallback model ({FALLBACK_MODEL})...")
+        if streamed:
+            # The next model starts over, drop what the failed one streamed
+            yield JSONEvent("reset", None, racing[0])
+            streamed = False
+
+        parser = IncrementalJSONObjectParser()
+        winner = None
+        async for winner, delta in astream_hedged_chat_completion(API_URL, API_KEY, racing, **_request_kwargs(system_prompt, user_resume_prompt)):
+            for event in parser.feed(delta):
+                streamed = True
+                yield event
+
+        if winner is not None and parser.text.strip():
+            result = _parse_response(winner, parser.text.strip())
+        # A raced model that lost was cancelled, not failed; it gets its own turn
+        done = {winner} if winner is not None else set(racing)
+        models = [model_name for model_name in models if model_name not in done]
+        racing = models[:1]
+
+    if result is not None and cache is not None:
+        cache.put("resume_data", cache_key, result)
+
+    yield JSONEvent("result", None, result)
+
+
+def _request_kwargs(system_prompt: str, user_prompt: str) -> dict:
+    return dict(
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format={"type": "json_object"},  # Enforce JSON response
+        temperature=0.2,
+        max_tokens=4096,
+        timeout=360
+    )
+
+
+def _make_llm_request(API_URL: str, API_KEY: str, model_name: str, system_prompt: str, user_prompt: str):
+    """
+    Helper function to make a request to the LLM API through the shared gateway,
+    which handles retries, rate limiting and circuit breaking.
     Returns parsed ResumeData on success, None on failure.
     """
+    response = chat_completion(API_URL, API_KEY, model_name, **_request_kwargs(system_prompt, user_prompt))
+    if response is None:
+        return None
+
+    return _parse_completion(model_name, response)
+
+
+async def _amake_llm_request(API_URL: str, API_KEY: str, model_name: str, system_prompt: str, user_prompt: str):
+    """
+    Async counterpart of _make_llm_request.
+    """
+    response = await achat_completion(API_URL, API_KEY, model_name, **_request_kwargs(system_prompt, user_prompt))
+    if response is None:
+        return None
+
+    return _parse_completion(model_name, response)
+
+
+def _completion_text(model_name: str, response):
+    """The stripped message content of a completion, None if it has none."""
+    choices = getattr(response, "choices", None)
+    content = choices[0].message.content if choices else None
+    if content is None:
+        print(f"Empty response from {model_name}")
+        return None
+    return content.strip()
+
+
+def _parse_completion(model_name: str, response):
+    text = _completion_text(model_name, response)
+    return _parse_response(model_name, text) if text is not None else None
+
+
+def _parse_response(model_name: str, result_string: str):
+    """
+    Parse and validate the raw LLM output.
+    Returns ResumeData as a dict on success, None on failure.
+    """
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},  # Enforce JSON response
-            temperature=0.2,
-            max_tokens=4096,
-            timeout=360
-        )
-
-        result_string = response.choices[0].message.content.strip()
-
-        try:
-            # Parse JSON string to dict
-            result_dict = json.loads(result_string)
-            
-            # Validate with Pydantic model
-            resume_data = ResumeData(**result_dict)
-            
-            # Return as dict for backward compatibility
-            return resume_data.model_dump()
-            
-        except json.JSONDecodeError as json_err:
-            print(f"Error: Failed to decode JSON response from LLM ({model_name}).")
-            print(f"LLM raw output:\n---\n{result_string}\n---")
-            print(f"JSONDecodeError: {json_err}")
-            return None
+        # Parse JSON string to dict
+        result_dict = json.loads(result_string)
         
-        except Exception as e:
-            print(f"An unexpected error occurred during JSON parsing ({model_name}): {e}")
-            print(f"LLM raw output:\n---\n{result_string}\n---")
-            return None
-
-    except Exception as e:
-        error_msg = str(e)
+        # Validate with Pydantic model
+        resume_data = ResumeData(**result_dict)
         
-        # Check for specific error types
-        if "rate_limit" in error_msg.lower() or "429" in error_msg:
-            print(f"⚠️ OpenRouter API rate limit reached for {model_name}. Please try again later or upgrade your plan.")
-        elif "insufficient" in error_msg.lower() or "402" in error_msg:
-            print(f"⚠️ OpenRouter API credits exhausted for {model_name}. Please add credits to your account.")
-        elif "400" in error_msg:
-            print(f"⚠️ Bad request for {model_name}: {error_msg}")
-        else:
-            print(f"Error making request with {model_name}: {error_msg}")
+        # Return as dict for backward compatibility
+        return resume_data.model_dump()
         
+    except json.JSONDecodeError as json_err:
+        print(f"Error: Failed to decode JSON response from LLM ({model_name}).")
+        print(f"LLM raw output:\n---\n{result_string}\n---")
+        print(f"JSONDecodeError: {json_err}")
+        return None
+    
+    except Exception as e:
+        print(f"An unexpected error occurred during JSON parsing ({model_name}): {e}")
+        print(f"LLM raw output:\n---\n{result_string}\n---")
         return None
@@ -1,77 +1,97 @@
+import sys
+from pathlib import Path
+# Add parent directory to path to import cache and text_normalization
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 import pymupdf
-import re
-import unicodedata
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import get_result_cache, make_key
+from text_normalization import clean_resume_text
+from tracing import traced
+
+# Bump when extraction or cleaning changes so cached text is not reused
+PARSER_VERSION = "1"
+
+# Documents with at least this many pages are split across worker processes
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", 8))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))
 
 
 def clean_text(raw_text: str) -> str:
-    
-    headings = [
-        "Education",
-        "Work Experience",
-        "Experience",
-        "Professional Experience",
-        "Skills",
-        "Projects",
-        "Certifications",
-        "Achievements",
-        "Languages",
-        "Interests",
-        "Summary",
-        "Objective",
-        "Publications"
-    ]
-    
-    text = unicodedata.normalize("NFKD", raw_text)
-
-    # Remove invisible Unicode chars (zero-width, non-breaking spaces, etc.)
-    text = re.sub(r'[\u200B-\u200D\uFEFF]', '', text)
-    # Remove control chars except newlines (\x0A, \x0D) and tabs (\x09)
-    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1f\x7f-\x9f]', '', text)
-
-    # Collapse excessive whitespace
-    text = re.sub(r'\n+', '\n', text)
-    text = re.sub(r'[ \t]+', ' ', text)
-    text = re.sub(r'\s{2,}', ' ', text)
-
-    # Replace common bullets with "-"
-    text = re.sub(r'[\u2022\u2023\u25E6\u2043\u2219\u25AA\u25AB]', '\n-', text)
-    text = text.replace('•', '\n-')
-    text = re.sub(r'\so\s', '\n-', text)
-
-        # Improved heading detection - more aggressive approach
-    for heading in headings:
-        # Look for common heading formats with stronger pattern matching
-        patterns = [
-            # ALL CAPS with or without colon
-            re.compile(fr'\b{re.escape(heading.upper())}\b:?', re.MULTILINE),
-            # Title Case with or without colon
-            # re.compile(fr'\b{re.escape(heading.title())}\b:?', re.MULTILINE),
-            # Bold formatting often indicated by repeated characters
-            re.compile(fr'\b{re.escape(heading.upper())}\s*\n', re.MULTILINE),
-        ]
-        
-        # Apply each pattern
-        for pattern in patterns:
-            # Replace with newlines before and after
-            text = pattern.sub(f'\n\n\\g<0>\n', text)
-    
-    # Ensure clean separation between sections
-    text = re.sub(r'\n{3,}', '\n\n', text)  # No more than double newlines
-
-    # Optional: strip non-ASCII if needed
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
-
-    return text.strip()
-
-
-def load_pdf(path: str) -> str:
-
-    text=""
-    doc = pymupdf.open(path)
-
-    for page in doc:
-        text += page.get_text()
-    
-    cleaned = clean_text(text)
-
-    return cleaned
\ No newline at end of file
+    return clean_resume_text(raw_text)
+
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """
+    Lazily created pool for page-parallel extraction. PyMuPDF is not
+    thread-safe, so pages are split across processes; spawn avoids forking a
+    process that already runs other threads.
+    """
+    global _page_pool
+    if _page_pool is None:
+        with _page_pool_lock:
+            if _page_pool is None:
+                _page_pool = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _page_pool
+
+
+def _extract_page_range(data: bytes, start: int, stop: int) -> str:
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        return "".join(doc[page_number].get_text() for page_number in range(start, stop))
+
+
+def extract_text(data: bytes, parallel: bool = True) -> str:
+    """
+    Raw text of a PDF held in memory. Large documents are extracted in
+    page ranges on worker processes.
+    """
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        page_count = doc.page_count
+        if not parallel or PDF_WORKERS < 2 or page_count < PARALLEL_PAGE_THRESHOLD:
+            return "".join(page.get_text() for page in doc)
+
+    step = -(-page_count // PDF_WORKERS)  # ceil division
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    futures = [_get_page_pool().submit(_extract_page_range, data, start, stop) for start, stop in ranges]
+    return "".join(future.result() for future in futures)
+
+
+@traced("load_pdf")
+def load_pdf(source, parallel: bool = True, use_cache: bool = True) -> str:
+    """
+    Extract and clean the text of a PDF given as a file path or raw bytes.
+    Cleaned text is cached by a hash of the PDF bytes, so re-uploads of the
+    same file skip parsing entirely.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+
+    cache = get_result_cache() if use_cache else None
+    cache_key = make_key(hashlib.sha256(data).hexdigest(), PARSER_VERSION)
+
+    if cache is not None:
+        cached = cache.get("pdf_text", cache_key)
+        if cached is not None:
+            return cached
+
+    cleaned = clean_text(extract_text(data, parallel=parallel))
+
+    if cache is not None:
+        cache.put("pdf_text", cache_key, cleaned)
+
+    return cleaned
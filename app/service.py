@@ -0,0 +1,254 @@
+"""
+Headless HTTP API for the resume pipeline.
+
+POST a PDF to /v1/analyse and get the structured PipelineResult back as
+JSON, or as NDJSON events with ?stream=true (the streamed extraction fields,
+a "stage" marker when matching starts, then the result). At most API_WORKERS
+resumes are processed at once and API_QUEUE_SIZE more may wait for a slot;
+beyond that, or after waiting API_QUEUE_TIMEOUT_SECONDS, requests are turned
+away with 429 and a Retry-After header. The embedding model is loaded when
+the server starts and stays hot between requests.
+
+    python app/service.py --port 8000
+    uvicorn service:app --app-dir app --host 0.0.0.0 --port 8000 --workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+if not os.getenv("PRODUCTION"):
+    load_dotenv()
+
+from pipeline import run_pipeline, PIPELINE_MODES
+from rag_components.keyword_index import FILTER_FIELDS
+from rag_components.registry import warm_up
+import tracing
+
+API_WORKERS = int(os.getenv("API_WORKERS", 4))
+API_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", 16))
+API_QUEUE_TIMEOUT_SECONDS = float(os.getenv("API_QUEUE_TIMEOUT_SECONDS", 30))
+API_MAX_UPLOAD_BYTES = int(os.getenv("API_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+
+
+class Saturated(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Service is at capacity, retry later")
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """
+    Admission control: `workers` pipelines run at once, up to `queue_size`
+    more wait in FIFO order for a free slot, everything beyond is rejected.
+    Only used from the event loop thread, so the counters need no lock.
+    """
+
+    def __init__(self, workers: int = API_WORKERS, queue_size: int = API_QUEUE_SIZE, queue_timeout: float = API_QUEUE_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+        self._slots = asyncio.Semaphore(workers)
+        self._durations = deque(maxlen=50)
+
+    def retry_after(self) -> float:
+        """Rough seconds until a queue position frees up, from recent pipeline durations."""
+        average = sum(self._durations) / len(self._durations) if self._durations else 10.0
+        return max(1.0, average * (self.waiting + 1) / self.workers)
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the time it was granted; raises Saturated."""
+        if self.active + self.waiting >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise Saturated(self.retry_after())
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Saturated(self.retry_after())
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return time.perf_counter()
+
+    def release(self, granted: float):
+        self.active -= 1
+        self.completed += 1
+        self._durations.append(time.perf_counter() - granted)
+        self._slots.release()
+
+    def prometheus_text(self) -> str:
+        lines = []
+        for name, kind, value, help_text in (
+            ("upskillr_api_active_requests", "gauge", self.active, "Resumes being processed."),
+            ("upskillr_api_queued_requests", "gauge", self.waiting, "Resumes waiting for a worker slot."),
+            ("upskillr_api_rejected_total", "counter", self.rejected, "Requests rejected with 429."),
+            ("upskillr_api_completed_total", "counter", self.completed, "Requests processed."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def llm_config() -> dict:
+    return {
+        'API_URL': os.getenv("API_URL", None),
+        'API_KEY': os.getenv("OPENROUTER_API_KEY", None),
+        'MODEL_NAME': os.getenv("MODEL_NAME", None),
+        'FALLBACK_MODEL': os.getenv("FALLBACK_MODEL_NAME", None)
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.pool = WorkerPool()
+    app.state.ready = asyncio.Event()
+
+    async def _warm():
+        try:
+            await asyncio.to_thread(warm_up)
+        except Exception as e:
+            print(f"Embedding model warm-up failed: {e}")
+        app.state.ready.set()
+
+    # Serve health checks while the model loads
+    warm_task = asyncio.ensure_future(_warm())
+    yield
+    warm_task.cancel()
+
+
+app = FastAPI(title="Upskillr API", lifespan=lifespan)
+
+
+def _filters(request: Request) -> Optional[dict]:
+    filters = {}
+    for field in FILTER_FIELDS:
+        values = request.query_params.getlist(field)
+        if values:
+            filters[field] = values[0] if len(values) == 1 else values
+    return filters or None
+
+
+def _busy(error: Saturated) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(error)},
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz(request: Request):
+    if not request.app.state.ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    return tracing.prometheus_text() + request.app.state.pool.prometheus_text()
+
+
+@app.post("/v1/analyse")
+async def analyse(request: Request, top_k: int = Query(5, ge=1, le=20), stream: bool = False, mode: Optional[str] = None):
+    """
+    Analyse the PDF sent as the request body (Content-Type: application/pdf).
+    Repeat the title, location or seniority query parameters to filter the
+    matched postings. mode picks the pipeline mode ("two_call" or
+    "single_call"), PIPELINE_MODE by default. Pipeline failures are reported in the result's
+    failed_stage and error fields, not as HTTP errors. Until the embedding
+    model has loaded, requests get 503 like /readyz.
+    """
+    if not request.app.state.ready.is_set():
+        return JSONResponse(status_code=503, content={"detail": "Service is starting, retry shortly"}, headers={"Retry-After": "5"})
+
+    config = llm_config()
+    missing = [name for name in ('API_URL', 'API_KEY', 'MODEL_NAME') if not config[name]]
+    if missing:
+        return JSONResponse(status_code=500, content={"detail": f"Missing required environment variables for: {', '.join(missing)}"})
+
+    if mode is not None and mode not in PIPELINE_MODES:
+        return JSONResponse(status_code=400, content={"detail": f"Unknown mode {mode!r}, expected one of {', '.join(PIPELINE_MODES)}"})
+
+    pdf = await request.body()
+    if not pdf:
+        return JSONResponse(status_code=400, content={"detail": "Empty request body, send the PDF bytes"})
+    if len(pdf) > API_MAX_UPLOAD_BYTES:
+        return JSONResponse(status_code=413, content={"detail": f"PDF larger than {API_MAX_UPLOAD_BYTES} bytes"})
+
+    pool = request.app.state.pool
+    try:
+        granted = await pool.acquire()
+    except Saturated as e:
+        return _busy(e)
+
+    args = (pdf, config['API_URL'], config['API_KEY'], config['MODEL_NAME'], config['FALLBACK_MODEL'])
+    kwargs = {'top_k': top_k, 'filters': _filters(request), 'mode': mode}
+
+    if not stream:
+        try:
+            result = await run_pipeline(*args, **kwargs)
+        finally:
+            pool.release(granted)
+        return result.to_dict()
+
+    # The pipeline task owns the slot: it is released when the task ends,
+    # even if the client goes away before the body is ever iterated
+    queue = asyncio.Queue()
+    task = asyncio.ensure_future(run_pipeline(*args, **kwargs, on_event=queue.put_nowait))
+    task.add_done_callback(lambda _: pool.release(granted))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def events():
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield json.dumps(event._asdict()) + "\n"
+            try:
+                value = task.result().to_dict()
+            except Exception as e:
+                yield json.dumps({"kind": "error", "key": None, "value": str(e)}) + "\n"
+                return
+            yield json.dumps({"kind": "result", "key": None, "value": value}) + "\n"
+        finally:
+            # The client may have gone away mid-stream
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(task.cancel))
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the resume pipeline over HTTP.")
+    parser.add_argument('--host', default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument('--port', type=int, default=int(os.getenv("API_PORT", 8000)))
+    args = parser.parse_args(argv)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Client for the HTTP API in service.py, used by the Streamlit app when
+API_SERVICE_URL is set.
+"""
+
+import json
+from typing import Optional
+
+from streaming_json import JSONEvent
+
+
+class ServiceBusy(Exception):
+    """
+    The service answered 429, or 503 while it is still starting (starting is
+    then True); retry_after is its suggested wait in seconds.
+    """
+
+    def __init__(self, retry_after: Optional[float], starting: bool = False):
+        super().__init__(f"The analysis service is {'starting' if starting else 'busy'}, please try again shortly")
+        self.retry_after = retry_after
+        self.starting = starting
+
+
+class ServiceClient:
+    def __init__(self, base_url: str, timeout: float = 600.0):
+        # Imported here, so the UI can catch ServiceBusy without httpx installed
+        import httpx
+
+        # One pooled connection set for the lifetime of the process
+        self._client = httpx.Client(base_url=base_url.rstrip("/"), timeout=httpx.Timeout(timeout, connect=10.0))
+
+    def _params(self, top_k: int, filters: Optional[dict], stream: bool) -> list:
+        params = [("top_k", top_k), ("stream", str(stream).lower())]
+        for field, value in (filters or {}).items():
+            for item in (value if isinstance(value, (list, tuple, set)) else [value]):
+                params.append((field, item))
+        return params
+
+    @staticmethod
+    def _check(response):
+        if response.status_code in (429, 503):
+            retry_after = response.headers.get("Retry-After")
+            raise ServiceBusy(float(retry_after) if retry_after else None, starting=response.status_code == 503)
+        if response.status_code >= 400:
+            response.read()
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = response.text
+            raise RuntimeError(f"Analysis service error {response.status_code}: {detail}")
+
+    def analyse(self, pdf: bytes, top_k: int = 5, filters: Optional[dict] = None) -> dict:
+        """The full PipelineResult of one resume, as a dict."""
+        response = self._client.post("/v1/analyse", content=pdf, params=self._params(top_k, filters, False),
+                                     headers={"Content-Type": "application/pdf"})
+        self._check(response)
+        return response.json()
+
+    def stream_analyse(self, pdf: bytes, top_k: int = 5, filters: Optional[dict] = None):
+        """
+        Yield the JSONEvents of one analysis as the service streams them; the
+        last one is JSONEvent("result", None, result_dict).
+        """
+        with self._client.stream("POST", "/v1/analyse", content=pdf, params=self._params(top_k, filters, True),
+                                 headers={"Content-Type": "application/pdf"}) as response:
+            self._check(response)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = JSONEvent(**json.loads(line))
+                if event.kind == "error":
+                    raise RuntimeError(f"Analysis service error: {event.value}")
+                yield event
+
+    def metrics(self) -> str:
+        response = self._client.get("/metrics")
+        self._check(response)
+        return response.text
+
+
+_clients = {}
+
+
+def get_service_client(base_url: str) -> ServiceClient:
+    client = _clients.get(base_url)
+    if client is None:
+        client = _clients[base_url] = ServiceClient(base_url)
+    return client
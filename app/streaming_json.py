@@ -0,0 +1,152 @@
+"""
+Incremental parser for a streamed JSON object.
+Feeds on raw completion chunks and reports top-level fields as soon as their
+value is complete, plus each element of a top-level array as it closes, so the
+UI can render partial results while the LLM is still generating.
+"""
+
+import json
+from collections import namedtuple
+
+# kind is "field" (a complete top-level value) or "item" (one element of a
+# top-level array whose field is still streaming)
+JSONEvent = namedtuple("JSONEvent", ["kind", "key", "value"])
+
+
+class IncrementalJSONObjectParser:
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+        self._token_start = None
+        self._item_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._is_array = False
+
+    @property
+    def done(self) -> bool:
+        """True once the closing brace of the object has been seen."""
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> list:
+        """Consume the next chunk of text and return the JSONEvents it completed."""
+        self.text += chunk
+        events = []
+        text = self.text
+        i = self._pos
+
+        while i < len(text) and self._state != "done":
+            ch = text[i]
+            state = self._state
+
+            if state == "start":
+                # Skip anything before the object, e.g. a ```json fence
+                if ch == "{":
+                    self._state = "key"
+
+            elif state == "key":
+                if ch == '"':
+                    self._token_start = i
+                    self._escape = False
+                    self._state = "key_string"
+                elif ch == "}":
+                    self._state = "done"
+
+            elif state == "key_string":
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._key = json.loads(text[self._token_start:i + 1])
+                    self._state = "colon"
+
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value_start"
+
+            elif state == "value_start":
+                if not ch.isspace():
+                    self._token_start = i
+                    self._depth = 0
+                    self._in_string = False
+                    self._escape = False
+                    self._item_start = None
+                    self._is_array = ch == "["
+                    self._state = "value"
+                    # Let the value state handle this character
+                    continue
+
+            elif state == "value":
+                self._scan_value(i, ch, events)
+
+            elif state == "after_value":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "done"
+
+            i += 1
+
+        self._pos = i
+        return events
+
+    def _scan_value(self, i: int, ch: str, events: list):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._complete(i + 1, events, "after_value")
+            return
+
+        in_array = self._is_array and self._depth == 1
+        if in_array and self._item_start is None and not ch.isspace() and ch not in ",]":
+            self._item_start = i
+
+        if ch == '"':
+            self._in_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            if self._depth == 0:
+                # A bare scalar terminated by the end of the object
+                self._complete(i, events, "done")
+                return
+            if in_array and ch == "]":
+                self._emit_item(i, events)
+            self._depth -= 1
+            if self._depth == 0:
+                self._complete(i + 1, events, "after_value")
+        elif ch == ",":
+            if self._depth == 0:
+                self._complete(i, events, "key")
+            elif in_array:
+                self._emit_item(i, events)
+        elif ch.isspace() and self._depth == 0:
+            self._complete(i, events, "after_value")
+
+    def _emit_item(self, end: int, events: list):
+        if self._item_start is None:
+            return
+        try:
+            events.append(JSONEvent("item", self._key, json.loads(self.text[self._item_start:end])))
+        except json.JSONDecodeError:
+            pass
+        self._item_start = None
+
+    def _complete(self, end: int, events: list, next_state: str):
+        self._state = next_state
+        try:
+            value = json.loads(self.text[self._token_start:end])
+        except json.JSONDecodeError:
+            return
+        self.fields[self._key] = value
+        events.append(JSONEvent("field", self._key, value))
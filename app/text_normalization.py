@@ -0,0 +1,125 @@
+"""
+Shared text normalisation for resumes (pdf_parsing.clean_text) and job
+postings (seed_db.chunk_text).
+
+Every pattern is compiled once at import time, the character-class removals
+share one pass, the whitespace collapse takes two passes instead of three,
+and heading patterns are anchored on their literal text and only run for
+headings present in the text. Output is identical to the original chain of
+re.sub calls; benchmarks/bench_text_normalization.py checks this and
+measures the speedup.
+"""
+
+import re
+import unicodedata
+
+RESUME_HEADINGS = [
+    "Education",
+    "Work Experience",
+    "Experience",
+    "Professional Experience",
+    "Skills",
+    "Projects",
+    "Certifications",
+    "Achievements",
+    "Languages",
+    "Interests",
+    "Summary",
+    "Objective",
+    "Publications"
+]
+
+# Zero-width characters and BOM, plus control chars except \t, \n and \r,
+# removed in one pass
+_INVISIBLE = re.compile(r'[\u200B-\u200D\uFEFF\x00-\x08\x0B\x0C\x0E-\x1f\x7f-\x9f]')
+_BULLETS = re.compile(r'[\u2022\u2023\u25E6\u2043\u2219\u25AA\u25AB]')
+
+# Newline runs collapse to one newline; then any other run of two or more
+# whitespace chars (and any tab) becomes a single space.
+_NEWLINE_RUN = re.compile(r"\n{2,}")
+_WHITESPACE_RUN = re.compile(r"\s{2,}|\t")
+_LETTER_O_BULLET = re.compile(r"\so\s")
+_EXCESS_NEWLINES = re.compile(r"\n{3,}")
+_NON_ASCII = re.compile(r"[^\x00-\x7F]+")
+
+
+def _heading_patterns(heading: str):
+    """
+    Same matches as \\bHEADING\\b:? and \\bHEADING\\s*\\n, but the leading word
+    boundary is checked by a lookbehind after the literal so the regex engine
+    can search for the literal prefix instead of trying every position.
+    """
+    word = re.escape(heading.upper())
+    return (
+        heading.upper(),
+        re.compile(fr"{word}(?<=\b{word})\b:?"),
+        re.compile(fr"{word}(?<=\b{word})\s*\n"),
+    )
+
+
+# (HEADING, inline pattern, heading-on-its-own-line pattern), in scan order
+_HEADING_PATTERNS = [_heading_patterns(heading) for heading in RESUME_HEADINGS]
+# A marked heading line, e.g. "SKILLS" or "WORK EXPERIENCE:"
+_HEADING_LINE = re.compile(
+    r"^(" + "|".join(re.escape(heading.upper()) for heading in sorted(RESUME_HEADINGS, key=len, reverse=True)) + r"):?\s*$",
+    re.MULTILINE
+)
+
+
+def normalize_whitespace_and_bullets(text: str) -> str:
+    """
+    Drop invisible and control characters, collapse whitespace and turn
+    bullet glyphs (and stray " o " bullets) into "\\n-".
+    """
+    text = _INVISIBLE.sub("", text)
+    text = _NEWLINE_RUN.sub("\n", text)
+    text = _WHITESPACE_RUN.sub(" ", text)
+    # Every bullet glyph is non-ASCII, isascii() is a constant-time flag check
+    if not text.isascii():
+        text = _BULLETS.sub("\n-", text)
+    return _LETTER_O_BULLET.sub("\n-", text)
+
+
+def mark_headings(text: str) -> str:
+    """Put resume section headings (in capitals) on their own lines."""
+    for heading, inline_pattern, line_pattern in _HEADING_PATTERNS:
+        # Substitutions only ever add newlines, so a heading missing from the
+        # text now cannot appear later; skip its two full-text passes.
+        if heading not in text:
+            continue
+        text = inline_pattern.sub("\n\n\\g<0>\n", text)
+        text = line_pattern.sub("\n\n\\g<0>\n", text)
+    return text
+
+
+def clean_resume_text(raw_text: str) -> str:
+    text = unicodedata.normalize("NFKD", raw_text)
+    text = normalize_whitespace_and_bullets(text)
+    text = mark_headings(text)
+
+    # Ensure clean separation between sections
+    text = _EXCESS_NEWLINES.sub("\n\n", text)  # No more than double newlines
+
+    # Optional: strip non-ASCII if needed
+    text = _NON_ASCII.sub(" ", text)
+
+    return text.strip()
+
+
+def split_resume_sections(text: str) -> dict:
+    """
+    Sections of clean_resume_text() output keyed by their heading in
+    capitals ("SKILLS", "WORK EXPERIENCE", ...); text before the first
+    heading is keyed "". A heading that appears twice has its bodies joined.
+    """
+    sections = {}
+    position, heading = 0, ""
+    for match in _HEADING_LINE.finditer(text):
+        body = text[position:match.start()].strip()
+        if body:
+            sections[heading] = f"{sections[heading]}\n{body}" if heading in sections else body
+        position, heading = match.end(), match.group(1)
+    body = text[position:].strip()
+    if body:
+        sections[heading] = f"{sections[heading]}\n{body}" if heading in sections else body
+    return sections
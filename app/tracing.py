@@ -0,0 +1,267 @@
+"""
+Lightweight tracing for the resume pipeline.
+
+stage() (a context manager) and traced() (a decorator, for sync and async
+functions) time a named stage. Every timing lands in a process-wide
+histogram, and in the active Trace when one is bound to the current context,
+so a single upload can be broken down stage by stage. LLM token usage is
+counted per model the same way, and count() keeps other named totals.
+
+Histograms and counters export as Prometheus text (prometheus_text()).
+Finished traces are appended to a JSONL file when TRACE_JSONL_PATH is set.
+"""
+
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() not in ("0", "false", "no")
+# Append one JSON line per finished trace here; empty disables
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+
+# Upper bounds in seconds, from a cached lookup up to a slow LLM call
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Trace:
+    """Stage spans and token usage of one request."""
+
+    def __init__(self, name: str = "resume"):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self.spans = []
+        self.tokens = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, start: float, seconds: float, parent: Optional[str], error: Optional[str]):
+        with self._lock:
+            self.spans.append({
+                "stage": stage,
+                "parent": parent,
+                "start": start - self._origin,
+                "seconds": seconds,
+                "error": error
+            })
+
+    def add_tokens(self, model_name: str, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            usage = self.tokens.setdefault(model_name, {"prompt": 0, "completion": 0})
+            usage["prompt"] += prompt_tokens
+            usage["completion"] += completion_tokens
+
+    def add_count(self, name: str, value: float):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "trace_id": self.id,
+                "name": self.name,
+                "started": self.started,
+                "spans": sorted(self.spans, key=lambda span: span["start"]),
+                "tokens": {model_name: dict(usage) for model_name, usage in self.tokens.items()},
+                "counters": dict(self.counters)
+            }
+
+    def finish(self):
+        """Append the trace to TRACE_JSONL_PATH, if configured."""
+        if not TRACE_JSONL_PATH:
+            return
+        line = json.dumps(self.to_dict())
+        with _lock:
+            with open(TRACE_JSONL_PATH, "a") as f:
+                f.write(line + "\n")
+
+
+_lock = threading.Lock()
+_histograms = {}
+_tokens = {}
+_requests = {}
+_counters = {}
+_current_trace = contextvars.ContextVar("upskillr_trace", default=None)
+_current_stage = contextvars.ContextVar("upskillr_stage", default=None)
+
+
+def bind(trace: Optional[Trace]) -> Optional[Trace]:
+    """
+    Make trace the active one for the rest of the current context. asyncio
+    tasks and asyncio.to_thread copy the context, so work they start is
+    recorded in the same trace.
+    """
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def observe(stage: str, seconds: float):
+    """Record a duration measured elsewhere, e.g. in a worker process."""
+    if not TRACING_ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage name."""
+    if not TRACING_ENABLED:
+        yield
+        return
+
+    parent = _current_stage.get()
+    token = _current_stage.set(name)
+    error = None
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _current_stage.reset(token)
+        observe(name, seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, start, seconds, parent, error)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of stage(); the stage defaults to the function's name."""
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(stage_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_token_usage(model_name: str, usage):
+    """Count the prompt and completion tokens of an OpenAI usage object (or None)."""
+    if not TRACING_ENABLED or usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    with _lock:
+        _requests[model_name] = _requests.get(model_name, 0) + 1
+        totals = _tokens.setdefault(model_name, {"prompt": 0, "completion": 0})
+        totals["prompt"] += prompt_tokens
+        totals["completion"] += completion_tokens
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_tokens(model_name, prompt_tokens, completion_tokens)
+
+
+def count(name: str, value: float = 1):
+    """Add value to the counter name, process-wide and in the active trace."""
+    if not TRACING_ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_count(name, value)
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text() -> str:
+    """Every histogram and counter in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {stage_name: (list(h.buckets), list(h.counts), h.count, h.sum) for stage_name, h in _histograms.items()}
+        tokens = {model_name: dict(totals) for model_name, totals in _tokens.items()}
+        requests = dict(_requests)
+        counters = dict(_counters)
+
+    lines = [
+        "# HELP upskillr_stage_duration_seconds Time spent in each pipeline stage.",
+        "# TYPE upskillr_stage_duration_seconds histogram"
+    ]
+    for stage_name, (buckets, counts, count, total) in sorted(histograms.items()):
+        label = f'stage="{_label(stage_name)}"'
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'upskillr_stage_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'upskillr_stage_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+        lines.append(f"upskillr_stage_duration_seconds_sum{{{label}}} {total}")
+        lines.append(f"upskillr_stage_duration_seconds_count{{{label}}} {count}")
+
+    lines.append("# HELP upskillr_llm_requests_total LLM responses received, per model.")
+    lines.append("# TYPE upskillr_llm_requests_total counter")
+    for model_name, count in sorted(requests.items()):
+        lines.append(f'upskillr_llm_requests_total{{model="{_label(model_name)}"}} {count}')
+
+    lines.append("# HELP upskillr_llm_tokens_total LLM tokens used, per model and type.")
+    lines.append("# TYPE upskillr_llm_tokens_total counter")
+    for model_name, totals in sorted(tokens.items()):
+        for kind in ("prompt", "completion"):
+            lines.append(f'upskillr_llm_tokens_total{{model="{_label(model_name)}",type="{kind}"}} {totals[kind]}')
+
+    for name, value in sorted(counters.items()):
+        lines.append(f"# TYPE upskillr_{name}_total counter")
+        lines.append(f"upskillr_{name}_total {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write prometheus_text() to path, e.g. for the node_exporter textfile collector."""
+    text = prometheus_text()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def reset():
+    """Drop every recorded histogram and counter."""
+    with _lock:
+        _histograms.clear()
+        _tokens.clear()
+        _requests.clear()
+        _counters.clear()
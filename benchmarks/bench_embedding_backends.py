@@ -0,0 +1,126 @@
+"""
+Compare embedding backends: load time, single-query latency, batch
+throughput, peak RSS and agreement with the torch vectors.
+
+Each backend runs in its own subprocess so RSS is measured in isolation.
+
+    python benchmarks/bench_embedding_backends.py
+    python benchmarks/bench_embedding_backends.py --backends torch onnx-int8 --texts 2000
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+
+WORDS = (
+    "python java sql docker kubernetes aws react django pandas spark airflow terraform "
+    "senior junior engineer analyst designer manager data platform backend frontend "
+    "build design ship maintain own scale migrate improve mentor collaborate "
+    "university degree bachelor master computer science statistics mathematics "
+    "experience years team product customers stakeholders pipeline service api"
+).split()
+
+
+def synthetic_texts(count: int, seed: int) -> list:
+    """Query- and chunk-sized texts, from a dozen words up to a full 256-token chunk."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 180))) for _ in range(count)]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(backend: str, model_name: str, count: int, seed: int, batch_size: int, queries: int, output: str):
+    from rag_components.embeddings import load_embedding_model
+
+    texts = synthetic_texts(count, seed)
+    rss_before = _peak_rss_mb()
+
+    start = time.perf_counter()
+    model = load_embedding_model(model_name, backend=backend)
+    load_seconds = time.perf_counter() - start
+    model.encode(["warm-up"])
+
+    latencies = []
+    for text in texts[:queries]:
+        start = time.perf_counter()
+        model.encode([text])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    np.save(output, np.asarray(vectors, dtype=np.float32))
+    print(json.dumps({
+        "backend": backend,
+        "load_s": load_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "query_p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "throughput_per_s": len(texts) / batch_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "model_rss_mb": _peak_rss_mb() - rss_before,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends against each other.")
+    parser.add_argument('--backends', nargs='+', default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument('--model', default="all-MiniLM-L6-v2")
+    parser.add_argument('--texts', type=int, default=1000, help="Texts encoded in the throughput run")
+    parser.add_argument('--queries', type=int, default=200, help="Single-text encodes timed for latency")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args.model, args.texts, args.seed, args.batch_size, args.queries, args.output)
+        return
+
+    results = []
+    vectors = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            output = str(Path(tmp) / f"{backend}.npy")
+            completed = subprocess.run(
+                [sys.executable, __file__, "--worker", backend, "--output", output,
+                 "--model", args.model, "--texts", str(args.texts), "--queries", str(args.queries),
+                 "--batch-size", str(args.batch_size), "--seed", str(args.seed)],
+                capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                print(f"{backend}: failed\n{completed.stderr.strip()[-2000:]}")
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+            vectors[backend] = np.load(output)
+
+    reference = vectors.get("torch")
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'texts/s':>8} {'peak MB':>8} {'min cos':>8} {'mean cos':>8}")
+    for result in results:
+        agreement = ("", "")
+        if reference is not None:
+            cosine = (vectors[result['backend']] * reference).sum(axis=1) / (
+                np.linalg.norm(vectors[result['backend']], axis=1) * np.linalg.norm(reference, axis=1)
+            )
+            agreement = (f"{cosine.min():.4f}", f"{cosine.mean():.4f}")
+        print(f"{result['backend']:<10} {result['load_s']:>7.2f} {result['query_p50_ms']:>7.2f} {result['query_p95_ms']:>7.2f} "
+              f"{result['throughput_per_s']:>8.1f} {result['peak_rss_mb']:>8.0f} {agreement[0]:>8} {agreement[1]:>8}")
+
+
+if __name__ == '__main__':
+    main()
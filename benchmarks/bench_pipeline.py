@@ -0,0 +1,327 @@
+"""
+End-to-end benchmark of the resume pipeline, fully offline.
+
+Generates (or reuses) the synthetic corpus, starts the mock LLM server and
+measures p50/p95/p99 latency and throughput of load_pdf, clean_text,
+chunk_text, query embedding, the Chroma query and the full process_resume
+path (streamed extraction, retrieval and recommendation, as in the UI).
+Stages whose dependencies are missing are reported as skipped.
+
+Results are saved to benchmarks/results/<time>-<commit>.json; --compare
+checks them against an earlier run and exits non-zero on a regression.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --resumes 100 --llm-latency 1.5 --llm-error-rate 0.05 --concurrency 8
+    python benchmarks/bench_pipeline.py --compare latest --tolerance 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "app"))
+sys.path.insert(0, str(BENCH_DIR))
+
+# Measure the work itself: no result or embedding caches, no client-side
+# throttling, short backoff when the mock server injects errors
+os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_RATE_LIMIT_PER_MINUTE", "1000000")
+os.environ.setdefault("LLM_RATE_LIMIT_BURST", "1000")
+os.environ.setdefault("LLM_BACKOFF_BASE_SECONDS", "0.05")
+
+from mock_llm_server import MockLLMServer
+from synthetic_corpus import synthetic_postings, write_resume_pdfs
+from resume_parser.pdf_parsing import clean_text, extract_text, load_pdf
+from prompts import job_query_prompt_template
+
+DEFAULT_RESULTS_DIR = BENCH_DIR / "results"
+# Metrics compared by --compare
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+
+
+def summarize(samples: list, wall_seconds: float = None) -> dict:
+    """Latency percentiles in milliseconds, and throughput (sequential unless wall_seconds is given)."""
+    samples = np.asarray(samples, dtype=np.float64)
+    wall_seconds = wall_seconds if wall_seconds is not None else float(samples.sum())
+    return {
+        "n": int(samples.size),
+        "p50_ms": float(np.percentile(samples, 50) * 1000),
+        "p95_ms": float(np.percentile(samples, 95) * 1000),
+        "p99_ms": float(np.percentile(samples, 99) * 1000),
+        "mean_ms": float(samples.mean() * 1000),
+        "throughput_per_s": float(samples.size / wall_seconds) if wall_seconds else 0.0
+    }
+
+
+def _time_each(func, items: list, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            func(item)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def resume_profile(resume_text: str) -> dict:
+    """Retrieval profile strings for a synthetic resume, without an LLM."""
+    lines = [line.strip() for line in resume_text.splitlines() if line.strip()]
+    return {
+        'job_role_str': lines[1] if len(lines) > 1 else "Not specified",
+        'skills_str': lines[-1],
+        'education_str': "Not specified",
+        'experience_str': " | ".join(line for line in lines if line.startswith("-"))[:2000] or "Not specified"
+    }
+
+
+def build_collection(model, chunker, postings: list, path: str):
+    """Embed the synthetic postings into a throwaway Chroma collection and BM25 index."""
+    import chromadb
+    from rag_components.chunking import chunk_prefix
+    from rag_components.keyword_index import KeywordIndex
+
+    ids, documents, metadatas = [], [], []
+    for posting in postings:
+        bodies = chunker.chunk_bodies(posting['title'], posting['description']) if chunker else [posting['description']]
+        for i, body in enumerate(bodies):
+            ids.append(f"{posting['job_id']}-{i}")
+            documents.append(chunk_prefix(posting['title']) + body)
+            metadatas.append({
+                'title': posting['title'],
+                'posting_id': posting['job_id'],
+                'chunk_index': i,
+                'location': posting['location'],
+                'seniority': posting['formatted_experience_level']
+            })
+
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection(name='bench-jobs')
+    embeddings = model.encode(documents, batch_size=256)
+    batch = client.get_max_batch_size()
+    for start in range(0, len(ids), batch):
+        collection.add(
+            ids=ids[start:start + batch],
+            documents=documents[start:start + batch],
+            metadatas=metadatas[start:start + batch],
+            embeddings=[list(map(float, e)) for e in embeddings[start:start + batch]]
+        )
+
+    keyword_index = KeywordIndex(Path(path) / "keyword_index.sqlite3")
+    keyword_index.add(zip(ids, documents, metadatas))
+    return collection, keyword_index
+
+
+async def run_process_resume(pdfs: list, server: MockLLMServer, concurrency: int, top_k: int, mode: str = "two_call"):
+    """
+    Streamed extraction then retrieval and recommendation, as app.process_resume
+    runs them, or the single streamed analysis call with mode="single_call".
+    """
+    from pipeline import analyse_resume, analyse_single_call, match_and_recommend
+
+    semaphore = asyncio.Semaphore(concurrency)
+    totals, stages, failures = [], {}, 0
+
+    async def one(pdf):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            if mode == "single_call":
+                result = await analyse_single_call(pdf, server.url, "mock-key", "mock/primary", "mock/fallback", top_k=top_k, on_event=lambda event: None)
+            else:
+                result = await analyse_resume(pdf, server.url, "mock-key", "mock/primary", "mock/fallback", on_event=lambda event: None)
+            if mode != "single_call" and result.failed_stage is None:
+                await match_and_recommend(result, server.url, "mock-key", "mock/primary", "mock/fallback", top_k=top_k)
+            totals.append(time.perf_counter() - start)
+            failures += result.failed_stage is not None
+            for stage, seconds in result.timings.items():
+                stages.setdefault(stage, []).append(seconds)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*[one(pdf) for pdf in pdfs])
+    return totals, stages, failures, time.perf_counter() - wall_start
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BENCH_DIR.parent, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def find_baseline(results_dir: Path, exclude: Path = None):
+    candidates = sorted(path for path in results_dir.glob("*.json") if path != exclude)
+    return candidates[-1] if candidates else None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Print the change per stage and return (stage, metric, baseline, current) for each regression."""
+    regressions = []
+    print(f"\nCompared with {baseline['revision']['commit']} ({baseline['timestamp']}):")
+    for stage, stats in current['results'].items():
+        before = baseline['results'].get(stage)
+        if 'skipped' in stats or not before or 'skipped' in before:
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            if not before.get(metric):
+                continue
+            change = stats[metric] / before[metric] - 1
+            changes.append(f"{metric} {change:+.1%}")
+            if change > tolerance:
+                regressions.append((stage, metric, before[metric], stats[metric]))
+        print(f"  {stage:<28} {'  '.join(changes)}")
+    return regressions
+
+
+def print_results(results: dict):
+    print(f"\n{'stage':<28} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9}")
+    for stage, stats in results.items():
+        if 'skipped' in stats:
+            print(f"{stage:<28} skipped: {stats['skipped']}")
+            continue
+        print(f"{stage:<28} {stats['n']:>5} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['throughput_per_s']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the resume pipeline offline against a mock LLM server.")
+    parser.add_argument('--corpus', type=Path, default=BENCH_DIR / "corpus", help="Where the synthetic resumes are generated")
+    parser.add_argument('--resumes', type=int, default=30)
+    parser.add_argument('--postings', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5, help="Passes over the corpus for the CPU-bound stages")
+    parser.add_argument('--model', default="all-MiniLM-L6-v2")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=4, help="Resumes in flight in the process_resume run")
+    parser.add_argument('--mode', choices=("two_call", "single_call"), default="two_call", help="Pipeline mode of the process_resume run")
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="Mean mock completion latency in seconds")
+    parser.add_argument('--llm-jitter', type=float, default=0.05)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--results-dir', type=Path, default=DEFAULT_RESULTS_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--compare', help="Earlier results file, or 'latest'")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed p50/p95 slowdown before --compare fails")
+    args = parser.parse_args(argv)
+
+    resume_dir = args.corpus / f"resumes-{args.seed}-{args.resumes}"
+    pdf_paths = sorted(resume_dir.glob("*.pdf")) if resume_dir.exists() else []
+    if len(pdf_paths) != args.resumes:
+        print(f"Generating {args.resumes} synthetic resumes in {resume_dir}...")
+        pdf_paths = write_resume_pdfs(resume_dir, args.resumes, args.seed)
+    pdfs = [path.read_bytes() for path in pdf_paths]
+    postings = synthetic_postings(args.postings, args.seed)
+
+    results = {}
+    raw_texts = [extract_text(pdf, parallel=False) for pdf in pdfs]
+    results['load_pdf'] = summarize(_time_each(lambda pdf: load_pdf(pdf, use_cache=False), pdfs, args.repeat))
+    results['clean_text'] = summarize(_time_each(clean_text, raw_texts, args.repeat))
+    resume_texts = [clean_text(text) for text in raw_texts]
+
+    chunker = None
+    try:
+        from rag_components.chunking import TokenChunker, load_tokenizer
+        chunker = TokenChunker(load_tokenizer(args.model))
+        results['chunk_text'] = summarize(_time_each(lambda posting: chunker.chunk(posting['title'], posting['description']), postings, 1))
+    except Exception as e:
+        results['chunk_text'] = {"skipped": f"{type(e).__name__}: {e}"}
+
+    model = None
+    profiles = [resume_profile(text) for text in resume_texts]
+    queries = [
+        job_query_prompt_template.format(job_role=profile['job_role_str'], skills=profile['skills_str'],
+                                         education=profile['education_str'], experience=profile['experience_str'])
+        for profile in profiles
+    ]
+    try:
+        from rag_components.embeddings import load_embedding_model, EMBEDDING_BACKEND
+        model = load_embedding_model(args.model)
+        model.encode(["warm-up"])
+        results[f'embed_query[{EMBEDDING_BACKEND}]'] = summarize(_time_each(lambda query: model.encode([query]), queries, args.repeat))
+    except Exception as e:
+        results['embed_query'] = {"skipped": f"{type(e).__name__}: {e}"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collection = keyword_index = None
+        if model is not None:
+            try:
+                from rag_components.retriever import JobRetriever, FETCH_MULTIPLIER
+                collection, keyword_index = build_collection(model, chunker, postings, tmp)
+                query_embeddings = [embedding.tolist() for embedding in model.encode(queries)]
+                results['chroma_query'] = summarize(_time_each(
+                    lambda embedding: collection.query(query_embeddings=[embedding], n_results=args.top_k * FETCH_MULTIPLIER,
+                                                       include=['documents', 'metadatas', 'embeddings']),
+                    query_embeddings, args.repeat
+                ))
+                # Dense + BM25 fusion, grouping and MMR on top of the raw query
+                retriever = JobRetriever(args.model, args.top_k, model=model, collection=collection, keyword_index=keyword_index)
+                results['retrieve_similar_jobs'] = summarize(_time_each(lambda profile: retriever.retrieve_similar_jobs(**profile), profiles, args.repeat))
+            except Exception as e:
+                results['chroma_query'] = {"skipped": f"{type(e).__name__}: {e}"}
+        else:
+            results['chroma_query'] = {"skipped": "no embedding model"}
+
+        try:
+            if collection is None:
+                raise RuntimeError("no Chroma collection")
+            from rag_components import registry
+            registry.swap_collection(collection, keyword_index)
+            registry.warm_up(args.model)
+            with MockLLMServer(latency=args.llm_latency, jitter=args.llm_jitter, error_rate=args.llm_error_rate,
+                               rate_limit_rate=args.llm_rate_limit_rate, retry_after=0.1, seed=args.seed) as server:
+                totals, stages, failures, wall = asyncio.run(run_process_resume(pdfs, server, args.concurrency, args.top_k, args.mode))
+            # Keyed by mode so --compare only matches runs of the same mode
+            name = 'process_resume' if args.mode == "two_call" else f'process_resume[{args.mode}]'
+            results[name] = {**summarize(totals, wall), "failures": failures}
+            for stage in ('parse', 'extract', 'retrieve', 'recommend', 'analyse'):
+                if stages.get(stage):
+                    results[f'{name}.{stage}'] = summarize(stages[stage])
+        except Exception as e:
+            results['process_resume'] = {"skipped": f"{type(e).__name__}: {e}"}
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "results": results
+    }
+    print_results(results)
+
+    saved = None
+    if not args.no_save:
+        args.results_dir.mkdir(parents=True, exist_ok=True)
+        saved = args.results_dir / f"{datetime.now():%Y%m%d-%H%M%S}-{report['revision']['commit']}.json"
+        with open(saved, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {saved}")
+
+    if args.compare:
+        baseline_path = find_baseline(args.results_dir, saved) if args.compare == "latest" else Path(args.compare)
+        if baseline_path is None:
+            print("No earlier results to compare with.")
+            return
+        with open(baseline_path) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            for stage, metric, before, after in regressions:
+                print(f"REGRESSION {stage} {metric}: {before:.2f} -> {after:.2f}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
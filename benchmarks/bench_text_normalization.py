@@ -0,0 +1,145 @@
+"""
+Micro-benchmark for the shared text normaliser.
+
+Compares app/text_normalization.py against the original per-call re.sub chain
+used by pdf_parsing.clean_text and seed_db.chunk_text, on synthetic resumes
+and job postings. Outputs are checked to be identical before timing.
+
+    python benchmarks/bench_text_normalization.py --repeat 200
+"""
+
+import argparse
+import random
+import re
+import sys
+import timeit
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from text_normalization import RESUME_HEADINGS, clean_resume_text, normalize_whitespace_and_bullets
+
+
+def legacy_clean_text(raw_text: str) -> str:
+    text = unicodedata.normalize("NFKD", raw_text)
+    text = re.sub(r'[​-‍﻿]', '', text)
+    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1f\x7f-\x9f]', '', text)
+    text = re.sub(r'\n+', '\n', text)
+    text = re.sub(r'[ \t]+', ' ', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    text = re.sub(r'[•‣◦⁃∙▪▫]', '\n-', text)
+    text = text.replace('•', '\n-')
+    text = re.sub(r'\so\s', '\n-', text)
+    for heading in RESUME_HEADINGS:
+        patterns = [
+            re.compile(fr'\b{re.escape(heading.upper())}\b:?', re.MULTILINE),
+            re.compile(fr'\b{re.escape(heading.upper())}\s*\n', re.MULTILINE),
+        ]
+        for pattern in patterns:
+            text = pattern.sub('\n\n\\g<0>\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    return text.strip()
+
+
+def legacy_normalize_posting(description: str) -> str:
+    description = re.sub(r'[​-‍﻿]', '', description)
+    description = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1f\x7f-\x9f]', '', description)
+    description = re.sub(r'\n+', '\n', description)
+    description = re.sub(r'[ \t]+', ' ', description)
+    description = re.sub(r'\s{2,}', ' ', description)
+    description = re.sub(r'[•‣◦⁃∙▪▫]', '\n-', description)
+    description = description.replace('•', '\n-')
+    description = re.sub(r'\so\s', '\n-', description)
+    return description
+
+
+WORDS = (
+    "python java sql docker kubernetes aws gcp react django flask pandas numpy "
+    "led built designed shipped migrated improved reduced latency pipeline team "
+    "university bachelor master engineering science data analytics platform api "
+    "customer stakeholders scalable microservices testing deployment monitoring"
+).split()
+NOISE = ["  ", "\t", "\n", "\n\n\n", " \n ", " ", "​", "﻿", "\x0c", "\r\n", " ", " o ", "\x85"]
+BULLETS = ["• ", "▪ ", "◦", "∙ ", "- ", "o "]
+ACCENTED = ["café", "naïve", "Zürich", "ﬁnance", "–", "“quoted”"]
+
+
+def _sentence(rng: random.Random, noisy: bool) -> str:
+    parts = []
+    for _ in range(rng.randint(6, 18)):
+        parts.append(rng.choice(WORDS if rng.random() > 0.05 else ACCENTED))
+        parts.append(rng.choice(NOISE) if noisy and rng.random() < 0.15 else " ")
+    return "".join(parts).strip() + "."
+
+
+def synthetic_resume(rng: random.Random) -> str:
+    """A 1-3 page resume the way PyMuPDF tends to return it: ragged lines, glyph bullets, headings."""
+    sections = []
+    for heading in rng.sample(RESUME_HEADINGS, rng.randint(4, 8)):
+        heading = heading.upper() + (":" if rng.random() < 0.4 else "")
+        lines = [f"{rng.choice(BULLETS)}{_sentence(rng, noisy=True)}" for _ in range(rng.randint(3, 12))]
+        sections.append(heading + rng.choice(["\n", " \n", "\n\n", "  "]) + "\n".join(lines))
+    return "Jane Doe\njane@example.com | +1 555 0100\n\n" + "\n\n".join(sections)
+
+
+def synthetic_posting(rng: random.Random) -> str:
+    """A job description of a few hundred words with bullet lists and stray formatting."""
+    paragraphs = []
+    for _ in range(rng.randint(3, 7)):
+        if rng.random() < 0.5:
+            paragraphs.append("\n".join(f"{rng.choice(BULLETS)}{_sentence(rng, noisy=True)}" for _ in range(rng.randint(3, 8))))
+        else:
+            paragraphs.append(" ".join(_sentence(rng, noisy=rng.random() < 0.3) for _ in range(rng.randint(2, 6))))
+    return "\n\n".join(paragraphs)
+
+
+def fuzz_text(rng: random.Random) -> str:
+    """Short adversarial strings built from the characters the patterns care about."""
+    alphabet = [" ", "\t", "\n", "\r", "\x0b", "\x0c", " ", " ", "　", "​", "\x85", "o", "O", ":", "a", "-", "•", "▫", "é"]
+    alphabet += [h.upper() for h in RESUME_HEADINGS] + ["WORK", "PROFESSIONAL", "EXPERIENCES"]
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+
+
+def check_equivalence(resumes: list, postings: list, rng: random.Random, fuzz_cases: int):
+    for text in resumes + [fuzz_text(rng) for _ in range(fuzz_cases)]:
+        if legacy_clean_text(text) != clean_resume_text(text):
+            raise SystemExit(f"clean_text mismatch for {text!r}")
+    for text in postings + [fuzz_text(rng) for _ in range(fuzz_cases)]:
+        if legacy_normalize_posting(text) != normalize_whitespace_and_bullets(text):
+            raise SystemExit(f"posting normalisation mismatch for {text!r}")
+
+
+def bench(label: str, legacy, current, corpus: list, repeat: int):
+    def run(fn):
+        return min(timeit.repeat(lambda: [fn(text) for text in corpus], number=1, repeat=repeat))
+
+    before = run(legacy)
+    after = run(current)
+    per_doc = 1e6 / len(corpus)
+    print(f"{label:<22} legacy {before * per_doc:8.1f} us/doc   shared {after * per_doc:8.1f} us/doc   speedup {before / after:5.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark resume and posting text normalisation.")
+    parser.add_argument('--resumes', type=int, default=50)
+    parser.add_argument('--postings', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20, help="Timing repetitions, the best one is reported")
+    parser.add_argument('--fuzz-cases', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    resumes = [synthetic_resume(rng) for _ in range(args.resumes)]
+    postings = [synthetic_posting(rng) for _ in range(args.postings)]
+
+    check_equivalence(resumes, postings, rng, args.fuzz_cases)
+    print(f"Outputs identical on {len(resumes)} resumes, {len(postings)} postings and {2 * args.fuzz_cases} fuzz strings")
+
+    bench("clean_text (resumes)", legacy_clean_text, clean_resume_text, resumes, args.repeat)
+    bench("chunk_text (postings)", legacy_normalize_posting, normalize_whitespace_and_bullets, postings, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
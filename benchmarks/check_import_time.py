@@ -0,0 +1,126 @@
+"""
+Import-time budget check for the entry points.
+
+Imports a module from app/ in a fresh interpreter under `python -X importtime`,
+builds the import tree and fails when
+  - the module's own import time (minus excluded packages such as streamlit,
+    which the UI cannot start without) exceeds the budget, or
+  - a heavy package that must be deferred (torch, chromadb, ...) is imported.
+
+    python benchmarks/check_import_time.py                     # the Streamlit UI shell
+    python benchmarks/check_import_time.py --module service --budget-ms 5000 --allow chromadb openai pymupdf
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# Only imported by the stage that needs them
+DEFAULT_FORBIDDEN = (
+    "torch", "sentence_transformers", "transformers", "onnxruntime", "tokenizers", "chromadb",
+    "matplotlib", "seaborn", "pandas", "pymupdf", "fitz", "openai", "httpx"
+)
+# Imported unconditionally by the UI, not counted against the budget
+DEFAULT_EXCLUDED = ("streamlit",)
+
+
+class ImportNode:
+    def __init__(self, name: str, self_us: int, cumulative_us: int, children: list):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = children
+
+    @property
+    def package(self) -> str:
+        return self.name.split(".")[0]
+
+
+def parse_importtime(output: str) -> list:
+    """
+    Root nodes of the tree printed by -X importtime. Entries come in
+    post-order, children indented two spaces deeper than their parent.
+    """
+    pending = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        node = ImportNode(name.strip(), int(self_us), int(cumulative_us), pending.pop(level + 1, []))
+        pending.setdefault(level, []).append(node)
+    return pending.get(0, [])
+
+
+def _walk(node: ImportNode, excluded: set):
+    """Nodes under node, not descending into excluded packages."""
+    for child in node.children:
+        yield child
+        if child.package not in excluded:
+            yield from _walk(child, excluded)
+
+
+def measure(module: str) -> ImportNode:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise SystemExit(f"Importing {module} failed:\n" + "\n".join(errors[-20:]))
+
+    for root in parse_importtime(completed.stderr):
+        if root.name == module:
+            return root
+    raise SystemExit(f"{module} not found in the -X importtime output")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of an app entry point against a budget.")
+    parser.add_argument('--module', default="app", help="Module in app/ to import (app is the Streamlit script)")
+    parser.add_argument('--budget-ms', type=float, default=300.0, help="Allowed import time excluding --exclude packages")
+    parser.add_argument('--exclude', nargs='*', default=list(DEFAULT_EXCLUDED), help="Packages not counted against the budget")
+    parser.add_argument('--forbid', nargs='*', default=list(DEFAULT_FORBIDDEN), help="Packages that must not be imported")
+    parser.add_argument('--allow', nargs='*', default=[], help="Remove packages from --forbid")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters to try, the fastest one counts")
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    excluded = set(args.exclude)
+    forbidden = set(args.forbid) - set(args.allow)
+
+    best = None
+    for _ in range(max(1, args.runs)):
+        root = measure(args.module)
+        excluded_us = sum(node.cumulative_us for node in _walk(root, excluded) if node.package in excluded)
+        net_us = root.cumulative_us - excluded_us
+        if best is None or net_us < best[1]:
+            best = (root, net_us, excluded_us)
+    root, net_us, excluded_us = best
+
+    counted = [node for node in _walk(root, excluded) if node.package not in excluded]
+    print(f"{args.module}: {root.cumulative_us / 1000:.1f} ms total, {excluded_us / 1000:.1f} ms in {', '.join(sorted(excluded)) or 'nothing'} (excluded), "
+          f"{net_us / 1000:.1f} ms counted against a {args.budget_ms:.0f} ms budget")
+    print(f"\nSlowest imports (self time, excluding {', '.join(sorted(excluded)) or 'nothing'}):")
+    for node in sorted(counted, key=lambda node: -node.self_us)[:args.top]:
+        print(f"  {node.self_us / 1000:>8.1f} ms  {node.name}")
+
+    failures = []
+    if net_us / 1000 > args.budget_ms:
+        failures.append(f"import time {net_us / 1000:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    loaded = sorted({node.package for node in counted if node.package in forbidden})
+    if loaded:
+        failures.append(f"heavy packages imported at startup: {', '.join(loaded)}")
+
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
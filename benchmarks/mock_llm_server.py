@@ -0,0 +1,241 @@
+"""
+Local OpenAI-compatible chat completions server for benchmarks and offline runs.
+
+Answers /v1/chat/completions with canned ResumeData JSON (requests with a
+system prompt, i.e. extraction), both merged into one object (a system
+prompt asking for recommended_skills, the single-call analysis) or
+SkillRecommendations JSON (everything else), streamed or not, after a configurable latency. A share of requests can
+fail with 500 or be rate limited with 429 and a Retry-After header, to
+exercise the gateway's retries, fallbacks and circuit breaker.
+
+    python benchmarks/mock_llm_server.py --port 8765 --latency 0.8 --error-rate 0.05
+    API_URL=http://127.0.0.1:8765/v1/chat/completions OPENROUTER_API_KEY=mock MODEL_NAME=mock/model streamlit run app/app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_RESUME_DATA = {
+    "name": "Alex Morgan",
+    "job_role": "Data Analyst",
+    "education": [
+        "B.Sc. Computer Science, State University, 2016 - 2020"
+    ],
+    "experience": [
+        "Data Analyst, Northwind Retail, 2021 - present: built SQL reporting pipelines and Tableau dashboards for 40 stores",
+        "Analytics Intern, Contoso Health, 2020: cleaned claims data with pandas and automated weekly KPI reports"
+    ],
+    "skills": ["Python", "SQL", "pandas", "Tableau", "Excel", "A/B testing", "Communication"]
+}
+
+CANNED_SKILL_RECOMMENDATIONS = {
+    "recommended_skills": [
+        "dbt", "Apache Airflow", "Snowflake", "Statistics", "Looker",
+        "Data modeling", "Spark", "Git", "Stakeholder management"
+    ]
+}
+
+
+class MockLLMServer:
+    """
+    Threaded mock server; use as a context manager or call start() / stop().
+    url is the chat completions endpoint, in the form API_URL expects.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.5, jitter: float = 0.1,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 resume_data: dict = None, recommendations: dict = None, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.resume_data = resume_data or CANNED_RESUME_DATA
+        self.recommendations = recommendations or CANNED_SKILL_RECOMMENDATIONS
+        self.requests = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock/model", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "invalid JSON body"}})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                server._handle_completion(self, body)
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self):
+        """Latency and outcome of the next request: 'ok', 'error' or 'rate_limit'."""
+        with self._lock:
+            self.requests += 1
+            latency = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                outcome = "rate_limit"
+            elif roll < self.rate_limit_rate + self.error_rate:
+                outcome = "error"
+            else:
+                outcome = "ok"
+            if outcome != "ok":
+                self.failures += 1
+        return latency, outcome
+
+    def _content_for(self, body: dict) -> str:
+        messages = body.get("messages") or []
+        system = [message.get("content") or "" for message in messages if message.get("role") == "system"]
+        if any("recommended_skills" in content for content in system):
+            return json.dumps({**self.resume_data, **self.recommendations})
+        if system:
+            return json.dumps(self.resume_data)
+        return json.dumps(self.recommendations)
+
+    def _handle_completion(self, handler, body: dict):
+        latency, outcome = self._draw()
+        if outcome == "rate_limit":
+            handler._send_json(429, {"error": {"message": "Rate limit exceeded (mock)", "code": 429}},
+                               {"Retry-After": f"{self.retry_after:g}"})
+            return
+        if outcome == "error":
+            time.sleep(latency / 2)
+            handler._send_json(500, {"error": {"message": "Internal server error (mock)", "code": 500}})
+            return
+
+        content = self._content_for(body)
+        model = body.get("model") or "mock/model"
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in body.get("messages") or []) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                 "total_tokens": prompt_tokens + len(content) // 4}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            time.sleep(latency)
+            handler._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        # Half the latency before the first token, the rest spread over the stream
+        pieces = [content[i:i + 24] for i in range(0, len(content), 24)]
+        time.sleep(latency / 2)
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+
+        def send(payload):
+            handler.wfile.write(f"data: {payload}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+        for i, piece in enumerate(pieces):
+            delta = {"content": piece} if i else {"role": "assistant", "content": piece}
+            send(json.dumps({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+            time.sleep(latency / 2 / len(pieces))
+        send(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send(json.dumps({**base, "choices": [], "usage": usage}))
+        send("[DONE]")
+        handler.close_connection = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible chat completions server.")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help="Mean seconds per completion")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Standard deviation of the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--resume-json', help="File with the ResumeData JSON to return")
+    parser.add_argument('--recommendations-json', help="File with the SkillRecommendations JSON to return")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    def load(path):
+        if not path:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    server = MockLLMServer(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        resume_data=load(args.resume_json), recommendations=load(args.recommendations_json), seed=args.seed
+    )
+    print(f"Mock LLM server listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Deterministic synthetic resumes and job postings for benchmarks.
+
+The same seed always gives the same corpus, so results stay comparable
+between commits without shipping binary PDFs or real personal data.
+
+    python benchmarks/synthetic_corpus.py --out benchmarks/corpus --resumes 50 --postings 2000
+"""
+
+import argparse
+import csv
+import random
+from pathlib import Path
+
+ROLES = [
+    "Data Analyst", "Data Scientist", "Machine Learning Engineer", "Backend Engineer", "Frontend Developer",
+    "DevOps Engineer", "Product Manager", "QA Engineer", "Business Analyst", "Cloud Architect",
+    "Mobile Developer", "Security Analyst", "Data Engineer", "UX Designer", "Site Reliability Engineer"
+]
+SKILLS = [
+    "Python", "SQL", "Java", "JavaScript", "TypeScript", "React", "Node.js", "Django", "Flask", "FastAPI",
+    "Docker", "Kubernetes", "AWS", "GCP", "Azure", "Terraform", "Airflow", "Spark", "pandas", "NumPy",
+    "scikit-learn", "PyTorch", "TensorFlow", "Tableau", "Power BI", "Excel", "Git", "Linux", "CI/CD", "REST APIs",
+    "GraphQL", "PostgreSQL", "MongoDB", "Redis", "Kafka", "Snowflake", "dbt", "Figma", "Jira", "Agile"
+]
+SOFT_SKILLS = ["Communication", "Leadership", "Mentoring", "Stakeholder management", "Problem solving"]
+COMPANIES = ["Northwind", "Contoso", "Fabrikam", "Globex", "Initech", "Umbrella Labs", "Hooli", "Vandelay", "Stark Digital"]
+SCHOOLS = ["State University", "Institute of Technology", "City College", "Polytechnic University"]
+DEGREES = ["B.Sc. Computer Science", "B.Eng. Software Engineering", "M.Sc. Data Science", "B.A. Economics", "M.Sc. Statistics"]
+LOCATIONS = ["Berlin", "London", "New York, NY", "San Francisco, CA", "Bangalore", "Toronto", "Remote"]
+SENIORITY = ["Internship", "Entry level", "Associate", "Mid-Senior level", "Director"]
+VERBS = ["Built", "Designed", "Shipped", "Migrated", "Automated", "Led", "Optimised", "Maintained", "Scaled", "Owned"]
+OBJECTS = [
+    "reporting pipelines", "customer-facing APIs", "dashboards for leadership", "the data warehouse",
+    "CI/CD workflows", "recommendation models", "a React design system", "monitoring and alerting",
+    "ETL jobs processing 2 TB per day", "the mobile checkout flow"
+]
+BOILERPLATE = [
+    "We are an equal opportunity employer and value diversity. All employment decisions are made without regard to race, "
+    "color, religion, sex, sexual orientation, gender identity, national origin, disability or veteran status.",
+    "Benefits: competitive salary, health insurance, 401(k) matching, flexible working hours, learning budget, "
+    "parental leave and a home office stipend.",
+]
+
+
+def _bullets(rng: random.Random, skills: list, count: int) -> list:
+    return [
+        f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} using {', '.join(rng.sample(skills, min(2, len(skills))))}."
+        for _ in range(count)
+    ]
+
+
+def synthetic_resume_text(rng: random.Random, pages: int = 1) -> list:
+    """The text of each page of one synthetic resume."""
+    role = rng.choice(ROLES)
+    skills = rng.sample(SKILLS, rng.randint(6, 14)) + rng.sample(SOFT_SKILLS, 2)
+    name = f"{rng.choice(['Alex', 'Sam', 'Priya', 'Chen', 'Maria', 'Jordan', 'Aisha', 'Lukas'])} {rng.choice(['Morgan', 'Singh', 'Garcia', 'Okafor', 'Novak', 'Kim', 'Weber'])}"
+
+    lines = [name, role, f"{name.split()[0].lower()}@example.com | +1 555 0100 | {rng.choice(LOCATIONS)}", "", "SUMMARY",
+             f"{role} with {rng.randint(1, 12)} years of experience in {', '.join(skills[:3])}.", "", "EXPERIENCE"]
+    for _ in range(rng.randint(2, 4) * pages):
+        start = rng.randint(2010, 2022)
+        lines.append(f"{rng.choice(ROLES)}, {rng.choice(COMPANIES)} – {start} - {start + rng.randint(1, 3)}")
+        lines.extend(f"• {bullet}" for bullet in _bullets(rng, skills, rng.randint(3, 6)))
+    lines += ["", "EDUCATION", f"{rng.choice(DEGREES)}, {rng.choice(SCHOOLS)}, {rng.randint(2008, 2020)}",
+              "", "SKILLS", ", ".join(skills), "", "PROJECTS"]
+    lines.extend(f"• {bullet}" for bullet in _bullets(rng, skills, 3))
+
+    per_page = -(-len(lines) // pages)
+    return ["\n".join(lines[i:i + per_page]) for i in range(0, len(lines), per_page)]
+
+
+def write_resume_pdfs(directory, count: int, seed: int = 0) -> list:
+    """Write count resume PDFs (one to three pages) to directory and return their paths."""
+    import pymupdf
+
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        doc = pymupdf.open()
+        for page_text in synthetic_resume_text(rng, pages=rng.choice([1, 1, 2, 3])):
+            page = doc.new_page()
+            page.insert_textbox(pymupdf.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), page_text, fontsize=9)
+        path = directory / f"resume_{i:04d}.pdf"
+        doc.save(str(path))
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def synthetic_postings(count: int, seed: int = 0) -> list:
+    """Posting dicts with the columns seed_db reads; some share boilerplate, some are near copies."""
+    rng = random.Random(seed)
+    postings = []
+    for i in range(count):
+        if postings and rng.random() < 0.05:
+            # Near duplicate: a repost of an earlier posting with a different company
+            source = rng.choice(postings)
+            postings.append({**source, "job_id": f"job-{i:06d}",
+                             "description": source["description"].replace("Our team", f"The {rng.choice(COMPANIES)} team", 1)})
+            continue
+
+        title = rng.choice(ROLES)
+        skills = rng.sample(SKILLS, rng.randint(4, 9))
+        paragraphs = [
+            f"Our team at {rng.choice(COMPANIES)} is hiring a {title} to join a growing group of engineers and analysts.",
+            "Responsibilities:",
+            *[f"• {bullet}" for bullet in _bullets(rng, skills, rng.randint(3, 8))],
+            "Requirements:",
+            *[f"• {rng.randint(1, 8)}+ years with {skill}." for skill in skills],
+        ]
+        paragraphs.extend(rng.sample(BOILERPLATE, rng.randint(0, 2)))
+        postings.append({
+            "job_id": f"job-{i:06d}",
+            "title": title,
+            "description": "\n".join(paragraphs),
+            "location": rng.choice(LOCATIONS),
+            "formatted_experience_level": rng.choice(SENIORITY),
+        })
+    return postings
+
+
+def write_postings_csv(path, count: int, seed: int = 0) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    postings = synthetic_postings(count, seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(postings[0]))
+        writer.writeheader()
+        writer.writerows(postings)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic resume and job posting corpus.")
+    parser.add_argument('--out', type=Path, default=Path(__file__).resolve().parent / "corpus")
+    parser.add_argument('--resumes', type=int, default=50)
+    parser.add_argument('--postings', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = write_resume_pdfs(args.out / "resumes", args.resumes, args.seed)
+    csv_path = write_postings_csv(args.out / "job_postings.csv", args.postings, args.seed)
+    print(f"Wrote {len(paths)} resumes to {args.out / 'resumes'} and {args.postings} postings to {csv_path}")
+
+
+if __name__ == '__main__':
+    main()
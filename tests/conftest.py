@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The app runs with app/ on the path (streamlit run app/app.py), and the
+# rag_components scripts fall back to importing their siblings directly
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path[:0] = [str(APP_DIR), str(APP_DIR / "rag_components")]
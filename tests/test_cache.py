@@ -0,0 +1,67 @@
+import cache
+from cache import ResultCache
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    result_cache = ResultCache(tmp_path / "cache.sqlite3", ttl_seconds=60, max_entries=10)
+
+    result_cache.put("resume_data", "key", {'name': "Ann"})
+    clock.now += 59
+    assert result_cache.get("resume_data", "key") == {'name': "Ann"}
+
+    # Reading an entry does not extend its lifetime
+    clock.now += 2
+    assert result_cache.get("resume_data", "key") is None
+    assert result_cache.stats()['entries'] == 0
+
+
+def test_purge_expired_removes_only_old_entries(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    result_cache = ResultCache(tmp_path / "cache.sqlite3", ttl_seconds=60, max_entries=10)
+
+    result_cache.put("resume_data", "old", 1)
+    clock.now += 45
+    result_cache.put("resume_data", "new", 2)
+    clock.now += 30
+
+    assert result_cache.purge_expired() == 1
+    assert result_cache.get("resume_data", "new") == 2
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    result_cache = ResultCache(tmp_path / "cache.sqlite3", ttl_seconds=0, max_entries=2)
+
+    result_cache.put("resume_data", "a", 1)
+    clock.now += 1
+    result_cache.put("resume_data", "b", 2)
+    clock.now += 1
+    # Reading a makes b the least recently used entry
+    assert result_cache.get("resume_data", "a") == 1
+    clock.now += 1
+    result_cache.put("recommendations", "c", 3)
+
+    assert result_cache.get("resume_data", "b") is None
+    assert result_cache.get("resume_data", "a") == 1
+    assert result_cache.get("recommendations", "c") == 3
+
+
+def test_namespaces_are_separate(tmp_path):
+    result_cache = ResultCache(tmp_path / "cache.sqlite3")
+
+    result_cache.put("resume_data", "key", 1)
+
+    assert result_cache.get("recommendations", "key") is None
+    assert result_cache.stats()['namespaces']['recommendations']['misses'] == 1
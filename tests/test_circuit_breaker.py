@@ -0,0 +1,117 @@
+import llm_gateway
+from llm_gateway import CircuitBreaker
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def open_breaker(clock, monkeypatch, threshold: int = 2) -> CircuitBreaker:
+    monkeypatch.setattr(llm_gateway.time, "monotonic", clock)
+    breaker = CircuitBreaker(failure_threshold=threshold, reset_seconds=30)
+    for _ in range(threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(monkeypatch):
+    monkeypatch.setattr(llm_gateway.time, "monotonic", Clock())
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(monkeypatch):
+    monkeypatch.setattr(llm_gateway.time, "monotonic", Clock())
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_lets_one_trial_request_through_after_the_cool_down(monkeypatch):
+    clock = Clock()
+    breaker = open_breaker(clock, monkeypatch)
+
+    clock.now += 31
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_the_circuit_again(monkeypatch):
+    clock = Clock()
+    breaker = open_breaker(clock, monkeypatch)
+
+    clock.now += 31
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 31
+    assert breaker.allow()
+
+
+def test_released_trial_slot_can_be_taken_again(monkeypatch):
+    clock = Clock()
+    breaker = open_breaker(clock, monkeypatch)
+
+    clock.now += 31
+    assert breaker.allow()
+    breaker.release()
+
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+def test_retry_after_keeps_the_circuit_open_longer(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_gateway.time, "monotonic", clock)
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+
+    breaker.record_failure(open_for=120)
+
+    clock.now += 60
+    assert not breaker.allow()
+    clock.now += 61
+    assert breaker.allow()
+
+
+def test_fatal_error_on_a_trial_request_frees_the_slot(monkeypatch):
+    class FailingClient:
+        class chat:
+            class completions:
+                @staticmethod
+                def create(**request):
+                    raise ValueError("malformed request")
+
+    clock = Clock()
+    breaker = open_breaker(clock, monkeypatch)
+    monkeypatch.setitem(llm_gateway._breakers, "test-model", breaker)
+    monkeypatch.setattr(llm_gateway, "get_client", lambda *args: FailingClient())
+    clock.now += 31
+
+    assert llm_gateway.chat_completion("http://llm.invalid", "key", "test-model", messages=[]) is None
+    # Not the model's fault: the breaker stays half-open with its trial slot free
+    assert breaker.state == "half-open"
+    assert breaker.allow()
@@ -0,0 +1,43 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from rag_components import generator
+from resume_parser import detail_extraction
+
+RESUME = {"name": "Ann", "job_role": "Data Engineer", "education": ["BSc"], "experience": [], "skills": ["SQL"]}
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_completion_without_content_is_a_failed_parse():
+    assert detail_extraction._parse_completion("model", completion(None)) is None
+    assert detail_extraction._parse_completion("model", SimpleNamespace(choices=[])) is None
+    assert detail_extraction._parse_completion("model", SimpleNamespace(choices=None)) is None
+    assert generator._parse_completion("model", completion(None)) is None
+    assert generator._parse_analysis_completion("model", SimpleNamespace(choices=[])) is None
+
+
+def test_completion_content_is_validated():
+    assert detail_extraction._parse_completion("model", completion(f"  {json.dumps(RESUME)}\n")) == RESUME
+    assert detail_extraction._parse_completion("model", completion("not json")) is None
+
+
+def test_empty_primary_completion_falls_back(monkeypatch):
+    responses = {"primary": completion(None), "fallback": completion(json.dumps(RESUME))}
+    calls = []
+
+    async def fake_achat_completion(API_URL, API_KEY, model_name, **request):
+        calls.append(model_name)
+        return responses[model_name]
+
+    monkeypatch.setattr(detail_extraction, "achat_completion", fake_achat_completion)
+
+    result = asyncio.run(detail_extraction.aextract_education_skills_name(
+        "resume text", "key", "primary", "http://llm.invalid", "fallback", use_cache=False, hedge=False
+    ))
+
+    assert result == RESUME
+    assert calls == ["primary", "fallback"]
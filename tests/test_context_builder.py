@@ -0,0 +1,88 @@
+import pytest
+
+from rag_components.context_builder import count_tokens, fit_postings
+
+BOILERPLATE = "We are an equal opportunity employer and welcome all applicants."
+
+
+def posting(title: str, sentences: list) -> str:
+    return f"Job Title: {title}\nDescription: " + " ".join(sentences)
+
+
+DATA = posting("Data Engineer", [
+    "Build batch pipelines in Spark and Airflow for the analytics team.",
+    "Own the data warehouse models and their tests.",
+    BOILERPLATE,
+])
+ML = posting("ML Engineer", [
+    "Train ranking models with PyTorch on large click logs.",
+    BOILERPLATE,
+    "Deploy models behind a low latency API.",
+])
+ANALYST = posting("Analyst", [
+    "Write SQL reports for finance every week.",
+    "Present findings to stakeholders.",
+])
+
+
+def titles(postings: list) -> list:
+    return [text.partition("\n")[0] for text in postings]
+
+
+@pytest.mark.parametrize("available", [1000, 150, 80, 30])
+def test_postings_fit_the_budget_best_scored_first(available):
+    postings, _ = fit_postings([DATA, ML, ANALYST], [0.2, 0.9, 0.1], available)
+
+    assert sum(count_tokens(text) for text in postings) <= available
+    assert titles(postings)[0] == "Job Title: ML Engineer"
+
+
+def test_everything_is_kept_when_it_fits():
+    postings, dropped = fit_postings([DATA, ML, ANALYST], [0.2, 0.9, 0.1], 1000)
+
+    assert titles(postings) == ["Job Title: ML Engineer", "Job Title: Data Engineer", "Job Title: Analyst"]
+    assert "Deploy models behind a low latency API." in postings[0]
+    assert "Present findings to stakeholders." in postings[2]
+    # Only the repeated boilerplate sentence is dropped
+    assert dropped == 1
+
+
+def test_repeated_sentences_are_kept_by_the_best_ranked_posting_only():
+    postings, _ = fit_postings([DATA, ML], [0.2, 0.9], 1000)
+
+    assert BOILERPLATE in postings[0]
+    assert BOILERPLATE not in postings[1]
+
+
+def test_near_duplicate_sentences_are_dropped():
+    reworded = posting("Backend Engineer", ["We are an equal opportunity employer and we welcome all applicants."])
+
+    postings, dropped = fit_postings([DATA, reworded], None, 1000)
+
+    assert titles(postings) == ["Job Title: Data Engineer"]
+    assert dropped == 1
+
+
+def test_retrieval_order_is_used_without_scores():
+    postings, _ = fit_postings([DATA, ML, ANALYST], None, 1000)
+
+    assert titles(postings) == ["Job Title: Data Engineer", "Job Title: ML Engineer", "Job Title: Analyst"]
+    assert BOILERPLATE in postings[0]
+
+
+def test_negative_scores_still_rank_and_fit():
+    postings, _ = fit_postings([DATA, ML, ANALYST], [-1.0, -0.2, -3.0], 150)
+
+    assert titles(postings)[0] == "Job Title: ML Engineer"
+    assert sum(count_tokens(text) for text in postings) <= 150
+
+
+def test_tight_budget_drops_postings_instead_of_keeping_bare_headers():
+    postings, _ = fit_postings([DATA, ML, ANALYST], [0.2, 0.9, 0.1], 80)
+
+    assert len(postings) < 3
+    assert all(text.partition("Description:")[2].strip() for text in postings)
+
+
+def test_no_postings():
+    assert fit_postings([], None, 100) == ([], 0)
@@ -0,0 +1,126 @@
+import sys
+
+from rag_components import seed_db
+from rag_components.dedup import ChunkDeduplicator, band_keys, minhash_signature
+from rag_components.ingest_state import IngestState
+from rag_components.keyword_index import KeywordIndex
+
+BOILERPLATE = "We are an equal opportunity employer and value diversity at our company. All qualified applicants are welcome."
+
+
+class FakeCollection:
+    """The part of a Chroma collection that release_postings uses, in memory."""
+
+    def __init__(self, records):
+        self.records = {chunk_id: (document, dict(metadata)) for chunk_id, document, metadata in records}
+
+    def get(self, ids=None, where=None, include=()):
+        if where is not None:
+            wanted = set(where['posting_id']['$in'])
+            ids = [chunk_id for chunk_id, (_, metadata) in self.records.items() if metadata.get('posting_id') in wanted]
+        ids = [chunk_id for chunk_id in ids if chunk_id in self.records]
+        return {
+            'ids': ids,
+            'documents': [self.records[chunk_id][0] for chunk_id in ids],
+            'metadatas': [self.records[chunk_id][1] for chunk_id in ids],
+        }
+
+    def update(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            document, current = self.records[chunk_id]
+            self.records[chunk_id] = (document, {**current, **metadata})
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+
+
+def test_release_keeps_chunks_still_used_by_other_postings(tmp_path):
+    state = IngestState(tmp_path / "state.sqlite3")
+    state.add_chunk_postings([("shared", "A"), ("shared", "B"), ("own", "A")])
+
+    orphaned, still_shared = state.release_postings(["A"])
+
+    assert orphaned == ["own"]
+    assert still_shared == ["shared"]
+    assert state.chunk_postings(["shared", "own"]) == {"shared": ["B"]}
+
+    orphaned, still_shared = state.release_postings(["B"])
+    assert orphaned == ["shared"]
+    assert still_shared == []
+    assert state.stored_chunks(["shared", "own"]) == set()
+
+
+def test_release_drops_signatures_of_orphaned_chunks_only(tmp_path):
+    state = IngestState(tmp_path / "state.sqlite3")
+    signature = minhash_signature(BOILERPLATE)
+    keys = band_keys(signature)
+    state.add_chunk_postings([("shared", "A"), ("shared", "B"), ("own", "A")])
+    state.add_chunk_signatures([("shared", signature.tobytes(), keys), ("own", signature.tobytes(), keys)])
+
+    state.release_postings(["A"])
+
+    assert set(state.lsh_candidates(keys)) == {"shared"}
+
+
+def test_release_hands_shared_chunks_to_a_remaining_posting(tmp_path):
+    state = IngestState(tmp_path / "state.sqlite3")
+    shared, own = seed_db.chunk_record_id(BOILERPLATE), seed_db.chunk_record_id("Night shifts on the ward.")
+    keyword_index = KeywordIndex(tmp_path / "keywords.sqlite3")
+    postings = [
+        ("A", "hash-a", "Nurse", "", {'location': "Berlin"}),
+        ("B", "hash-b", "Engineer", "", {'location': "Paris", 'seniority': "Senior"}),
+    ]
+    state.record_metadata((posting[0], seed_db.posting_metadata(posting)) for posting in postings)
+    state.add_chunk_postings([(shared, "A"), (shared, "B"), (own, "A")])
+    collection = FakeCollection([
+        (shared, "Job Title: Nurse\n" + BOILERPLATE,
+         {'posting_id': "A", 'content_hash': "hash-a", 'title': "Nurse", 'location': "Berlin", 'posting_ids': "A,B", 'posting_count': 2}),
+        (own, "Job Title: Nurse\nNight shifts on the ward.",
+         {'posting_id': "A", 'content_hash': "hash-a", 'title': "Nurse", 'location': "Berlin", 'posting_ids': "A", 'posting_count': 1}),
+    ])
+
+    seed_db.release_postings(collection, state, keyword_index, ["A"])
+
+    assert set(collection.records) == {shared}
+    metadata = collection.records[shared][1]
+    assert metadata['posting_id'] == "B"
+    assert metadata['title'] == "Engineer"
+    assert metadata['location'] == "Paris"
+    assert metadata['seniority'] == "Senior"
+    assert metadata['posting_ids'] == "B"
+    assert metadata['posting_count'] == 1
+    assert [chunk_id for chunk_id, _ in keyword_index.search("diversity", 5, {'location': "Paris"})] == [shared]
+
+
+def test_deduplicator_matches_exact_and_near_copies(tmp_path):
+    state = IngestState(tmp_path / "state.sqlite3")
+    deduplicator = ChunkDeduplicator(state)
+    chunk_id = seed_db.chunk_record_id(BOILERPLATE)
+
+    assert deduplicator.resolve(chunk_id, minhash_signature(BOILERPLATE)) is None
+    # Queued chunks are matched before they are committed
+    assert deduplicator.resolve(chunk_id, minhash_signature(BOILERPLATE)) == chunk_id
+    deduplicator.commit()
+    state.add_chunk_postings([(chunk_id, "A")])
+
+    near_copy = BOILERPLATE + " Thank you."
+    assert ChunkDeduplicator(state).resolve(seed_db.chunk_record_id(near_copy), minhash_signature(near_copy)) == chunk_id
+    assert ChunkDeduplicator(state, threshold=0).resolve(seed_db.chunk_record_id(near_copy), minhash_signature(near_copy)) is None
+
+
+def test_deduplicator_does_not_reuse_chunks_of_another_embedding_space(tmp_path, monkeypatch):
+    state = IngestState(tmp_path / "state.sqlite3")
+    deduplicator = ChunkDeduplicator(state)
+    fp32_id = seed_db.chunk_record_id(BOILERPLATE)
+    deduplicator.resolve(fp32_id, minhash_signature(BOILERPLATE))
+    deduplicator.commit()
+    state.add_chunk_postings([(fp32_id, "A")])
+
+    # seed_db may have imported embeddings under either module name
+    embeddings = sys.modules[seed_db.embedding_fingerprint.__module__]
+    monkeypatch.setattr(embeddings, "EMBEDDING_BACKEND", "onnx-int8")
+    int8_id = seed_db.chunk_record_id(BOILERPLATE)
+
+    assert int8_id != fp32_id
+    assert ChunkDeduplicator(state).resolve(int8_id, minhash_signature(BOILERPLATE)) is None
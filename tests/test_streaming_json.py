@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from streaming_json import IncrementalJSONObjectParser, JSONEvent
+
+DOCUMENT = {
+    "name": "Ann \"AJ\" O'Neil",
+    "job_role": "Back\\end {dev}, [senior]",
+    "skills": ["C++", "a \"quoted\" skill", "commas, and ] brackets"],
+    "experience": [["2019", "2021"], [], ["2021", "now"]],
+    "education": [{"degree": "BSc", "years": [2015, 2019]}],
+    "score": 0.75,
+    "remote": True,
+    "manager": None,
+}
+
+
+def feed_all(parser, text: str, chunk_size: int) -> list:
+    events = []
+    for i in range(0, len(text), chunk_size):
+        events.extend(parser.feed(text[i:i + chunk_size]))
+    return events
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_fields_match_json_loads_for_any_chunking(chunk_size):
+    text = json.dumps(DOCUMENT, indent=2)
+    parser = IncrementalJSONObjectParser()
+
+    events = feed_all(parser, text, chunk_size)
+
+    assert parser.done
+    assert parser.fields == DOCUMENT
+    assert [event.key for event in events if event.kind == "field"] == list(DOCUMENT)
+
+
+def test_escaped_quotes_and_brackets_do_not_end_strings():
+    parser = IncrementalJSONObjectParser()
+
+    events = feed_all(parser, json.dumps({"skills": DOCUMENT["skills"]}), 2)
+
+    assert [event.value for event in events if event.kind == "item"] == DOCUMENT["skills"]
+
+
+def test_nested_arrays_are_reported_as_whole_items():
+    parser = IncrementalJSONObjectParser()
+
+    events = parser.feed(json.dumps({"experience": DOCUMENT["experience"], "skills": []}))
+
+    assert [event for event in events if event.kind == "item"] == [
+        JSONEvent("item", "experience", ["2019", "2021"]),
+        JSONEvent("item", "experience", []),
+        JSONEvent("item", "experience", ["2021", "now"]),
+    ]
+    assert parser.fields == {"experience": DOCUMENT["experience"], "skills": []}
+
+
+def test_items_are_reported_before_the_array_closes():
+    parser = IncrementalJSONObjectParser()
+
+    events = parser.feed('{"skills": ["Python", "SQL", "Go')
+
+    assert events == [JSONEvent("item", "skills", "Python"), JSONEvent("item", "skills", "SQL")]
+    assert parser.feed('"]') == [JSONEvent("item", "skills", "Go"), JSONEvent("field", "skills", ["Python", "SQL", "Go"])]
+
+
+def test_fenced_output_is_parsed_and_the_fence_ignored():
+    text = '```json\n{"name": "Ann", "skills": ["Python"]}\n```\n'
+    parser = IncrementalJSONObjectParser()
+
+    events = feed_all(parser, text, 4)
+
+    assert parser.done
+    assert parser.fields == {"name": "Ann", "skills": ["Python"]}
+    assert events[-1] == JSONEvent("field", "skills", ["Python"])
+
+
+def test_bare_scalar_before_the_closing_brace():
+    parser = IncrementalJSONObjectParser()
+
+    events = feed_all(parser, '{"count": 3, "active": false}', 1)
+
+    assert events == [JSONEvent("field", "count", 3), JSONEvent("field", "active", False)]
+    assert parser.done
+
+
+def test_incomplete_object_is_not_done():
+    parser = IncrementalJSONObjectParser()
+
+    parser.feed('{"name": "Ann", "skills": ["Py')
+
+    assert not parser.done
+    assert parser.fields == {"name": "Ann"}